@@ -10,7 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 SECRET_KEY = config("SECRET_KEY")
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'service_api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +50,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'service_api.middleware.ReplicaPinMiddleware',
+    'service_api.middleware.RequestProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'order_transactional_system.urls'
@@ -71,17 +74,147 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'order_transactional_system.wsgi.application'
 
+# Serve the restaurant and order lists with async views; enable under ASGI.
+ASYNC_READ_VIEWS = config("ASYNC_READ_VIEWS", default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE selects SQLite (default) or PostgreSQL. Connections are kept
+# open for CONN_MAX_AGE seconds instead of being opened per request.
+
+DB_PROFILE = config("DB_PROFILE", default="sqlite")
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config("DB_NAME", default="order_transactional_system"),
+            'USER': config("DB_USER", default="postgres"),
+            'PASSWORD': config("DB_PASSWORD", default=""),
+            'HOST': config("DB_HOST", default="localhost"),
+            'PORT': config("DB_PORT", default="5432"),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    # Pool connections in-process with psycopg 3 (Django 5.1+). Pooled
+    # connections are returned after each request, so CONN_MAX_AGE must be 0.
+    if config("DB_POOL", default=False, cast=bool):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            'max_size': config("DB_POOL_MAX_SIZE", default=20, cast=int),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config("DB_NAME", default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        }
+    }
+
+# Read replicas, as comma separated SQLite files or PostgreSQL hosts with the
+# default database's other settings. Safe list requests read from them, see
+# service_api.routers; users read from the default database for
+# REPLICA_PIN_SECONDS after they write.
+
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config("DB_REPLICAS", default="", cast=Csv())):
+    alias = 'replica_{}'.format(index)
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    DATABASES[alias]['NAME' if DB_PROFILE != 'postgres' else 'HOST'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['service_api.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5, cast=int)
+
+# PRAGMAs run on every new SQLite connection by service_api.db. WAL lets
+# readers carry on while a write is in progress; set DB_SQLITE_TUNING=False to
+# keep SQLite's defaults.
+SQLITE_TUNING = config("DB_SQLITE_TUNING", default=True, cast=bool)
+SQLITE_PRAGMAS = {
+    'journal_mode': config("SQLITE_JOURNAL_MODE", default="wal"),
+    'synchronous': config("SQLITE_SYNCHRONOUS", default="normal"),
+    'busy_timeout': config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int),
+    'mmap_size': config("SQLITE_MMAP_SIZE", default=268435456, cast=int),
+    # Negative values are in KiB.
+    'cache_size': config("SQLITE_CACHE_SIZE", default=-65536, cast=int),
+    'temp_store': 'memory',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+#
+# The menu cache is "locmem" (per process) by default. Use "file" or "db" to
+# share it between worker processes; "db" needs `manage.py createcachetable`.
+
+MENU_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'menu'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'menu_cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'menu_cache'),
+}
+MENU_CACHE_BACKEND, MENU_CACHE_LOCATION = MENU_CACHE_BACKENDS[config("MENU_CACHE", default="locmem")]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'menu': {
+        'BACKEND': MENU_CACHE_BACKEND,
+        'LOCATION': config("MENU_CACHE_LOCATION", default=MENU_CACHE_LOCATION),
+        'TIMEOUT': config("MENU_CACHE_TIMEOUT", default=600, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config("MENU_CACHE_MAX_ENTRIES", default=10000, cast=int),
+        },
+    },
 }
 
+# Seconds a logged-in user, its profile and restaurant stay cached between
+# requests. See service_api.authentication.
+PRINCIPAL_CACHE_TIMEOUT = config("PRINCIPAL_CACHE_TIMEOUT", default=60, cast=int)
+
+# Signed bearer tokens instead of sessions for API logins, lifetimes in seconds.
+# The browsable API keeps logging in with sessions.
+TOKEN_AUTH = config("TOKEN_AUTH", default=False, cast=bool)
+ACCESS_TOKEN_LIFETIME = config("ACCESS_TOKEN_LIFETIME", default=900, cast=int)
+REFRESH_TOKEN_LIFETIME = config("REFRESH_TOKEN_LIFETIME", default=1209600, cast=int)
+
+
+# Number of rows validated and written per transaction by the menu import.
+MENU_IMPORT_CHUNK_SIZE = config("MENU_IMPORT_CHUNK_SIZE", default=500, cast=int)
+
+# Number of orders fetched per query by the order history export.
+ORDER_EXPORT_CHUNK_SIZE = config("ORDER_EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+
+# Per-request query counts and database/view/render times: histograms served
+# to staff on /metrics, and Server-Timing response headers.
+REQUEST_METRICS = config("REQUEST_METRICS", default=True, cast=bool)
+SERVER_TIMING = config("SERVER_TIMING", default=True, cast=bool)
+
+# Requests taking at least this many seconds are kept, with their queries, in a
+# log of the last SLOW_REQUEST_LOG_SIZE ones shown to staff on /slowrequests.
+# 0 turns the log off. Needs REQUEST_METRICS.
+# Queries are listed from the point a request becomes slow, or from its start
+# for the SLOW_REQUEST_SAMPLE_RATE share of requests, so fast requests don't
+# pay for keeping them.
+SLOW_REQUEST_SECONDS = config("SLOW_REQUEST_SECONDS", default=1.0, cast=float)
+SLOW_REQUEST_LOG_SIZE = config("SLOW_REQUEST_LOG_SIZE", default=100, cast=int)
+SLOW_REQUEST_SAMPLE_RATE = config("SLOW_REQUEST_SAMPLE_RATE", default=0.01, cast=float)
+
+
+# Order event streams: events kept for resuming, events buffered per client
+# before it is disconnected, and seconds between keep-alive comments.
+ORDER_EVENTS_HISTORY_SIZE = config("ORDER_EVENTS_HISTORY_SIZE", default=1000, cast=int)
+ORDER_EVENTS_QUEUE_SIZE = config("ORDER_EVENTS_QUEUE_SIZE", default=100, cast=int)
+ORDER_EVENTS_HEARTBEAT = config("ORDER_EVENTS_HEARTBEAT", default=15, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -123,3 +256,20 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/pagination/
+
+API_PAGE_SIZE = config("API_PAGE_SIZE", default=50, cast=int)
+API_MAX_PAGE_SIZE = config("API_MAX_PAGE_SIZE", default=500, cast=int)
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'service_api.authentication.CachedSessionAuthentication',
+        'service_api.authentication.BearerTokenAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'service_api.pagination.IdCursorPagination',
+    'PAGE_SIZE': API_PAGE_SIZE,
+}
@@ -0,0 +1,310 @@
+"""
+Per-restaurant, per-day sales rollups.
+
+Every order counts towards the day it was created on. Placing an order adds
+to its day's order count and food quantities; accepting, cancelling and
+delivering it add to the matching counters, the accept latency and the
+delivered revenue of the restaurant and of its foods. Dashboards then read
+one row per restaurant and day instead of scanning the orders.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    FoodDailyStats,
+    Order,
+    OrderItem,
+    OrderStatus,
+    RestaurantDailyStats,
+)
+
+TOP_FOODS_LIMIT = 10
+
+ROLLUP_COUNTERS = (
+    "orders",
+    "accepted",
+    "cancelled",
+    "delivered",
+    "revenue",
+    "accept_latency",
+)
+
+
+def add_to_rollups(model, keys, rows):
+    """
+    Add the counters of ``rows`` to the rollup rows identified by their
+    ``keys`` fields, creating missing rows, in one INSERT ... ON CONFLICT
+    statement. Counters missing from a row add their default, zero.
+
+    Rows must not repeat keys.
+    """
+    if not rows:
+        return
+    fields = [model._meta.get_field(name) for name in keys] + [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in keys
+    ]
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    placeholders = "({})".format(", ".join(["%s"] * len(fields)))
+    sql = (
+        "INSERT INTO {table} ({columns}) VALUES {values} "
+        "ON CONFLICT ({keys}) DO UPDATE SET {updates}"
+    ).format(
+        table=table,
+        columns=", ".join(quote(field.column) for field in fields),
+        values=", ".join([placeholders] * len(rows)),
+        keys=", ".join(quote(field.column) for field in fields[: len(keys)]),
+        updates=", ".join(
+            "{column} = {table}.{column} + EXCLUDED.{column}".format(
+                table=table, column=quote(field.column)
+            )
+            for field in fields[len(keys) :]
+        ),
+    )
+    params = [
+        field.get_db_prep_save(row.get(field.name, field.get_default()), connection)
+        for row in rows
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def record_order_placed(order, items):
+    """
+    Count a new order and its lines' quantities. Call it in the transaction
+    creating the order.
+    """
+    day = timezone.localdate(order.create_datetime)
+    add_to_rollups(
+        RestaurantDailyStats,
+        ("restaurant", "day"),
+        [{"restaurant": order.restaurant_id, "day": day, "orders": 1}],
+    )
+    quantities = defaultdict(int)
+    for item in items:
+        quantities[item.food_id] += item.quantity
+    add_to_rollups(
+        FoodDailyStats,
+        ("restaurant", "day", "food"),
+        [
+            {
+                "restaurant": order.restaurant_id,
+                "day": day,
+                "food": food_id,
+                "quantity": quantity,
+            }
+            for food_id, quantity in quantities.items()
+        ],
+    )
+
+
+def record_order_transitions(action, order_ids):
+    """
+    Add the orders which just went through ``action`` to their rollups. Call
+    it in the transaction changing the orders.
+
+    Like the restaurant revenue, food revenue counts delivered orders only.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    orders = Order.objects.filter(pk__in=order_ids).values_list(
+        "restaurant_id", "create_datetime", "accept_datetime", "total"
+    )
+    for restaurant_id, create_datetime, accept_datetime, total in orders:
+        delta = deltas[restaurant_id, timezone.localdate(create_datetime)]
+        if action == "accept":
+            delta["accepted"] += 1
+            delta["accept_latency"] = delta.get("accept_latency", timedelta()) + (
+                accept_datetime - create_datetime
+            )
+        elif action == "cancel":
+            delta["cancelled"] += 1
+        elif action == "deliver":
+            delta["delivered"] += 1
+            delta["revenue"] += total
+    add_to_rollups(
+        RestaurantDailyStats,
+        ("restaurant", "day"),
+        [
+            dict(delta, restaurant=restaurant_id, day=day)
+            for (restaurant_id, day), delta in deltas.items()
+        ],
+    )
+    if action != "deliver":
+        return
+
+    revenue = defaultdict(int)
+    lines = OrderItem.objects.filter(order__in=order_ids).values_list(
+        "order__restaurant_id",
+        "order__create_datetime",
+        "food_id",
+        "quantity",
+        "unit_price",
+    )
+    for restaurant_id, create_datetime, food_id, quantity, unit_price in lines:
+        key = (restaurant_id, timezone.localdate(create_datetime), food_id)
+        revenue[key] += unit_price * quantity
+    add_to_rollups(
+        FoodDailyStats,
+        ("restaurant", "day", "food"),
+        [
+            {"restaurant": restaurant_id, "day": day, "food": food_id, "revenue": value}
+            for (restaurant_id, day, food_id), value in revenue.items()
+        ],
+    )
+
+
+def daily_rollups(orders):
+    """
+    Aggregate an Order or ArchivedOrder queryset into rollup counters by
+    restaurant and day.
+    """
+    return (
+        orders.exclude(restaurant=None)
+        .annotate(day=TruncDate("create_datetime"))
+        .values("restaurant_id", "day")
+        .annotate(
+            orders=Count("pk"),
+            accepted=Count("pk", filter=Q(accept_datetime__isnull=False)),
+            cancelled=Count("pk", filter=Q(status=OrderStatus.CANCELLED)),
+            delivered=Count("pk", filter=Q(status=OrderStatus.DELIVERED)),
+            revenue=Sum("total", filter=Q(status=OrderStatus.DELIVERED)),
+            accept_latency=Sum(
+                ExpressionWrapper(
+                    F("accept_datetime") - F("create_datetime"),
+                    output_field=DurationField(),
+                ),
+                filter=Q(accept_datetime__isnull=False),
+            ),
+        )
+        .order_by()
+    )
+
+
+def daily_food_rollups(items):
+    """
+    Aggregate an OrderItem or ArchivedOrderItem queryset by restaurant, day
+    and food.
+    """
+    return (
+        items.annotate(day=TruncDate("order__create_datetime"))
+        .values("order__restaurant_id", "day", "food_id")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_revenue=Sum(
+                F("unit_price") * F("quantity"),
+                filter=Q(order__status=OrderStatus.DELIVERED),
+            ),
+        )
+        .order_by()
+    )
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup row from the orders, archived ones included.
+    """
+    daily = defaultdict(lambda: defaultdict(int))
+    for orders in (Order.objects.all(), ArchivedOrder.objects.all()):
+        for row in daily_rollups(orders).iterator():
+            counters = daily[row.pop("restaurant_id"), row.pop("day")]
+            for field, value in row.items():
+                if value is not None:
+                    # value * 0 is the zero of the value's type.
+                    counters[field] = counters.get(field, value * 0) + value
+    foods = defaultdict(lambda: defaultdict(int))
+    for items in (OrderItem.objects.all(), ArchivedOrderItem.objects.all()):
+        for row in daily_food_rollups(items).iterator():
+            counters = foods[row["order__restaurant_id"], row["day"], row["food_id"]]
+            counters["quantity"] += row["total_quantity"]
+            counters["revenue"] += row["total_revenue"] or 0
+
+    with transaction.atomic():
+        RestaurantDailyStats.objects.all().delete()
+        FoodDailyStats.objects.all().delete()
+        RestaurantDailyStats.objects.bulk_create(
+            (
+                RestaurantDailyStats(restaurant_id=restaurant_id, day=day, **counters)
+                for (restaurant_id, day), counters in daily.items()
+            ),
+            batch_size=1000,
+        )
+        FoodDailyStats.objects.bulk_create(
+            (
+                FoodDailyStats(
+                    restaurant_id=restaurant_id, day=day, food_id=food_id, **counters
+                )
+                for (restaurant_id, day, food_id), counters in foods.items()
+            ),
+            batch_size=1000,
+        )
+
+
+def summarize(stats):
+    """
+    Format summed counters, adding the cancellation rate and the average
+    accept latency.
+    """
+    orders = stats["orders"] or 0
+    cancelled = stats["cancelled"] or 0
+    accepted = stats["accepted"] or 0
+    latency = stats["accept_latency"] or timedelta()
+    return {
+        "orders": orders,
+        "accepted": accepted,
+        "cancelled": cancelled,
+        "delivered": stats["delivered"] or 0,
+        "revenue": "{:.2f}".format(stats["revenue"] or 0),
+        "cancellation_rate": cancelled / orders if orders else 0.0,
+        "average_accept_seconds": (
+            latency.total_seconds() / accepted if accepted else None
+        ),
+    }
+
+
+def restaurant_analytics(restaurant_id, since, until):
+    """
+    Return the daily and total sales figures and the top foods of a
+    restaurant for the days from ``since`` to ``until``.
+    """
+    stats = RestaurantDailyStats.objects.filter(
+        restaurant=restaurant_id, day__gte=since, day__lte=until
+    )
+    days = [
+        dict(summarize(row), day=row["day"])
+        for row in stats.order_by("day").values("day", *ROLLUP_COUNTERS)
+    ]
+    totals = stats.aggregate(**{field: Sum(field) for field in ROLLUP_COUNTERS})
+    top_foods = (
+        FoodDailyStats.objects.filter(
+            restaurant=restaurant_id, day__gte=since, day__lte=until
+        )
+        .values("food_id", "food__name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .order_by("-quantity", "food_id")[:TOP_FOODS_LIMIT]
+    )
+    return {
+        "since": since,
+        "until": until,
+        "totals": summarize(totals),
+        "days": days,
+        "top_foods": [
+            {
+                "food": food["food_id"],
+                "name": food["food__name"],
+                "quantity": food["quantity"],
+                "revenue": "{:.2f}".format(food["revenue"]),
+            }
+            for food in top_foods
+        ],
+    }
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class ServiceApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'service_api'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+
+        from .authentication import user_changed, user_data_changed
+        from .db import configure_sqlite
+        from .models import Profile, Restaurant
+        from .search import restore_search_triggers
+
+        connection_created.connect(configure_sqlite)
+        post_migrate.connect(restore_search_triggers, sender=self)
+        for signal in (post_save, post_delete):
+            signal.connect(user_changed, sender=User)
+            signal.connect(user_data_changed, sender=Profile)
+            signal.connect(user_data_changed, sender=Restaurant)
@@ -0,0 +1,79 @@
+"""
+Moving finished orders out of the order table.
+
+Delivered and cancelled orders never change again, so once they are old
+enough they are copied into ArchivedOrder and ArchivedOrderItem and removed
+from Order and OrderItem. This keeps the order table and its indexes down to
+in-flight and recent orders. Finished orders are found through the indexes
+on their status and delivered or cancelled time. History views read both
+stores through `combine_order_history`.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Order,
+    OrderItem,
+    OrderStatus,
+)
+from .pagination import CombinedQuerySet
+
+ORDER_FIELDS = [field.attname for field in Order._meta.concrete_fields]
+ORDER_ITEM_FIELDS = ("order_id", "food_id", "quantity", "unit_price")
+
+
+def archivable_orders(cutoff):
+    """
+    Orders delivered or cancelled before ``cutoff``.
+    """
+    return Order.objects.filter(
+        Q(status=OrderStatus.DELIVERED, delivered_datetime__lt=cutoff)
+        | Q(status=OrderStatus.CANCELLED, cancell_datetime__lt=cutoff)
+    )
+
+
+def archive_orders(cutoff, batch_size):
+    """
+    Archive the orders finished before ``cutoff``, ``batch_size`` orders per
+    transaction. Yields the number of orders moved by each batch.
+    """
+    while True:
+        with transaction.atomic():
+            orders = list(
+                archivable_orders(cutoff).order_by("pk").values(*ORDER_FIELDS)[
+                    :batch_size
+                ]
+            )
+            if not orders:
+                return
+            ids = [order["id"] for order in orders]
+            items = OrderItem.objects.filter(order__in=ids).values_list(
+                *ORDER_ITEM_FIELDS
+            )
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(**order) for order in orders
+            )
+            ArchivedOrderItem.objects.bulk_create(
+                ArchivedOrderItem(**dict(zip(ORDER_ITEM_FIELDS, item)))
+                for item in items
+            )
+            OrderItem.objects.filter(order__in=ids).delete()
+            Order.objects.filter(pk__in=ids).delete()
+        yield len(orders)
+
+
+def combine_order_history(orders, prefetch_related=(), **filters):
+    """
+    Return ``orders`` filtered by ``filters`` together with the matching
+    archived orders, for the delivered and cancelled order lists.
+
+    Both stores prefetch the ``prefetch_related`` lookups.
+    """
+    return CombinedQuerySet(
+        [
+            queryset.prefetch_related(*prefetch_related).filter(**filters)
+            for queryset in (orders, ArchivedOrder.objects.all())
+        ]
+    )
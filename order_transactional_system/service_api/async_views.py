@@ -0,0 +1,179 @@
+"""
+Async versions of the hot read-only endpoints for ASGI deployments.
+
+With ASYNC_READ_VIEWS enabled, service_api.urls serves these instead of their
+sync counterparts. They resolve the session user, check permissions and read
+their page with the async ORM, then render the same JSON as the sync views,
+so a worker is not tied up per request while it waits on the database.
+"""
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    PermissionDenied,
+)
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .archive import combine_order_history
+from .authentication import get_request_user
+from .models import Order, OrderStatus, ACTIVE_ORDER_STATUSES
+from .pagination import IdCursorPagination, OrderCursorPagination
+from .permissions import MerchantPermission, HasRestaurant, aget_merchant_restaurant_id
+from .routers import ais_pinned, read_from_replicas
+from .rows import queryset_models, row_serializer
+from .serializers import RestaurantSerializer, PlaceOrderSerializer
+from .views import api_homepage_urls, filter_restaurants
+
+
+def render_json(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), content_type="application/json", status=status
+    )
+
+
+async def AsyncApiHomepage(request, format=None):
+    return render_json(api_homepage_urls(request, format=format))
+
+
+class AsyncListAPIView(View):
+    """
+    Paginated, read-only list rendered as JSON from `.values()` rows, see
+    service_api.rows.
+
+    Subclasses implement `aget_queryset`. Permission classes are checked
+    with their `ahas_permission` method when they have one.
+    """
+
+    http_method_names = ["get"]
+    serializer_class = None
+    pagination_class = IdCursorPagination
+    permission_classes = ()
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await sync_to_async(get_request_user)(request)
+            request.user = user or AnonymousUser()
+            await self.acheck_permissions(request)
+            pinned = request.user.is_authenticated and await ais_pinned(
+                request.user.pk
+            )
+            with nullcontext() if pinned else read_from_replicas():
+                queryset = await self.aget_queryset(request)
+                serializer = row_serializer(self.serializer_class)
+                paginator = self.pagination_class()
+                rows = serializer.values(
+                    queryset, *(order.lstrip("-") for order in paginator.ordering)
+                )
+                page = await paginator.apaginate_queryset(
+                    rows, Request(request), self
+                )
+                data = await serializer.ato_representation(
+                    page, queryset_models(queryset)
+                )
+        except APIException as exc:
+            if isinstance(exc.detail, (list, dict)):
+                return render_json(exc.detail, exc.status_code)
+            response = render_json({"detail": exc.detail}, exc.status_code)
+            if isinstance(exc, AuthenticationFailed):
+                # Only bearer tokens fail to authenticate, see get_request_user.
+                response["WWW-Authenticate"] = "Bearer"
+            return response
+        return render_json(paginator.get_paginated_response(data).data)
+
+    async def acheck_permissions(self, request):
+        for permission in [permission() for permission in self.permission_classes]:
+            if hasattr(permission, "ahas_permission"):
+                allowed = await permission.ahas_permission(request, self)
+            else:
+                allowed = permission.has_permission(request, self)
+            if allowed:
+                continue
+            if not request.user.is_authenticated:
+                # Session authentication answers 403, like the sync views.
+                exc = NotAuthenticated()
+                exc.status_code = PermissionDenied.status_code
+                raise exc
+            raise PermissionDenied(getattr(permission, "message", None))
+
+    async def aget_queryset(self, request):
+        raise NotImplementedError
+
+
+class AsyncRestaurantList(AsyncListAPIView):
+    serializer_class = RestaurantSerializer
+
+    async def aget_queryset(self, request):
+        return filter_restaurants(request.GET)
+
+
+class AsyncOrderList(AsyncListAPIView):
+    """
+    Orders matching `order_filter`, newest first. Lists of delivered or
+    cancelled orders set `include_archive` to read archived orders too.
+    """
+
+    serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
+    order_filter = {}
+    include_archive = False
+
+    def get_orders(self, **filters):
+        orders = Order.objects.all()
+        if self.include_archive:
+            return combine_order_history(orders, **filters)
+        return orders.filter(**filters)
+
+
+class AsyncCustomerOrderList(AsyncOrderList):
+    permission_classes = (IsAuthenticated,)
+
+    async def aget_queryset(self, request):
+        return self.get_orders(customer=request.user.pk, **self.order_filter)
+
+
+class AsyncCustomerActiveOrderList(AsyncCustomerOrderList):
+    order_filter = {"status__in": ACTIVE_ORDER_STATUSES}
+
+
+class AsyncCustomerCancelledOrderList(AsyncCustomerOrderList):
+    order_filter = {"status": OrderStatus.CANCELLED}
+    include_archive = True
+
+
+class AsyncCustomerDeliveredOrderList(AsyncCustomerOrderList):
+    order_filter = {"status": OrderStatus.DELIVERED}
+    include_archive = True
+
+
+class AsyncMerchantOrderList(AsyncOrderList):
+    permission_classes = (
+        IsAuthenticated,
+        MerchantPermission,
+        HasRestaurant,
+    )
+
+    async def aget_queryset(self, request):
+        restaurant_id = await aget_merchant_restaurant_id(request)
+        return self.get_orders(restaurant=restaurant_id, **self.order_filter)
+
+
+class AsyncMerchantActiveOrderList(AsyncMerchantOrderList):
+    order_filter = {"status__in": ACTIVE_ORDER_STATUSES}
+
+
+class AsyncMerchantCancelledOrderList(AsyncMerchantOrderList):
+    order_filter = {"status": OrderStatus.CANCELLED}
+    include_archive = True
+
+
+class AsyncMerchantDeliveredOrderList(AsyncMerchantOrderList):
+    order_filter = {"status": OrderStatus.DELIVERED}
+    include_archive = True
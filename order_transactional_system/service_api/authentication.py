@@ -0,0 +1,283 @@
+"""
+Session authentication resolving the user from a short-lived principal cache.
+
+The principal is the user with its profile and the id of the restaurant it
+manages (``merchant_restaurant_id``), loaded with one joined query and cached
+for PRINCIPAL_CACHE_TIMEOUT seconds. Permission checks read it instead of
+querying the profile and restaurant tables on every request.
+
+Saving or deleting the user, its profile or its restaurants invalidates it,
+through the receivers connected in ServiceApiConfig.ready.
+The cache is per process, so other workers may serve the old principal until
+it expires.
+
+With TOKEN_AUTH enabled, login issues a signed access token carrying the
+user id, staff and merchant flags and restaurant id, plus a refresh token.
+Access tokens are verified without touching the database; logging out or
+changing the password revokes them through a revocation list in the cache
+whose entries expire with the tokens they revoke.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Min
+from django.db.models.signals import post_delete
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Profile
+
+TOKEN_SALT = "service_api.authentication.token"
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+def principal_cache_key(user_id):
+    return "principal:{}".format(user_id)
+
+
+def load_principal(user_id):
+    """
+    Return the active user with the given id, or None.
+    """
+    key = principal_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = (
+            User.objects.select_related("profile")
+            .annotate(merchant_restaurant_id=Min("restaurant__id"))
+            .filter(pk=user_id, is_active=True)
+            .first()
+        )
+        if user is None:
+            return None
+        cache.set(key, user, settings.PRINCIPAL_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_principal(user_id):
+    cache.delete(principal_cache_key(user_id))
+
+
+def user_changed(sender, instance, signal, **kwargs):
+    """
+    Drop the cached principal of a saved or deleted user, and revoke the
+    tokens of users who can no longer log in.
+
+    Connected to post_save and post_delete of User.
+    """
+    invalidate_principal(instance.pk)
+    if signal is post_delete or not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+def user_data_changed(sender, instance, **kwargs):
+    """
+    Drop the cached principal of the user a saved or deleted Profile or
+    Restaurant belongs to.
+
+    Connected to post_save and post_delete of Profile and Restaurant.
+    """
+    if isinstance(instance, Profile):
+        invalidate_principal(instance.user_id)
+    else:
+        invalidate_principal(instance.merchant_id)
+
+
+def token_lifetime(token_type):
+    if token_type == ACCESS_TOKEN:
+        return settings.ACCESS_TOKEN_LIFETIME
+    return settings.REFRESH_TOKEN_LIFETIME
+
+
+def sign_token(user, token_type, session_id):
+    claims = {
+        "typ": token_type,
+        "uid": user.pk,
+        "sid": session_id,
+        "iat": time.time(),
+        "s": user.is_staff,
+        "m": hasattr(user, "profile") and user.profile.is_merchant,
+        "r": getattr(user, "merchant_restaurant_id", None),
+    }
+    return signing.dumps(claims, salt=TOKEN_SALT, compress=True)
+
+
+def issue_tokens(user, session_id=None):
+    """
+    Return a new access token and refresh token pair for the user.
+
+    Tokens of one login share a session id, which is what logout revokes.
+    """
+    session_id = session_id or uuid.uuid4().hex
+    return {
+        "token_type": "Bearer",
+        "access": sign_token(user, ACCESS_TOKEN, session_id),
+        "refresh": sign_token(user, REFRESH_TOKEN, session_id),
+        "expires_in": settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def revoked_session_key(session_id):
+    return "revoked:session:{}".format(session_id)
+
+
+def revoked_user_key(user_id):
+    return "revoked:user:{}".format(user_id)
+
+
+def revoke_session(session_id):
+    cache.set(revoked_session_key(session_id), True, settings.REFRESH_TOKEN_LIFETIME)
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revoke every token issued to the user until now.
+    """
+    cache.set(revoked_user_key(user_id), time.time(), settings.REFRESH_TOKEN_LIFETIME)
+
+
+def verify_token(token, token_type):
+    """
+    Return the claims of a valid, unrevoked token of the given type.
+
+    Raises AuthenticationFailed otherwise.
+    """
+    try:
+        claims = signing.loads(
+            token, salt=TOKEN_SALT, max_age=token_lifetime(token_type)
+        )
+    except signing.SignatureExpired:
+        raise AuthenticationFailed("Token has expired.")
+    except signing.BadSignature:
+        raise AuthenticationFailed("Invalid token.")
+    if claims.get("typ") != token_type:
+        raise AuthenticationFailed("Invalid token.")
+    revoked = cache.get_many(
+        [revoked_session_key(claims["sid"]), revoked_user_key(claims["uid"])]
+    )
+    revoked_before = revoked.get(revoked_user_key(claims["uid"]))
+    if revoked_session_key(claims["sid"]) in revoked or (
+        revoked_before is not None and claims["iat"] <= revoked_before
+    ):
+        raise AuthenticationFailed("Token has been revoked.")
+    return claims
+
+
+def token_user(claims):
+    """
+    Build the user of an access token from its claims, without a query.
+
+    Only the id, the staff and merchant flags and the restaurant id are set;
+    views needing other fields load the user themselves.
+    """
+    user = User(pk=claims["uid"], is_staff=claims["s"], is_active=True)
+    user.profile = Profile(is_merchant=claims["m"])
+    if claims["r"] is not None:
+        user.merchant_restaurant_id = claims["r"]
+    return user
+
+
+def has_bearer_token(request):
+    """
+    Return whether a Django request sends an `Authorization: Bearer` header.
+    """
+    scheme = request.headers.get("Authorization", "").partition(" ")[0]
+    return scheme.lower() == "bearer"
+
+
+def get_bearer_token(request):
+    """
+    Return the token of a Django request's `Authorization: Bearer` header.
+    """
+    if not has_bearer_token(request):
+        return None
+    token = request.headers["Authorization"].partition(" ")[2]
+    if not token.strip():
+        raise AuthenticationFailed("Invalid token header.")
+    return token.strip()
+
+
+def get_request_user(request):
+    """
+    Return the user of a Django request's bearer token or session, or None.
+    """
+    token = get_bearer_token(request)
+    if token is not None:
+        return token_user(verify_token(token, ACCESS_TOKEN))
+    return get_session_user(request)
+
+
+def get_session_user(request):
+    """
+    Return the user logged in to the Django request's session, or None.
+
+    Mirrors `django.contrib.auth.get_user` for the model backend, including
+    the session hash check which logs out sessions after a password change.
+    """
+    session = request.session
+    if session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    try:
+        user_id = User._meta.pk.to_python(session[SESSION_KEY])
+    except (KeyError, ValidationError):
+        return None
+    user = load_principal(user_id)
+    if user is None:
+        return None
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or not constant_time_compare(
+        session_hash, user.get_session_auth_hash()
+    ):
+        session.flush()
+        return None
+    return user
+
+
+class CachedSessionAuthentication(SessionAuthentication):
+    """
+    Session authentication with the user read from the principal cache.
+    """
+
+    def authenticate(self, request):
+        user = get_session_user(request._request)
+        if user is None:
+            return None
+        # Keep views using the plain Django request consistent with DRF's.
+        request._request.user = user
+        self.enforce_csrf(request)
+        return (user, None)
+
+    def authenticate_header(self, request):
+        """
+        Challenge requests that sent a bearer token, so a failed token
+        answers 401 rather than the 403 of session authentication.
+        """
+        if has_bearer_token(request._request):
+            return BearerTokenAuthentication().authenticate_header(request)
+        return super().authenticate_header(request)
+
+
+class BearerTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate `Authorization: Bearer <access token>` headers.
+
+    `request.auth` holds the token claims.
+    """
+
+    def authenticate(self, request):
+        token = get_bearer_token(request._request)
+        if token is None:
+            return None
+        claims = verify_token(token, ACCESS_TOKEN)
+        return (token_user(claims), claims)
+
+    def authenticate_header(self, request):
+        return "Bearer"
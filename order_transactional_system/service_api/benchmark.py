@@ -0,0 +1,391 @@
+"""
+In-process load benchmark of the API routes.
+
+Every route of service_api.urls has a scenario building the requests one
+role (anonymous, customer, merchant or admin) makes to it. Requests which
+consume state, like accepting an order, get fresh orders prepared before
+the clock starts. The requests of a route are then spread over concurrent
+worker threads, each with its own test client and database connection, and
+their latency and query counts are reported.
+
+Run it against data from `manage.py seed_bench` through
+`manage.py bench_api`.
+"""
+import itertools
+import threading
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import urls
+from .authentication import issue_tokens, load_principal
+from .models import Food, Order, OrderItem, OrderStatus, Profile, Restaurant
+
+# Routes serving endless Server-Sent Events streams.
+STREAMING_ROUTES = ("merchant/events/", "customer/events/")
+
+
+class Call:
+    """
+    One request: test client method, path and body.
+    """
+
+    def __init__(self, method, path, data=None, format="json"):
+        self.method = method
+        self.path = path
+        self.data = data
+        self.format = format
+
+
+def api_routes():
+    """
+    Return (route, URL name) of the API's own URL patterns.
+    """
+    return [
+        (str(pattern.pattern), pattern.name)
+        for pattern in urls.urlpatterns
+        if isinstance(pattern, URLPattern)
+    ]
+
+
+class BenchContext:
+    """
+    The users and objects the scenarios run against, taken from the seeded
+    data.
+    """
+
+    def __init__(self, password, prefix="bench"):
+        self.password = password
+        self.prefix = prefix
+        self.counter = itertools.count()
+        self.merchant = (
+            User.objects.filter(
+                username__startswith=prefix + "_merchant", restaurant__isnull=False
+            )
+            .order_by("pk")
+            .first()
+        )
+        self.customer = (
+            User.objects.filter(username__startswith=prefix + "_customer")
+            .order_by("pk")
+            .first()
+        )
+        if self.merchant is None or self.customer is None:
+            raise ValueError(
+                "No {}_* users found, run manage.py seed_bench first.".format(prefix)
+            )
+        self.admin, created = User.objects.get_or_create(
+            username=prefix + "_admin", defaults={"is_staff": True}
+        )
+        if created:
+            Profile.objects.create(user=self.admin, city="Berlin")
+        self.restaurant = (
+            Restaurant.objects.filter(merchant=self.merchant).order_by("pk").first()
+        )
+        self.foods = list(
+            Food.objects.filter(restaurant=self.restaurant).order_by("pk")[:3]
+        )
+
+    def user(self, role):
+        return {
+            "anonymous": None,
+            "customer": self.customer,
+            "merchant": self.merchant,
+            "admin": self.admin,
+        }[role]
+
+    def unique(self):
+        return "{}_{}_{}".format(self.prefix, int(time.time()), next(self.counter))
+
+    def make_orders(self, count, status=OrderStatus.PLACED):
+        """
+        Create ``count`` orders of the customer at the merchant's restaurant.
+        """
+        now = timezone.now()
+        food = self.foods[0]
+        orders = Order.objects.bulk_create(
+            Order(
+                customer=self.customer,
+                restaurant=self.restaurant,
+                status=status,
+                accept_datetime=now if status == OrderStatus.ACCEPTED else None,
+                total=food.price,
+            )
+            for _ in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, food=food, unit_price=food.price)
+            for order in orders
+        )
+        return [order.pk for order in orders]
+
+
+def get(path, **params):
+    return lambda context, count: [Call("get", path, params or None)] * count
+
+
+def order_transition(path, status=OrderStatus.PLACED, data=None):
+    def calls(context, count):
+        return [
+            Call("put", path.format(pk=pk), data or {})
+            for pk in context.make_orders(count, status)
+        ]
+
+    return calls
+
+
+def register(context, count):
+    return [
+        Call(
+            "post",
+            "/register/",
+            {
+                "username": context.unique(),
+                "password": context.password,
+                "first_name": "Bench",
+                "last_name": "User",
+                "profile": {"city": "Berlin"},
+            },
+        )
+        for _ in range(count)
+    ]
+
+
+def login(context, count):
+    data = {"username": context.customer.username, "password": context.password}
+    return [Call("post", "/login/", data)] * count
+
+
+def token_refresh(context, count):
+    refresh = issue_tokens(load_principal(context.customer.pk))["refresh"]
+    return [Call("post", "/token/refresh/", {"refresh": refresh})] * count
+
+
+def nearby(context, count):
+    restaurant = context.restaurant
+    params = {"lat": restaurant.lat, "lng": restaurant.long, "radius": 5}
+    return [Call("get", "/restaurants/nearby/", params)] * count
+
+
+def menu(context, count):
+    path = "/restaurants/{}/menu/".format(context.restaurant.pk)
+    return [Call("get", path)] * count
+
+
+def search(context, count):
+    return [Call("get", "/search/", {"q": context.restaurant.food_type})] * count
+
+
+def new_restaurant(context, count):
+    restaurant = context.restaurant
+    data = {
+        "name": "Bench restaurant",
+        "food_type": restaurant.food_type,
+        "city": restaurant.city,
+        "address": "Bench street",
+        "open_time": "08:00",
+        "close_time": "22:00",
+        "lat": str(restaurant.lat),
+        "long": str(restaurant.long),
+    }
+    return [Call("post", "/merchant/newrestaurant/", data)] * count
+
+
+def import_foods(context, count):
+    rows = "name,price\n" + "".join(
+        "Bench import {},{}\n".format(index, index % 20 + 1) for index in range(50)
+    )
+    return [
+        Call(
+            "post",
+            "/merchant/foods/import/",
+            {"file": SimpleUploadedFile("menu.csv", rows.encode())},
+            format="multipart",
+        )
+        for _ in range(count)
+    ]
+
+
+def update_food(context, count):
+    path = "/merchant/updatefood/{}/".format(context.foods[0].pk)
+    return [
+        Call("patch", path, {"price": str(Decimal(index % 20 + 1))})
+        for index in range(count)
+    ]
+
+
+def bulk_transition(context, count):
+    ids = context.make_orders(count * 10)
+    return [
+        Call(
+            "post",
+            "/merchant/orders/transition/",
+            {"ids": ids[index:index + 10], "action": "accept"},
+        )
+        for index in range(0, len(ids), 10)
+    ]
+
+
+def export(path):
+    def calls(context, count):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        return [Call("get", path, {"since": since})] * count
+
+    return calls
+
+
+def new_order(context, count):
+    data = {"items": [{"food": food.pk, "quantity": 1} for food in context.foods]}
+    return [Call("post", "/customer/neworder/", data)] * count
+
+
+# route -> (role, function(context, count) returning the calls)
+SCENARIOS = {
+    "": ("anonymous", get("/")),
+    "register/": ("anonymous", register),
+    "login/": ("anonymous", login),
+    "logout/": ("customer", get("/logout/")),
+    "token/refresh/": ("anonymous", token_refresh),
+    "users/": ("admin", get("/users/")),
+    "profile/": ("customer", get("/profile/")),
+    "restaurants/": ("anonymous", get("/restaurants/")),
+    "restaurants/nearby/": ("anonymous", nearby),
+    "restaurants/<int:pk>/menu/": ("anonymous", menu),
+    "search/": ("anonymous", search),
+    "metrics/": ("admin", get("/metrics/")),
+    "slowrequests/": ("admin", get("/slowrequests/")),
+    "merchant/newrestaurant/": ("merchant", new_restaurant),
+    "merchant/foods/": ("merchant", get("/merchant/foods/")),
+    "merchant/foods/import/": ("merchant", import_foods),
+    "merchant/updatefood/<int:pk>/": ("merchant", update_food),
+    "merchant/activeorders/": ("merchant", get("/merchant/activeorders/")),
+    "merchant/cancelledorders/": ("merchant", get("/merchant/cancelledorders/")),
+    "merchant/deliveredorders/": ("merchant", get("/merchant/deliveredorders/")),
+    "merchant/cancel/<int:pk>/": (
+        "merchant",
+        order_transition("/merchant/cancel/{pk}/"),
+    ),
+    "merchant/accept/<int:pk>/": (
+        "merchant",
+        order_transition("/merchant/accept/{pk}/", data={"time_to_deliver": 20}),
+    ),
+    "merchant/orders/transition/": ("merchant", bulk_transition),
+    "merchant/analytics/": ("merchant", get("/merchant/analytics/")),
+    "merchant/orders/export/": ("merchant", export("/merchant/orders/export/")),
+    "customer/neworder/": ("customer", new_order),
+    "customer/activeorders/": ("customer", get("/customer/activeorders/")),
+    "customer/cancelledorders/": ("customer", get("/customer/cancelledorders/")),
+    "customer/deliveredorders/": ("customer", get("/customer/deliveredorders/")),
+    "customer/orders/export/": ("customer", export("/customer/orders/export/")),
+    "customer/cancel/<int:pk>/": (
+        "customer",
+        order_transition("/customer/cancel/{pk}/"),
+    ),
+    "customer/approvedelivered/<int:pk>/": (
+        "customer",
+        order_transition(
+            "/customer/approvedelivered/{pk}/", status=OrderStatus.ACCEPTED
+        ),
+    ),
+}
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_calls(user, calls, workers):
+    """
+    Make the calls from ``workers`` threads; return (latency seconds, query
+    count, status code) per call and the elapsed seconds.
+    """
+    results = []
+    lock = threading.Lock()
+    shares = [calls[index::workers] for index in range(workers)]
+
+    def worker(share):
+        # Count server errors as 500 responses instead of raising them.
+        client = APIClient(raise_request_exception=False)
+        if user is not None:
+            client.force_authenticate(user)
+        own = []
+        try:
+            for call in share:
+                with ExitStack() as stack:
+                    captures = [
+                        stack.enter_context(CaptureQueriesContext(connection))
+                        for connection in connections.all()
+                    ]
+                    started = time.perf_counter()
+                    response = getattr(client, call.method)(
+                        call.path, call.data, format=call.format
+                    )
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                    latency = time.perf_counter() - started
+                queries = sum(len(capture) for capture in captures)
+                own.append((latency, queries, response.status_code))
+        finally:
+            connections.close_all()
+        with lock:
+            results.extend(own)
+
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def run_benchmark(context, requests, workers, only=None):
+    """
+    Benchmark every route, or the routes containing one of the ``only``
+    strings, and return the report.
+    """
+    report = {"requests": requests, "workers": workers, "routes": {}, "skipped": {}}
+    for route, name in api_routes():
+        if only and not any(part in route for part in only):
+            continue
+        if route in STREAMING_ROUTES:
+            report["skipped"][route] = "streams events until the client leaves"
+            continue
+        if route not in SCENARIOS:
+            report["skipped"][route] = "no scenario"
+            continue
+        role, scenario = SCENARIOS[route]
+        calls = scenario(context, requests)
+        results, elapsed = run_calls(context.user(role), calls, workers)
+        latencies = sorted(latency for latency, _, _ in results)
+        queries = [count for _, count, _ in results]
+        statuses = {}
+        for _, _, status in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        report["routes"][route] = {
+            "name": name,
+            "role": role,
+            "method": calls[0].method.upper(),
+            "requests": len(results),
+            "errors": sum(
+                count for status, count in statuses.items() if status >= 400
+            ),
+            "statuses": {str(status): count for status, count in statuses.items()},
+            "throughput_rps": round(len(results) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "queries_per_request": round(sum(queries) / len(queries), 2),
+            "max_queries": max(queries),
+        }
+    return report
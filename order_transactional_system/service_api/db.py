@@ -0,0 +1,17 @@
+"""
+Per-connection database setup.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to a new SQLite connection.
+
+    Connected to connection_created.
+    """
+    if connection.vendor != "sqlite" or not settings.SQLITE_TUNING:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute("PRAGMA {} = {}".format(pragma, value))
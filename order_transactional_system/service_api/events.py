@@ -0,0 +1,137 @@
+"""
+In-process publish/subscribe hub for order events.
+
+Views publish an event whenever an order is created or changes state, and
+Server-Sent Events streams subscribe to the events of one restaurant or
+customer. Events are numbered and the most recent ones are kept, so a client
+reconnecting with its last seen event id gets the events it missed.
+
+Every subscriber has a bounded queue. A subscriber that falls behind is sent
+an overflow marker and dropped instead of buffering without limit; its client
+reconnects and resumes from the history.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+
+OVERFLOW = object()
+
+
+class Subscription:
+    def __init__(self, hub, restaurant_ids=(), customer_id=None):
+        self.hub = hub
+        self.restaurant_ids = frozenset(restaurant_ids)
+        self.customer_id = customer_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.ORDER_EVENTS_QUEUE_SIZE)
+        self.closed = False
+
+    def matches(self, event):
+        if event["restaurant"] in self.restaurant_ids:
+            return True
+        return self.customer_id is not None and event["customer"] == self.customer_id
+
+    def deliver(self, event):
+        """
+        Queue an event; runs on the subscriber's event loop.
+        """
+        if self.closed:
+            return
+        if self.queue.qsize() >= self.queue.maxsize - 1:
+            self.closed = True
+            self.queue.put_nowait(OVERFLOW)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """
+        Return the next event, OVERFLOW, or None if none arrived in time.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.closed = True
+        self.hub.unsubscribe(self)
+
+
+class OrderEventHub:
+    def __init__(self, history_size):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._history = deque(maxlen=history_size)
+        self._subscriptions = set()
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, event_type, order_id, restaurant_id, customer_id, status):
+        """
+        Number and record an event and hand it to matching subscribers.
+
+        Safe to call from any thread.
+        """
+        with self._lock:
+            self._last_id += 1
+            event = {
+                "id": self._last_id,
+                "type": event_type,
+                "order": order_id,
+                "restaurant": restaurant_id,
+                "customer": customer_id,
+                "status": status,
+            }
+            self._history.append(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+        return event
+
+    def subscribe(self, restaurant_ids=(), customer_id=None, last_event_id=None):
+        """
+        Register a subscription from within a running event loop.
+
+        Returns the subscription and the missed events after
+        ``last_event_id``, or None when some of them are no longer kept.
+        """
+        subscription = Subscription(self, restaurant_ids, customer_id)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if last_event_id is None:
+                return subscription, []
+            if last_event_id > self._last_id or (
+                self._history and self._history[0]["id"] > last_event_id + 1
+            ):
+                return subscription, None
+            missed = [
+                event
+                for event in self._history
+                if event["id"] > last_event_id and subscription.matches(event)
+            ]
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+hub = OrderEventHub(settings.ORDER_EVENTS_HISTORY_SIZE)
+
+
+def publish_order_event(event_type, order_id, restaurant_id, customer_id, status):
+    return hub.publish(event_type, order_id, restaurant_id, customer_id, status)
+
+
+def format_event(event):
+    """
+    Encode an event as a Server-Sent Events message.
+    """
+    return "id: {}\nevent: {}\ndata: {}\n\n".format(
+        event["id"], event["type"], json.dumps(event)
+    )
@@ -0,0 +1,103 @@
+import math
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    """
+    Encode a coordinate as a geohash string of the given length.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (lng, lng_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """
+    Return the (height, width) in degrees of a geohash cell.
+    """
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return (south, west, north, east) enclosing the circle around a point.
+
+    West may be greater than east when the box crosses the antimeridian.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    south = max(lat - dlat, -90.0)
+    north = min(lat + dlat, 90.0)
+    if south == -90.0 or north == 90.0:
+        return south, -180.0, north, 180.0
+    dlng = dlat / math.cos(math.radians(max(abs(south), abs(north))))
+    if dlng >= 180.0:
+        return south, -180.0, north, 180.0
+    west = (lng - dlng + 180.0) % 360.0 - 180.0
+    east = (lng + dlng + 180.0) % 360.0 - 180.0
+    return south, west, north, east
+
+
+def covering_cells(south, west, north, east, max_cells=9):
+    """
+    Return the smallest set of geohash prefixes (at most ``max_cells`` of the
+    finest precision that fits) whose cells cover the bounding box.
+    """
+    width = east - west if west <= east else east - west + 360.0
+    cells = {""}
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        cell_height, cell_width = geohash_cell_size(precision)
+        rows = math.ceil((north - south) / cell_height) + 1
+        columns = math.ceil(width / cell_width) + 1
+        if rows * columns > max_cells * 4:
+            break
+        candidate = set()
+        for row in range(rows):
+            cell_lat = min(south + row * cell_height, north)
+            for column in range(columns):
+                cell_lng = west + min(column * cell_width, width)
+                cell_lng = (cell_lng + 180.0) % 360.0 - 180.0
+                candidate.add(encode_geohash(cell_lat, cell_lng, precision))
+        if len(candidate) > max_cells:
+            break
+        cells = candidate
+    return cells
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance between two coordinates in kilometers.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
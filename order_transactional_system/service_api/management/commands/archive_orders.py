@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from service_api.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders delivered or cancelled more than the given number of days "
+        "ago to the order archive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, required=True, metavar="DAYS")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than"])
+        archived = 0
+        for moved in archive_orders(cutoff, options["batch_size"]):
+            archived += moved
+            if options["verbosity"] > 1:
+                self.stdout.write("Archived {} orders...".format(archived))
+        self.stdout.write("Archived {} orders.".format(archived))
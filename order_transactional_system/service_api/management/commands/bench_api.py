@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from service_api.benchmark import BenchContext, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API route from concurrent threads against data "
+        "created by seed_bench and report latency percentiles, throughput and "
+        "queries per request as JSON. Routes which write leave their rows in "
+        "the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Per route.")
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--routes",
+            nargs="*",
+            help="Only benchmark routes containing one of these strings.",
+        )
+        parser.add_argument("--output", help="Write the report to this file.")
+        parser.add_argument("--prefix", default="bench")
+        parser.add_argument("--password", default="bench")
+
+    def handle(self, *args, **options):
+        try:
+            context = BenchContext(options["password"], options["prefix"])
+        except ValueError as error:
+            raise CommandError(error)
+
+        setup_test_environment()
+        try:
+            report = run_benchmark(
+                context, options["requests"], options["workers"], options["routes"]
+            )
+        finally:
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        self.stdout.write(output)
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from datetime import time as day_time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from service_api.models import Profile, Restaurant, Food
+
+
+class Command(BaseCommand):
+    help = (
+        "Place orders through the API from concurrent threads and report the "
+        "throughput as JSON. Run it once per DB_PROFILE / DB_SQLITE_TUNING "
+        "setting to compare them. Creates a bench merchant, customer and "
+        "restaurant in the configured database and leaves their orders there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--foods", type=int, default=3)
+
+    def handle(self, *args, **options):
+        customer, foods = self.setup_data(options["foods"])
+        threads = options["threads"]
+        per_thread = options["orders"] // threads
+        payload = {
+            "items": [{"food": food.pk, "quantity": 1} for food in foods],
+            "note": "bench",
+        }
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(customer)
+            own_latencies = []
+            own_errors = 0
+            try:
+                for _ in range(per_thread):
+                    started = time.perf_counter()
+                    response = client.post(
+                        "/customer/neworder/", payload, format="json"
+                    )
+                    own_latencies.append(time.perf_counter() - started)
+                    if response.status_code != 201:
+                        own_errors += 1
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(own_latencies)
+                errors.append(own_errors)
+
+        setup_test_environment()
+        try:
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            teardown_test_environment()
+
+        latencies.sort()
+        database = settings.DATABASES["default"]
+        report = {
+            "profile": settings.DB_PROFILE,
+            "engine": database["ENGINE"],
+            "conn_max_age": database.get("CONN_MAX_AGE", 0),
+            "sqlite_tuning": settings.SQLITE_TUNING,
+            "threads": threads,
+            "orders": len(latencies),
+            "errors": sum(errors),
+            "seconds": round(elapsed, 3),
+            "orders_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def setup_data(self, food_count):
+        merchant, created = User.objects.get_or_create(username="bench_merchant")
+        if created:
+            Profile.objects.create(user=merchant, city="Bench", is_merchant=True)
+        customer, created = User.objects.get_or_create(username="bench_customer")
+        if created:
+            Profile.objects.create(user=customer, city="Bench")
+        restaurant = Restaurant.objects.filter(merchant=merchant).first()
+        if restaurant is None:
+            restaurant = Restaurant.objects.create(
+                merchant=merchant,
+                name="Bench",
+                food_type="Bench",
+                city="Bench",
+                address="Bench",
+                open_time=day_time(0, 0),
+                close_time=day_time(23, 59),
+                lat=0,
+                long=0,
+            )
+        foods = list(Food.objects.filter(restaurant=restaurant)[:food_count])
+        while len(foods) < food_count:
+            foods.append(
+                Food.objects.create(
+                    restaurant=restaurant,
+                    name="Bench food {}".format(len(foods)),
+                    price=Decimal("9.99"),
+                )
+            )
+        return customer, foods
@@ -0,0 +1,93 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from service_api.models import Food, Order, Restaurant
+from service_api.rows import row_serializer
+from service_api.serializers import (
+    FoodSerializer,
+    PlaceOrderSerializer,
+    RestaurantSerializer,
+)
+
+# Name -> (serializer, queryset for model instances, ordering of the lists)
+LISTS = {
+    "orders": (
+        PlaceOrderSerializer,
+        lambda: Order.objects.prefetch_related("items", "foods"),
+        ("-create_datetime", "-id"),
+    ),
+    "restaurants": (RestaurantSerializer, Restaurant.objects.all, ("id",)),
+    "foods": (FoodSerializer, Food.objects.all, ("id",)),
+}
+
+
+def timed(function, repeat):
+    """
+    Return the result, best seconds and query count of ``function()``.
+    """
+    best = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return result, best, len(queries)
+
+
+class Command(BaseCommand):
+    help = (
+        "Read and render the first --rows orders, restaurants and foods once "
+        "through their ModelSerializers and once from .values() rows, check "
+        "both give the same JSON and report the times as JSON. Run it against "
+        "data from seed_bench."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--lists", nargs="*", choices=list(LISTS))
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        renderer = JSONRenderer()
+        report = {"rows": rows, "repeat": repeat, "lists": {}}
+        for name in options["lists"] or LISTS:
+            serializer_class, get_queryset, ordering = LISTS[name]
+            serializer = row_serializer(serializer_class)
+
+            def from_instances():
+                page = list(get_queryset().order_by(*ordering)[:rows])
+                return renderer.render(serializer_class(page, many=True).data)
+
+            def from_rows():
+                queryset = get_queryset().model.objects.order_by(*ordering)
+                page = list(serializer.values(queryset)[:rows])
+                return renderer.render(serializer.to_representation(page))
+
+            instances, instances_seconds, instances_queries = timed(
+                from_instances, repeat
+            )
+            values, rows_seconds, rows_queries = timed(from_rows, repeat)
+            if instances != values:
+                raise CommandError(
+                    "The {} rendered from rows differ from the serializer's.".format(
+                        name
+                    )
+                )
+            report["lists"][name] = {
+                "rows": len(json.loads(values)),
+                "bytes": len(values),
+                "instances_ms": round(instances_seconds * 1000, 1),
+                "rows_ms": round(rows_seconds * 1000, 1),
+                "speedup": round(instances_seconds / rows_seconds, 2),
+                "instances_queries": instances_queries,
+                "rows_queries": rows_queries,
+            }
+        self.stdout.write(json.dumps(report, indent=2))
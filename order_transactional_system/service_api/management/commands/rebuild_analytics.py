@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from service_api.analytics import rebuild_rollups
+from service_api.models import RestaurantDailyStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollups from the orders."
+
+    def handle(self, *args, **options):
+        rebuild_rollups()
+        self.stdout.write(
+            "Rebuilt {} restaurant days.".format(RestaurantDailyStats.objects.count())
+        )
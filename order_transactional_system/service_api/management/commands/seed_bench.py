@@ -0,0 +1,215 @@
+import random
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from service_api.analytics import rebuild_rollups
+from service_api.models import (
+    Food,
+    Order,
+    OrderItem,
+    OrderStatus,
+    Profile,
+    Restaurant,
+)
+
+# City, latitude and longitude of its centre.
+CITIES = [
+    ("Berlin", 52.520, 13.405),
+    ("Hamburg", 53.551, 9.994),
+    ("Munich", 48.137, 11.576),
+    ("Cologne", 50.938, 6.960),
+    ("Frankfurt", 50.110, 8.682),
+    ("Stuttgart", 48.776, 9.183),
+    ("Leipzig", 51.340, 12.375),
+    ("Dresden", 51.050, 13.738),
+]
+FOOD_TYPES = ["Pizza", "Burger", "Sushi", "Curry", "Kebab", "Salad", "Noodles", "Tacos"]
+FOOD_WORDS = ["Classic", "Spicy", "Veggie", "Double", "Crispy", "Smoked", "Garlic"]
+OPENING_HOURS = [
+    (time(8, 0), time(22, 0)),
+    (time(11, 0), time(23, 0)),
+    (time(17, 0), time(2, 0)),
+    (time(0, 0), time(23, 59)),
+]
+# Share of generated orders in each status.
+STATUS_WEIGHTS = {
+    OrderStatus.PLACED: 5,
+    OrderStatus.ACCEPTED: 5,
+    OrderStatus.CANCELLED: 15,
+    OrderStatus.DELIVERED: 75,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate merchants, customers, restaurants, menus and orders for "
+        "benchmarks. Users are named <prefix>_merchant_N and <prefix>_customer_N."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--merchants", type=int, default=100)
+        parser.add_argument("--customers", type=int, default=2000)
+        parser.add_argument("--foods", type=int, default=20, help="Foods per menu.")
+        parser.add_argument("--orders", type=int, default=100000)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="bench")
+        parser.add_argument("--password", default="bench")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=prefix + "_").exists():
+            raise CommandError(
+                "Users named {}_* exist already; pick another --prefix.".format(prefix)
+            )
+
+        password = make_password(options["password"])
+        merchants = self.create_users(
+            prefix + "_merchant", options["merchants"], password, is_merchant=True
+        )
+        customers = self.create_users(
+            prefix + "_customer", options["customers"], password, is_merchant=False
+        )
+        menus = self.create_restaurants(merchants, options["foods"])
+        self.stdout.write(
+            "Created {} merchants, {} customers and {} restaurants.".format(
+                len(merchants), len(customers), len(menus)
+            )
+        )
+
+        created = 0
+        while created < options["orders"]:
+            count = min(options["batch_size"], options["orders"] - created)
+            self.create_orders(customers, menus, count, options["days"])
+            created += count
+            self.stdout.write("Created {} orders...".format(created))
+        rebuild_rollups()
+        self.stdout.write("Done.")
+
+    def create_users(self, name, count, password, is_merchant):
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(
+                    username="{}_{}".format(name, index),
+                    password=password,
+                    first_name=name,
+                    last_name=str(index),
+                )
+                for index in range(count)
+            )
+            Profile.objects.bulk_create(
+                Profile(
+                    user=user,
+                    city=self.random.choice(CITIES)[0],
+                    is_merchant=is_merchant,
+                )
+                for user in users
+            )
+        return users
+
+    def create_restaurants(self, merchants, food_count):
+        """
+        Create one restaurant with a menu per merchant and return
+        {restaurant id: [(food id, price), ...]}.
+        """
+        restaurants = []
+        for merchant in merchants:
+            city, lat, long = self.random.choice(CITIES)
+            food_type = self.random.choice(FOOD_TYPES)
+            open_time, close_time = self.random.choice(OPENING_HOURS)
+            restaurant = Restaurant(
+                merchant=merchant,
+                name="{} {} {}".format(city, food_type, merchant.pk),
+                food_type=food_type,
+                city=city,
+                address="{} Street {}".format(food_type, merchant.pk),
+                open_time=open_time,
+                close_time=close_time,
+                lat=Decimal("{:.6f}".format(lat + self.random.uniform(-0.1, 0.1))),
+                long=Decimal("{:.6f}".format(long + self.random.uniform(-0.1, 0.1))),
+            )
+            restaurant.set_derived_fields()
+            restaurants.append(restaurant)
+
+        with transaction.atomic():
+            restaurants = Restaurant.objects.bulk_create(restaurants)
+            foods = Food.objects.bulk_create(
+                Food(
+                    restaurant=restaurant,
+                    name="{} {} {}".format(
+                        self.random.choice(FOOD_WORDS), restaurant.food_type, index
+                    ),
+                    price=Decimal(self.random.randrange(300, 3000)) / 100,
+                )
+                for restaurant in restaurants
+                for index in range(food_count)
+            )
+        menus = {restaurant.pk: [] for restaurant in restaurants}
+        for food in foods:
+            menus[food.restaurant_id].append((food.pk, food.price))
+        return menus
+
+    def create_orders(self, customers, menus, count, days):
+        now = timezone.now()
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+        restaurant_ids = list(menus)
+        orders = []
+        lines = []
+        for _ in range(count):
+            restaurant_id = self.random.choice(restaurant_ids)
+            menu = menus[restaurant_id]
+            order_lines = [
+                (food_id, self.random.randint(1, 3), price)
+                for food_id, price in self.random.sample(
+                    menu, min(len(menu), self.random.randint(1, 3))
+                )
+            ]
+            status = self.random.choices(statuses, weights)[0]
+            created = now - timedelta(seconds=self.random.randrange(days * 86400))
+            order = Order(
+                customer=self.random.choice(customers),
+                restaurant_id=restaurant_id,
+                status=status,
+                create_datetime=created,
+                total=sum(price * quantity for _, quantity, price in order_lines),
+            )
+            if status in (OrderStatus.ACCEPTED, OrderStatus.DELIVERED):
+                order.accept_datetime = created + timedelta(
+                    seconds=self.random.randint(30, 900)
+                )
+                order.time_to_deliver = self.random.randint(15, 60)
+            if status == OrderStatus.DELIVERED:
+                order.delivered_datetime = order.accept_datetime + timedelta(
+                    minutes=order.time_to_deliver + self.random.randint(-10, 20)
+                )
+            if status == OrderStatus.CANCELLED:
+                order.cancell_datetime = created + timedelta(
+                    seconds=self.random.randint(30, 600)
+                )
+            orders.append(order)
+            lines.append(order_lines)
+
+        # create_datetime is auto_now_add, so inserts set it to now; the
+        # generated times are written back in the same transaction.
+        create_datetimes = [order.create_datetime for order in orders]
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(orders)
+            for order, created in zip(orders, create_datetimes):
+                order.create_datetime = created
+            Order.objects.bulk_update(orders, ["create_datetime"], batch_size=1000)
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order, food_id=food_id, quantity=quantity, unit_price=price
+                )
+                for order, order_lines in zip(orders, lines)
+                for food_id, quantity, price in order_lines
+            )
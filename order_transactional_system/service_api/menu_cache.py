@@ -0,0 +1,55 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+
+MENU_CACHE_ALIAS = "menu"
+
+
+def get_menu_cache():
+    return caches[MENU_CACHE_ALIAS]
+
+
+def _version_key(restaurant_id):
+    return "menu-version:{}".format(restaurant_id)
+
+
+def get_menu_version(restaurant_id):
+    """
+    Return the current menu version of a restaurant.
+    """
+    cache = get_menu_cache()
+    key = _version_key(restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        # The version key may have been evicted, so start again from the
+        # clock rather than from 1 to stay ahead of any version seen before.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_menu_version(restaurant_id):
+    """
+    Invalidate every cached menu page of a restaurant.
+    """
+    cache = get_menu_cache()
+    key = _version_key(restaurant_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def menu_cache_key(restaurant_id, url):
+    """
+    Return the cache key of a menu page at the restaurant's current version.
+
+    Compute the key once, before reading the menu from the database, so a
+    page read before a concurrent write is stored under the old version.
+    """
+    return "menu:{}:{}:{}".format(
+        restaurant_id,
+        get_menu_version(restaurant_id),
+        hashlib.md5(url.encode()).hexdigest(),
+    )
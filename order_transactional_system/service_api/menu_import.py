@@ -0,0 +1,108 @@
+"""
+Bulk menu import from CSV or NDJSON uploads.
+
+Rows are read lazily from the upload and written in chunks, so memory use is
+bounded by the chunk size rather than the size of the menu.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Food
+from .serializers import FoodSerializer
+
+
+def record_error(message):
+    return ValidationError({"non_field_errors": [message]})
+
+
+def iter_rows(upload, file_format):
+    """
+    Yield (row number, row dict or ValidationError) for each record of the
+    upload.
+
+    Records which are not valid UTF-8 or JSON yield the error.
+    """
+    undecodable = []
+
+    def decode(lines):
+        for line in lines:
+            try:
+                yield line.decode("utf-8")
+            except UnicodeDecodeError:
+                undecodable.append(line)
+                yield line.decode("utf-8", errors="replace")
+
+    if file_format == "csv":
+        # A record may span lines, so check for undecodable ones per record.
+        for number, row in enumerate(csv.DictReader(decode(upload)), start=1):
+            if undecodable:
+                undecodable.clear()
+                yield number, record_error("Record is not valid UTF-8.")
+            else:
+                yield number, row
+        return
+    number = 0
+    for line in decode(upload):
+        if not line.strip():
+            continue
+        number += 1
+        if undecodable:
+            undecodable.clear()
+            yield number, record_error("Record is not valid UTF-8.")
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            row = record_error("Invalid record.")
+        yield number, row
+
+
+def import_menu(restaurant_id, rows, chunk_size):
+    """
+    Create or update the restaurant's foods by name from (number, row) pairs.
+
+    Each chunk is validated, then upserted with one bulk_create in its own
+    transaction. Returns the import report.
+    """
+    report = {"created": 0, "updated": 0, "errors": []}
+    # One serializer validates every row, so its fields are built only once.
+    serializer = FoodSerializer()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return report
+
+        prices = {}
+        for number, row in chunk:
+            if isinstance(row, ValidationError):
+                report["errors"].append({"row": number, "errors": row.detail})
+                continue
+            try:
+                food = serializer.run_validation(row)
+            except ValidationError as exc:
+                report["errors"].append({"row": number, "errors": exc.detail})
+                continue
+            prices[food["name"]] = food["price"]
+
+        with transaction.atomic():
+            updated = Food.objects.filter(
+                restaurant=restaurant_id, name__in=prices
+            ).count()
+            Food.objects.bulk_create(
+                [
+                    Food(restaurant_id=restaurant_id, name=name, price=price)
+                    for name, price in prices.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["restaurant", "name"],
+                update_fields=["price"],
+            )
+        report["updated"] += updated
+        report["created"] += len(prices) - updated
@@ -0,0 +1,295 @@
+"""
+In-process registry of request metrics in the Prometheus text format.
+
+Every thread records into shards of its own, so recording a request takes no
+lock and never waits on another request; a scrape adds the shards up. When a
+thread ends, its shards are folded into the metric's retired totals, so the
+totals never go backwards and servers starting a thread per request don't
+pile up shards.
+
+Each worker process has its own registry; Prometheus scrapes them one by one.
+"""
+import os
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from django.conf import settings
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Queries listed per request; later ones are counted but not listed.
+MAX_RECORDED_QUERIES = 200
+
+PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+# Instrumentation modules, skipped when looking for the code running a query.
+INSTRUMENTATION_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ("metrics.py", "middleware.py", "profiling.py")
+}
+
+
+def format_labels(names, values):
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"),
+        )
+        for name, value in zip(names, values)
+    )
+
+
+class ThreadToken:
+    """
+    Object only a thread's local storage refers to, collected when the
+    thread ends.
+    """
+
+
+def add_shard(totals, shard, size):
+    for labels, values in list(shard.items()):
+        total = totals.setdefault(labels, [0] * size)
+        for index, value in enumerate(values):
+            total[index] += value
+
+
+class Metric:
+    """
+    Per-thread shards of {label values: list of numbers}, plus the retired
+    totals of finished threads.
+    """
+
+    type = None
+
+    def __init__(self, name, help, labelnames=("url_name",)):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.local = threading.local()
+        self.shards = []
+        self.retired = {}
+        # Reentrant, as garbage collection may retire a shard at any point.
+        self.lock = threading.RLock()
+
+    def values(self, labels):
+        """
+        Return this thread's list of numbers for the label values.
+        """
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self.local.shard = self.add_thread()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * self.size
+        return values
+
+    def add_thread(self):
+        shard = {}
+        self.local.token = ThreadToken()
+        with self.lock:
+            self.shards.append(shard)
+        weakref.finalize(self.local.token, self.retire, shard)
+        return shard
+
+    def retire(self, shard):
+        with self.lock:
+            add_shard(self.retired, shard, self.size)
+            self.shards.remove(shard)
+
+    def collect(self):
+        """
+        Return {label values: list of numbers} summed over all threads.
+        """
+        totals = {}
+        with self.lock:
+            shards = list(self.shards)
+            add_shard(totals, self.retired, self.size)
+        for shard in shards:
+            add_shard(totals, shard, self.size)
+        return totals
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} {}".format(self.name, self.type),
+        ]
+        for labels, values in sorted(self.collect().items()):
+            labels = format_labels(self.labelnames, labels)
+            lines.extend(self.render_values(labels, values))
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+    size = 1
+
+    def inc(self, labels, amount=1):
+        self.values(labels)[0] += amount
+
+    def render_values(self, labels, values):
+        yield "{}{{{}}} {}".format(self.name, labels, values[0])
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=("url_name",)):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        # A count per bucket, the count above the last bucket and the sum.
+        self.size = len(buckets) + 2
+
+    def observe(self, labels, value):
+        values = self.values(labels)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def render_values(self, labels, values):
+        count = 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), values):
+            count += bucket_count
+            yield '{}_bucket{{{},le="{}"}} {}'.format(self.name, labels, bound, count)
+        yield "{}_sum{{{}}} {}".format(self.name, labels, values[-1])
+        yield "{}_count{{{}}} {}".format(self.name, labels, count)
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from the request to its response headers.",
+    DURATION_BUCKETS,
+)
+VIEW_SECONDS = Histogram(
+    "http_request_view_seconds", "Time spent in the view.", DURATION_BUCKETS
+)
+RENDER_SECONDS = Histogram(
+    "http_request_render_seconds",
+    "Time spent rendering the response after the view returned.",
+    DURATION_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per request.",
+    DURATION_BUCKETS,
+)
+QUERIES = Histogram(
+    "http_request_queries", "Database queries per request.", QUERY_BUCKETS
+)
+RESPONSES = Counter(
+    "http_responses_total", "Responses by status code.", ("url_name", "status")
+)
+
+REGISTRY = (
+    REQUEST_SECONDS,
+    VIEW_SECONDS,
+    RENDER_SECONDS,
+    DB_SECONDS,
+    QUERIES,
+    RESPONSES,
+)
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def call_site():
+    """
+    Return (file, line, function) of the innermost project code frame
+    calling into the database, or None.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_DIR) and filename not in INSTRUMENTATION_FILES:
+            return filename, frame.f_lineno, frame.f_code.co_name
+        frame = frame.f_back
+    return None
+
+
+class RequestTimings:
+    """
+    Query count and database, view and render times of one request.
+
+    Installed as a database execute wrapper, it times every query. Given a
+    ``statements`` list, it also keeps (sql, params, seconds, call site) of
+    the queries starting ``record_after`` seconds or more into the request.
+    """
+
+    def __init__(self, statements=None, record_after=0.0):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.statements = statements
+        self.record_after = record_after
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+        # Profiled requests are slowed down and left out of the metrics.
+        self.profiled = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            self.queries += 1
+            self.db += seconds
+            statements = self.statements
+            if (
+                statements is not None
+                and started - self.started >= self.record_after
+                and len(statements) < MAX_RECORDED_QUERIES
+            ):
+                statements.append((sql, params, seconds, call_site()))
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+
+    def finish_view(self):
+        self.view_finished = time.perf_counter()
+
+    def finish_render(self, response=None):
+        self.render_finished = time.perf_counter()
+
+    def phases(self):
+        """
+        Return (total, view, render) seconds. Responses rendered by the view
+        itself have no separate render phase, and requests which never reached
+        a view (unknown URLs, middleware responses) no view phase.
+        """
+        finished = time.perf_counter()
+        if self.view_started is None:
+            return finished - self.started, 0.0, 0.0
+        view_finished = self.view_finished or finished
+        render = 0.0
+        if self.render_finished is not None:
+            render = self.render_finished - view_finished
+        return finished - self.started, view_finished - self.view_started, render
+
+    def server_timing(self, total, view, render):
+        return (
+            'db;dur={:.1f};desc="{} queries", view;dur={:.1f}, '
+            "render;dur={:.1f}, total;dur={:.1f}".format(
+                self.db * 1000, self.queries, view * 1000, render * 1000, total * 1000
+            )
+        )
+
+
+def record_request(url_name, status, timings, total, view, render):
+    labels = (url_name,)
+    REQUEST_SECONDS.observe(labels, total)
+    VIEW_SECONDS.observe(labels, view)
+    RENDER_SECONDS.observe(labels, render)
+    DB_SECONDS.observe(labels, timings.db)
+    QUERIES.observe(labels, timings.queries)
+    RESPONSES.inc((url_name, status))
@@ -0,0 +1,227 @@
+import random
+import time
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import RequestTimings, record_request
+from .profiling import (
+    asks_for_profile,
+    profile_frames,
+    request_report,
+    run_profiled,
+    slow_requests,
+    wants_profile,
+)
+from .routers import pin_to_primary
+
+
+def time_queries(timings):
+    """
+    Return a context manager timing the queries of every connection with
+    ``timings``.
+    """
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(timings))
+    return stack
+
+
+class RequestMetricsMiddleware:
+    """
+    Count the queries and time the database, view and render phases of every
+    request. The times go out in a Server-Timing header and into the
+    histograms of service_api.metrics, labelled with the URL name. Requests
+    slower than SLOW_REQUEST_SECONDS go to the slow request log, with the
+    queries they ran after becoming slow, or all of them for the sampled
+    SLOW_REQUEST_SAMPLE_RATE share of requests.
+
+    List it first in MIDDLEWARE so the other middleware is timed too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Keep the view hooks on the event loop rather than a thread.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = self.start(request)
+        with time_queries(timings):
+            response = self.get_response(request)
+        report = self.finish(request, response, timings)
+        if report is not None:
+            slow_requests.add(report())
+        return response
+
+    async def __acall__(self, request):
+        timings = self.start(request)
+        with time_queries(timings):
+            response = await self.get_response(request)
+        report = self.finish(request, response, timings)
+        if report is not None:
+            # Reading the user may load the session.
+            slow_requests.add(await sync_to_async(report)())
+        return response
+
+    def start(self, request):
+        slow_seconds = settings.SLOW_REQUEST_SECONDS
+        if not slow_seconds:
+            timings = RequestTimings()
+        elif random.random() < settings.SLOW_REQUEST_SAMPLE_RATE:
+            timings = RequestTimings(statements=[])
+        else:
+            # Walking the stack for every query's call site costs more than
+            # the query on fast requests.
+            timings = RequestTimings(statements=[], record_after=slow_seconds)
+        request._timings = timings
+        return timings
+
+    def finish(self, request, response, timings):
+        """
+        Set the Server-Timing header and record the request. Return a
+        function building the slow request report, if it was slow.
+        """
+        total, view, render = timings.phases()
+        if settings.SERVER_TIMING:
+            header = timings.server_timing(total, view, render)
+            if response.has_header("Server-Timing"):
+                header = response["Server-Timing"] + ", " + header
+            response["Server-Timing"] = header
+        if timings.profiled:
+            return None
+        match = request.resolver_match
+        url_name = match.url_name or match.view_name if match else "unmatched"
+        record_request(url_name, response.status_code, timings, total, view, render)
+        slow_seconds = settings.SLOW_REQUEST_SECONDS
+        if slow_seconds and total >= slow_seconds:
+            return partial(request_report, request, response, timings, total)
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timings.start_view()
+
+    def process_template_response(self, request, response):
+        return self.time_render(request, response)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request._timings.start_view()
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_render(request, response)
+
+    def time_render(self, request, response):
+        # DRF responses are rendered after the view returns and this runs.
+        request._timings.finish_view()
+        response.add_post_render_callback(request._timings.finish_render)
+        return response
+
+
+def pins_user(request, response):
+    return request.method not in SAFE_METHODS and response.status_code < 400
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin users to the default database for a while after a successful write,
+    so their next reads see it even if the replicas lag behind.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if pins_user(request, response):
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if pins_user(request, response):
+            # Reading the user may load the session.
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def pin(self, request):
+        if request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
+
+
+class RequestProfilerMiddleware:
+    """
+    Run the requests of staff users asking for it with `?profile=1` or an
+    `X-Profile: 1` header under cProfile, and answer with the profile report
+    instead of the response.
+
+    Under ASGI, profiled requests run on a worker thread; the others stay on
+    the event loop.
+
+    List it after AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not wants_profile(request):
+            return self.get_response(request)
+        return self.profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        # Checking the user may load the session, so look at the flag first.
+        if asks_for_profile(request) and await sync_to_async(wants_profile)(request):
+            return await sync_to_async(self.profile)(
+                request, async_to_sync(self.get_response)
+            )
+        return await self.get_response(request)
+
+    def profile(self, request, get_response):
+        if hasattr(request, "_timings"):
+            request._timings.profiled = True
+        timings = RequestTimings(statements=[])
+        started = time.perf_counter()
+        with time_queries(timings):
+            response, profiler = run_profiled(get_response, request)
+        report = request_report(
+            request, response, timings, time.perf_counter() - started
+        )
+        report["profile"] = profile_frames(profiler)
+        return JsonResponse(report)
@@ -0,0 +1,215 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Food',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('status', models.CharField(choices=[('placed', 'Placed'), ('accepted', 'Accepted'), ('cancelled', 'Cancelled'), ('delivered', 'Delivered')], default='placed', max_length=16)),
+                ('accept_datetime', models.DateTimeField(blank=True, default=None, null=True)),
+                ('cancell_datetime', models.DateTimeField(blank=True, default=None, null=True)),
+                ('delivered_datetime', models.DateTimeField(blank=True, default=None, null=True)),
+                ('note', models.CharField(default='', max_length=1024)),
+                ('time_to_deliver', models.IntegerField(default=30, validators=[django.core.validators.MinValueValidator(1)])),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('create_datetime', models.DateTimeField()),
+                ('customer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='service_api.archivedorder')),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='service_api.food')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='foods',
+            field=models.ManyToManyField(through='service_api.ArchivedOrderItem', to='service_api.food'),
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('placed', 'Placed'), ('accepted', 'Accepted'), ('cancelled', 'Cancelled'), ('delivered', 'Delivered')], default='placed', max_length=16)),
+                ('create_datetime', models.DateTimeField(auto_now_add=True)),
+                ('accept_datetime', models.DateTimeField(blank=True, default=None, null=True)),
+                ('cancell_datetime', models.DateTimeField(blank=True, default=None, null=True)),
+                ('delivered_datetime', models.DateTimeField(blank=True, default=None, null=True)),
+                ('note', models.CharField(default='', max_length=1024)),
+                ('time_to_deliver', models.IntegerField(default=30, validators=[django.core.validators.MinValueValidator(1)])),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('customer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='service_api.food')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='service_api.order')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='foods',
+            field=models.ManyToManyField(through='service_api.OrderItem', to='service_api.food'),
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(blank=True, max_length=17, validators=[django.core.validators.RegexValidator(message="format: '+999999999'. Up to 15 digits allowed.", regex='^\\+?1?\\d{9,15}$')])),
+                ('city', models.CharField(max_length=255)),
+                ('is_merchant', models.BooleanField(default=False)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Restaurant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('food_type', models.CharField(max_length=255)),
+                ('city', models.CharField(max_length=255)),
+                ('address', models.CharField(max_length=1024)),
+                ('open_time', models.TimeField(null=True)),
+                ('close_time', models.TimeField(null=True)),
+                ('lat', models.DecimalField(blank=True, decimal_places=16, max_digits=22, null=True)),
+                ('long', models.DecimalField(blank=True, decimal_places=16, max_digits=22, null=True)),
+                ('geohash', models.CharField(blank=True, default='', editable=False, max_length=12)),
+                ('open_minute', models.SmallIntegerField(editable=False, null=True)),
+                ('close_minute', models.SmallIntegerField(editable=False, null=True)),
+                ('merchant', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, to='service_api.restaurant'),
+        ),
+        migrations.CreateModel(
+            name='FoodDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service_api.food')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service_api.restaurant')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='food',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='service_api.restaurant'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, to='service_api.restaurant'),
+        ),
+        migrations.CreateModel(
+            name='RestaurantDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('delivered', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('accept_latency', models.DurationField(default=datetime.timedelta)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service_api.restaurant')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='archivedorderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'food'), name='archivedorderitem_order_food_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'food'), name='orderitem_order_food_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['geohash'], name='restaurant_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['open_minute', 'close_minute'], name='restaurant_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['city', 'open_minute', 'close_minute'], name='restaurant_city_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'status', '-create_datetime', '-id'], name='order_customer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'status', '-create_datetime', '-id'], name='order_restaurant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ('placed', 'accepted'))), fields=['customer', '-create_datetime', '-id'], name='order_customer_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ('placed', 'accepted'))), fields=['restaurant', '-create_datetime', '-id'], name='order_restaurant_active_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='fooddailystats',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'day', 'food'), name='fooddailystats_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['restaurant', 'id'], name='food_restaurant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['restaurant', 'name'], name='food_restaurant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', 'status', '-create_datetime', '-id'], name='archivedorder_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['restaurant', 'status', '-create_datetime', '-id'], name='archivedorder_restaurant_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='restaurantdailystats',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'day'), name='restaurantdailystats_uniq'),
+        ),
+    ]
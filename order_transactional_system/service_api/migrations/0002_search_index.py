@@ -0,0 +1,101 @@
+from django.db import migrations
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """
+    RunSQL on SQLite only; other databases search without an index.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0001_initial'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(
+            sql=[
+                """
+                CREATE VIRTUAL TABLE service_api_search USING fts5(
+                    name, food_type, city, restaurant_id UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+                )
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS service_api_restaurant_search_insert
+                AFTER INSERT ON service_api_restaurant BEGIN
+                    INSERT INTO service_api_search
+                        (rowid, name, food_type, city, restaurant_id)
+                    VALUES (2 * new.id, new.name, new.food_type, new.city, new.id);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS service_api_restaurant_search_update
+                AFTER UPDATE OF name, food_type, city ON service_api_restaurant
+                BEGIN
+                    DELETE FROM service_api_search WHERE rowid = 2 * old.id;
+                    INSERT INTO service_api_search
+                        (rowid, name, food_type, city, restaurant_id)
+                    VALUES (2 * new.id, new.name, new.food_type, new.city, new.id);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS service_api_restaurant_search_delete
+                AFTER DELETE ON service_api_restaurant BEGIN
+                    DELETE FROM service_api_search WHERE rowid = 2 * old.id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS service_api_food_search_insert
+                AFTER INSERT ON service_api_food BEGIN
+                    INSERT INTO service_api_search
+                        (rowid, name, food_type, city, restaurant_id)
+                    VALUES (2 * new.id + 1, new.name, '', '', new.restaurant_id);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS service_api_food_search_update
+                AFTER UPDATE OF name, restaurant_id ON service_api_food BEGIN
+                    DELETE FROM service_api_search WHERE rowid = 2 * old.id + 1;
+                    INSERT INTO service_api_search
+                        (rowid, name, food_type, city, restaurant_id)
+                    VALUES (2 * new.id + 1, new.name, '', '', new.restaurant_id);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS service_api_food_search_delete
+                AFTER DELETE ON service_api_food BEGIN
+                    DELETE FROM service_api_search WHERE rowid = 2 * old.id + 1;
+                END
+                """,
+                """
+                INSERT INTO service_api_search
+                    (rowid, name, food_type, city, restaurant_id)
+                SELECT 2 * id, name, food_type, city, id FROM service_api_restaurant
+                """,
+                """
+                INSERT INTO service_api_search
+                    (rowid, name, food_type, city, restaurant_id)
+                SELECT 2 * id + 1, name, '', '', restaurant_id FROM service_api_food
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS service_api_restaurant_search_insert",
+                "DROP TRIGGER IF EXISTS service_api_restaurant_search_update",
+                "DROP TRIGGER IF EXISTS service_api_restaurant_search_delete",
+                "DROP TRIGGER IF EXISTS service_api_food_search_insert",
+                "DROP TRIGGER IF EXISTS service_api_food_search_update",
+                "DROP TRIGGER IF EXISTS service_api_food_search_delete",
+                "DROP TABLE IF EXISTS service_api_search",
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:43
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_foods(apps, schema_editor):
+    """
+    Suffix the ids to all but the first food of a name in a restaurant.
+    """
+    Food = apps.get_model('service_api', 'Food')
+    duplicates = (
+        Food.objects.values('restaurant', 'name')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        foods = Food.objects.filter(
+            restaurant=duplicate['restaurant'], name=duplicate['name']
+        ).order_by('id')
+        for food in foods[1:]:
+            suffix = ' ({})'.format(food.pk)
+            food.name = food.name[: 255 - len(suffix)] + suffix
+            food.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='food',
+            name='food_restaurant_name_idx',
+        ),
+        migrations.RunPython(rename_duplicate_foods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='food',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='food_restaurant_name_uniq'),
+        ),
+    ]
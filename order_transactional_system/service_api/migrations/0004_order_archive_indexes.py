@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0003_food_restaurant_name_uniq'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'delivered_datetime'], name='order_status_delivered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'cancell_datetime'], name='order_status_cancelled_idx'),
+        ),
+    ]
@@ -1,7 +1,31 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator, MinValueValidator
 
+from .geo import encode_geohash
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of_day(time):
+    return time.hour * 60 + time.minute
+
+
+def open_at_q(time):
+    """
+    Filter restaurants open at the given time of day, including windows
+    which started the day before and run past midnight.
+    """
+    minute = minute_of_day(time)
+    return Q(open_minute__lte=minute, close_minute__gt=minute) | Q(
+        open_minute__lte=minute + MINUTES_PER_DAY,
+        close_minute__gt=minute + MINUTES_PER_DAY,
+    )
+
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -27,10 +51,49 @@ class Restaurant(models.Model):
     close_time = models.TimeField(blank=False, null=True)
     lat = models.DecimalField(max_digits=22, decimal_places=16, blank=True, null=True)
     long = models.DecimalField(max_digits=22, decimal_places=16, blank=True, null=True)
+    # Precomputed from lat/long on save, used as the spatial index key.
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
+    # Precomputed from open_time/close_time on save as minutes after midnight
+    # of the opening day, so windows past midnight close after minute 1440.
+    open_minute = models.SmallIntegerField(null=True, editable=False)
+    close_minute = models.SmallIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["geohash"], name="restaurant_geohash_idx"),
+            models.Index(
+                fields=["open_minute", "close_minute"], name="restaurant_hours_idx"
+            ),
+            models.Index(
+                fields=["city", "open_minute", "close_minute"],
+                name="restaurant_city_hours_idx",
+            ),
+        ]
 
     def __str__(self):
         return "<{}: {}>".format(self.pk, self.name)
 
+    def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
+        """
+        Compute the geohash and opening minutes; save() calls it, bulk
+        inserts have to.
+        """
+        if self.lat is None or self.long is None:
+            self.geohash = ""
+        else:
+            self.geohash = encode_geohash(float(self.lat), float(self.long))
+        if self.open_time is None or self.close_time is None:
+            self.open_minute = self.close_minute = None
+        else:
+            self.open_minute = minute_of_day(self.open_time)
+            self.close_minute = minute_of_day(self.close_time)
+            if self.close_minute <= self.open_minute:
+                self.close_minute += MINUTES_PER_DAY
+
 
 class Food(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.RESTRICT)
@@ -41,16 +104,62 @@ class Food(models.Model):
     # is_organic = models.BooleanField(default=False, blank=False, null=False)
     # is_vegan = models.BooleanField(default=False, blank=False, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["restaurant", "id"], name="food_restaurant_id_idx"),
+        ]
+        constraints = [
+            # Menu imports match foods by name.
+            models.UniqueConstraint(
+                fields=["restaurant", "name"], name="food_restaurant_name_uniq"
+            ),
+        ]
+
     def __str__(self):
         return "<{}: {}$>".format(self.restaurant, self.name)
 
 
-class Order(models.Model):
+class OrderStatus(models.TextChoices):
+    PLACED = "placed"
+    ACCEPTED = "accepted"
+    CANCELLED = "cancelled"
+    DELIVERED = "delivered"
+
+
+ACTIVE_ORDER_STATUSES = (OrderStatus.PLACED, OrderStatus.ACCEPTED)
+
+# action -> (statuses the order may be in, resulting status, timestamp field)
+ORDER_TRANSITIONS = {
+    "accept": ((OrderStatus.PLACED,), OrderStatus.ACCEPTED, "accept_datetime"),
+    "cancel": ((OrderStatus.PLACED,), OrderStatus.CANCELLED, "cancell_datetime"),
+    "deliver": ((OrderStatus.ACCEPTED,), OrderStatus.DELIVERED, "delivered_datetime"),
+}
+
+
+class OrderQuerySet(models.QuerySet):
+    def transition(self, action, **fields):
+        """
+        Apply a state transition to the matching orders in a single
+        conditional UPDATE and return how many orders it applied to.
+
+        Orders which are not in one of the action's source statuses are left
+        untouched, so concurrent transitions on the same order can't both win.
+        """
+        sources, target, timestamp_field = ORDER_TRANSITIONS[action]
+        fields[timestamp_field] = timezone.now()
+        return self.filter(status__in=sources).update(status=target, **fields)
+
+
+class AbstractOrder(models.Model):
+    """
+    Fields shared by in-flight orders and archived ones.
+    """
+
     customer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    foods = models.ManyToManyField(Food)
-    is_accepted = models.BooleanField(default=False, blank=False, null=False)
-    is_cancelled = models.BooleanField(default=False, blank=False, null=False)
-    is_delivered = models.BooleanField(default=False, blank=False, null=False)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.RESTRICT, null=True)
+    status = models.CharField(
+        max_length=16, choices=OrderStatus.choices, default=OrderStatus.PLACED
+    )
     create_datetime = models.DateTimeField(auto_now_add=True, editable=False, blank=True)
     accept_datetime = models.DateTimeField(default=None, null=True, blank=True)
     cancell_datetime = models.DateTimeField(default=None, null=True, blank=True)
@@ -59,3 +168,160 @@ class Order(models.Model):
     time_to_deliver = models.IntegerField(
         validators=[MinValueValidator(1)], blank=False, null=False, default=30
     )
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def is_accepted(self):
+        return self.status in (OrderStatus.ACCEPTED, OrderStatus.DELIVERED)
+
+    @property
+    def is_cancelled(self):
+        return self.status == OrderStatus.CANCELLED
+
+    @property
+    def is_delivered(self):
+        return self.status == OrderStatus.DELIVERED
+
+
+class Order(AbstractOrder):
+    foods = models.ManyToManyField(Food, through="OrderItem")
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["customer", "status", "-create_datetime", "-id"],
+                name="order_customer_status_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "status", "-create_datetime", "-id"],
+                name="order_restaurant_status_idx",
+            ),
+            models.Index(
+                fields=["customer", "-create_datetime", "-id"],
+                condition=models.Q(status__in=ACTIVE_ORDER_STATUSES),
+                name="order_customer_active_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "-create_datetime", "-id"],
+                condition=models.Q(status__in=ACTIVE_ORDER_STATUSES),
+                name="order_restaurant_active_idx",
+            ),
+            # Finished orders by age, for service_api.archive.
+            models.Index(
+                fields=["status", "delivered_datetime"],
+                name="order_status_delivered_idx",
+            ),
+            models.Index(
+                fields=["status", "cancell_datetime"],
+                name="order_status_cancelled_idx",
+            ),
+        ]
+
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    food = models.ForeignKey(Food, on_delete=models.RESTRICT)
+    quantity = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)], blank=False, null=False, default=1
+    )
+    # Price of one unit at the time the order was placed.
+    unit_price = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=False, null=False
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "food"], name="orderitem_order_food_uniq"
+            ),
+        ]
+
+
+class ArchivedOrder(AbstractOrder):
+    """
+    A delivered or cancelled order moved out of the order table by
+    `manage.py archive_orders`. It keeps the id it had as an Order.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    create_datetime = models.DateTimeField()
+    foods = models.ManyToManyField(Food, through="ArchivedOrderItem")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["customer", "status", "-create_datetime", "-id"],
+                name="archivedorder_customer_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "status", "-create_datetime", "-id"],
+                name="archivedorder_restaurant_idx",
+            ),
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name="items"
+    )
+    food = models.ForeignKey(Food, on_delete=models.RESTRICT)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "food"], name="archivedorderitem_order_food_uniq"
+            ),
+        ]
+
+
+class RestaurantDailyStats(models.Model):
+    """
+    Running totals of a restaurant's orders created on one day.
+
+    Kept up to date by service_api.analytics as orders are placed and change
+    state; `manage.py rebuild_analytics` recomputes them from the orders.
+    """
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+    # Total of the delivered orders.
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Sum of accept_datetime - create_datetime of the accepted orders.
+    accept_latency = models.DurationField(default=timedelta)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "day"], name="restaurantdailystats_uniq"
+            ),
+        ]
+
+
+class FoodDailyStats(models.Model):
+    """
+    Quantity and value of a food ordered on one day.
+    """
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    day = models.DateField()
+    food = models.ForeignKey(Food, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "day", "food"], name="fooddailystats_uniq"
+            ),
+        ]
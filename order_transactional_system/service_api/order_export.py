@@ -0,0 +1,119 @@
+"""
+Streaming export of order history as NDJSON or CSV.
+
+Orders are read with a chunked iterator (a server-side cursor where the
+database supports one) and their lines are fetched once per chunk, so memory
+use stays flat however many orders are exported.
+"""
+import csv
+import json
+from itertools import chain, islice
+
+from rest_framework import serializers
+
+ORDER_EXPORT_FORMATS = ("ndjson", "csv")
+
+ORDER_EXPORT_FIELDS = (
+    "id",
+    "status",
+    "create_datetime",
+    "accept_datetime",
+    "cancell_datetime",
+    "delivered_datetime",
+    "time_to_deliver",
+    "total",
+    "note",
+    "customer",
+    "restaurant",
+)
+DATETIME_FIELDS = (
+    "create_datetime",
+    "accept_datetime",
+    "cancell_datetime",
+    "delivered_datetime",
+)
+
+ORDER_EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_orders(queryset, chunk_size):
+    """
+    Yield export dicts of the queryset's orders, with their lines as `items`.
+
+    Works for Order and ArchivedOrder querysets.
+    """
+    line_model = queryset.model._meta.get_field("items").related_model
+    datetime_field = serializers.DateTimeField()
+    rows = queryset.values_list(
+        *(
+            field + "_id" if field in ("customer", "restaurant") else field
+            for field in ORDER_EXPORT_FIELDS
+        )
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        items = {row[0]: [] for row in chunk}
+        lines = (
+            line_model.objects.filter(order__in=list(items))
+            .order_by("order", "id")
+            .values_list("order", "food", "quantity", "unit_price")
+        )
+        for order_id, food_id, quantity, unit_price in lines:
+            items[order_id].append(
+                {"food": food_id, "quantity": quantity, "unit_price": str(unit_price)}
+            )
+
+        for row in chunk:
+            order = dict(zip(ORDER_EXPORT_FIELDS, row))
+            for field in DATETIME_FIELDS:
+                if order[field] is not None:
+                    order[field] = datetime_field.to_representation(order[field])
+            if order["total"] is not None:
+                order["total"] = str(order["total"])
+            order["items"] = items[order["id"]]
+            yield order
+
+
+def iter_ndjson(orders):
+    for order in orders:
+        yield json.dumps(order) + "\n"
+
+
+class LineBuffer:
+    """
+    File-like object handing back what csv.writer writes to it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(orders):
+    """
+    Yield CSV lines; an order's lines are `food:quantity:unit_price` pairs
+    separated by semicolons in its `items` column.
+    """
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(ORDER_EXPORT_FIELDS + ("items",))
+    for order in orders:
+        items = ";".join(
+            "{food}:{quantity}:{unit_price}".format(**item) for item in order["items"]
+        )
+        yield writer.writerow(
+            [order[field] for field in ORDER_EXPORT_FIELDS] + [items]
+        )
+
+
+def stream_orders(querysets, file_format, chunk_size):
+    orders = chain.from_iterable(
+        iter_orders(queryset, chunk_size) for queryset in querysets
+    )
+    if file_format == "csv":
+        return iter_csv(orders)
+    return iter_ndjson(orders)
@@ -0,0 +1,238 @@
+import json
+from functools import reduce
+from operator import attrgetter, itemgetter, or_
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination which can also fetch its page with the async ORM.
+
+    `paginate_queryset` is split into building the page query and reading
+    its results, so `apaginate_queryset` shares everything but the fetch.
+
+    With more than one ordering field, a cursor's position holds the values
+    of all of them and a page starts strictly after that position, so the
+    last field must be unique. Positions are then never shared by two items
+    and pages never fall back to an offset.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the queryset of the requested page plus one following item.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (self.offset, self.reverse, self.current_position) = (0, False, None)
+        else:
+            (self.offset, self.reverse, self.current_position) = self.cursor
+
+        # Cursor pagination always enforces an ordering.
+        if self.reverse:
+            queryset = queryset.order_by(
+                *(
+                    order[1:] if order.startswith("-") else "-" + order
+                    for order in self.ordering
+                )
+            )
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # If we have a cursor with a fixed position then filter by that.
+        if self.current_position is not None:
+            queryset = queryset.filter(self.position_filter(self.current_position))
+
+        # Fetch an extra item to determine if there is a following page.
+        return queryset[self.offset:self.offset + self.page_size + 1]
+
+    def position_filter(self, position):
+        """
+        Return a filter for the items after ``position`` in the direction the
+        cursor reads.
+        """
+        values = self.decode_position(position)
+        conditions = []
+        for index, order in enumerate(self.ordering):
+            # Test for: (cursor reversed) XOR (field reversed)
+            lookup = "lt" if self.cursor.reverse != order.startswith("-") else "gt"
+            condition = Q(**{"{}__{}".format(order.lstrip("-"), lookup): values[index]})
+            for previous, value in zip(self.ordering[:index], values):
+                condition &= Q(**{previous.lstrip("-"): value})
+            conditions.append(condition)
+        return reduce(or_, conditions)
+
+    def decode_position(self, position):
+        if len(self.ordering) == 1:
+            return [position]
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(str(instance[name]))
+            else:
+                values.append(str(getattr(instance, name)))
+        if len(values) == 1:
+            return values[0]
+        return json.dumps(values)
+
+    def set_page(self, results):
+        """
+        Store the page out of the fetched results and work out its cursors.
+        """
+        self.page = list(results[:self.page_size])
+
+        # Determine the position of the final item following the page.
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if self.reverse:
+            # The query ordering was in reverse, so reverse the items again.
+            self.page = list(reversed(self.page))
+
+            self.has_next = (self.current_position is not None) or (self.offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = self.current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (self.current_position is not None) or (
+                self.offset > 0
+            )
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = self.current_position
+
+        # Display page controls in the browsable API if there is more
+        # than one page.
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class IdCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination over the primary key for restaurants, users and foods.
+    """
+
+    ordering = ("id",)
+
+
+class OrderCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination over (create_datetime, id), newest orders first.
+
+    Cursors hold both values of the item the page ended on, so orders
+    created within the same instant are told apart by their id and are
+    neither skipped nor repeated between pages.
+    """
+
+    ordering = ("-create_datetime", "-id")
+
+
+class CombinedQuerySet:
+    """
+    Read-only concatenation of querysets of models with the same fields.
+
+    Supports the calls cursor pagination makes. `order_by`, `filter`,
+    `values` and slicing are applied to every queryset on its own, and the
+    fetched rows are merged in Python, so the tables are never joined in one
+    query.
+    """
+
+    def __init__(self, querysets, ordering=(), bounds=(0, None)):
+        self.querysets = querysets
+        self.ordering = ordering
+        self.bounds = bounds
+
+    def order_by(self, *ordering):
+        return CombinedQuerySet(
+            [queryset.order_by(*ordering) for queryset in self.querysets], ordering
+        )
+
+    def filter(self, *args, **kwargs):
+        return CombinedQuerySet(
+            [queryset.filter(*args, **kwargs) for queryset in self.querysets],
+            self.ordering,
+        )
+
+    def values(self, *fields):
+        return CombinedQuerySet(
+            [queryset.values(*fields) for queryset in self.querysets],
+            self.ordering,
+            self.bounds,
+        )
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("CombinedQuerySet only supports slices without a step.")
+        start = key.start or 0
+        return CombinedQuerySet(
+            [queryset[:key.stop] for queryset in self.querysets],
+            self.ordering,
+            (start, key.stop),
+        )
+
+    def merge(self, results):
+        getter = itemgetter if results and isinstance(results[0], dict) else attrgetter
+        for order in reversed(self.ordering):
+            results.sort(key=getter(order.lstrip("-")), reverse=order.startswith("-"))
+        start, stop = self.bounds
+        return results[start:stop]
+
+    def __iter__(self):
+        return iter(
+            self.merge([item for queryset in self.querysets for item in queryset])
+        )
+
+    async def __aiter__(self):
+        results = []
+        for queryset in self.querysets:
+            results += [item async for item in queryset]
+        for item in self.merge(results):
+            yield item
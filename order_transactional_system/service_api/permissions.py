@@ -1,115 +1,116 @@
+from django.contrib.auth.models import User
 from rest_framework import permissions
 
-from .models import Restaurant, Food, Order
+from .models import Profile, Restaurant, Food
 
 
-class MerchantPermission(permissions.BasePermission):
-    """
-    Check if the user is a restaurant merchant.
+def load_once(request, key, loader):
     """
+    Return ``loader()``, evaluated at most once per request for ``key``.
 
-    def has_permission(self, request, view):
-        if request.user.is_staff:
-            return True
-        return request.user.profile.is_merchant
+    Permission classes and views receive the same request object, so objects
+    loaded while checking permissions are reused by the view.
+    """
+    cache = request.__dict__.setdefault("_loaded_objects", {})
+    if key not in cache:
+        cache[key] = loader()
+    return cache[key]
 
 
-class HasRestaurant(permissions.BasePermission):
+async def aload_once(request, key, loader):
     """
-    Check if the merchant has created a restaurant to manage.
+    Async version of `load_once` for loaders returning awaitables.
     """
-
-    message = "You should create a restaurant first to be able to access it's foods"
-
-    def has_permission(self, request, view):
-        return bool(Restaurant.objects.filter(merchant=request.user.pk).first())
+    cache = request.__dict__.setdefault("_loaded_objects", {})
+    if key not in cache:
+        cache[key] = await loader()
+    return cache[key]
 
 
-class IsFoodOwner(permissions.BasePermission):
+def get_merchant_restaurant_id(request):
     """
-    Check if the merchant is the owner of the food which wants to edit.
+    Return the id of the restaurant managed by the requesting merchant, or None.
+
+    Users from the principal cache carry it already.
     """
+    if hasattr(request.user, "merchant_restaurant_id"):
+        return request.user.merchant_restaurant_id
+    return load_once(
+        request,
+        "restaurant_id",
+        lambda: Restaurant.objects.filter(merchant=request.user.pk)
+        .values_list("pk", flat=True)
+        .first(),
+    )
 
-    message = "You are not the owner of this food restaurant"
 
-    def has_permission(self, request, view):
-        food = Food.objects.filter(pk=view.kwargs.get("pk", None)).first()
-        if food is None:
-            return False
-        return (
-            Restaurant.objects.filter(merchant=request.user.pk).first()
-            == food.restaurant
-        )
+async def aget_merchant_restaurant_id(request):
+    if hasattr(request.user, "merchant_restaurant_id"):
+        return request.user.merchant_restaurant_id
+    return await aload_once(
+        request,
+        "restaurant_id",
+        lambda: Restaurant.objects.filter(merchant=request.user.pk)
+        .values_list("pk", flat=True)
+        .afirst(),
+    )
 
 
-class CustomerCancellOrderPermission(permissions.BasePermission):
+def get_food(request, pk):
     """
-    Check if the customer has the permission to cancell the order.
+    Return the food with the given pk, or None.
     """
-
-    message = (
-        "You don't have permission to cancel this order."
+    return load_once(
+        request, ("food", pk), lambda: Food.objects.filter(pk=pk).first()
     )
 
-    def has_permission(self, request, view):
-        order = Order.objects.filter(pk=view.kwargs.get("pk", None)).first()
-        if order is None:
-            return False
-        return not order.is_accepted and not order.is_cancelled
-
 
-class IsCustomerOfOrder(permissions.BasePermission):
+class MerchantPermission(permissions.BasePermission):
     """
-    Check if the customer is the owner of order.
+    Check if the user is a restaurant merchant.
     """
 
-    message = "You can't cancel this order because you are not it's owner."
-
     def has_permission(self, request, view):
-        order = Order.objects.filter(customer=request.user.pk).first()
-        return order is not None
-
-
-class CustomerApproveDeliveredOrderPermission(permissions.BasePermission):
-    """
-    Check if the customer has permission to aprrove the delivered order.
-    """
-
-    message = "You can not approve this order as delivered."
+        if request.user.is_staff:
+            return True
+        # Users created outside the API, like superusers, have no profile.
+        profile = getattr(request.user, "profile", None)
+        return profile is not None and profile.is_merchant
 
-    def has_permission(self, request, view):
-        order = Order.objects.filter(pk=view.kwargs.get("pk", None)).first()
-        if order is None:
-            return False
-        return order.is_accepted and not order.is_cancelled and not order.is_delivered
+    async def ahas_permission(self, request, view):
+        if request.user.is_staff:
+            return True
+        if User.profile.is_cached(request.user):
+            return request.user.profile.is_merchant
+        return await Profile.objects.filter(
+            user=request.user.pk, is_merchant=True
+        ).aexists()
 
 
-class IsMerchantOfOrder(permissions.BasePermission):
+class HasRestaurant(permissions.BasePermission):
     """
-    Check if the merchant is the owner of order.
+    Check if the merchant has created a restaurant to manage.
     """
 
-    message = "You are not the merchant of this order."
+    message = "You should create a restaurant first to be able to access it's foods"
 
     def has_permission(self, request, view):
-        order = Order.objects.filter(pk=view.kwargs.get("pk", None)).first()
-        if order is None:
-            return False
-        food = order.foods.first()
-        if order is None or food is None:
-            return False
-        return food.restaurant.merchant.pk == request.user.pk
+        return get_merchant_restaurant_id(request) is not None
+
+    async def ahas_permission(self, request, view):
+        return await aget_merchant_restaurant_id(request) is not None
 
 
-class MerchantCancelAcceptOrderPermission(permissions.BasePermission):
+class IsFoodOwner(permissions.BasePermission):
     """
-    Check if the merchant has permission to cancell the order.
+    Check if the merchant is the owner of the food which wants to edit.
     """
 
-    message = "You don't have permission to cancel this order."
+    message = "You are not the owner of this food restaurant"
 
     def has_permission(self, request, view):
-        order = Order.objects.filter(pk=view.kwargs.get("pk", None)).first()
-        if order is None:
+        food = get_food(request, view.kwargs.get("pk", None))
+        restaurant_id = get_merchant_restaurant_id(request)
+        if food is None or restaurant_id is None:
             return False
-        return not order.is_cancelled and not order.is_accepted
+        return food.restaurant_id == restaurant_id
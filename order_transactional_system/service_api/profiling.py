@@ -0,0 +1,156 @@
+"""
+On-demand profiles of single requests and a log of slow requests.
+
+Staff users add `?profile=1` or an `X-Profile: 1` header to a request to run
+it under cProfile; the response is then replaced by a report of the top
+frames by cumulative time and every SQL query with its duration and the line
+of project code which ran it.
+
+Requests slower than SLOW_REQUEST_SECONDS are kept, with their queries and a
+summary of where the queries came from, in a ring buffer of the last
+SLOW_REQUEST_LOG_SIZE slow requests served by the process. Queries are only
+listed from the point the request became slow (``queries_after_ms``), except
+for the sampled SLOW_REQUEST_SAMPLE_RATE share of requests, listed in full.
+"""
+import cProfile
+import itertools
+import os
+import pstats
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from .authentication import get_request_user
+from .metrics import PROJECT_DIR
+
+# Frames listed in a profile report.
+PROFILE_FRAMES = 40
+
+
+def format_call_site(site):
+    if site is None:
+        return None
+    filename, line, function = site
+    return "{}:{} in {}".format(os.path.relpath(filename, PROJECT_DIR), line, function)
+
+
+def asks_for_profile(request):
+    flag = request.headers.get("X-Profile") or request.GET.get("profile")
+    return flag in ("1", "true")
+
+
+def wants_profile(request):
+    """
+    Check if a staff user asked for the request to be profiled.
+    """
+    if not asks_for_profile(request):
+        return False
+    try:
+        user = get_request_user(request)
+    except APIException:
+        return False
+    return user is not None and user.is_staff
+
+
+def summarize_queries(statements):
+    """
+    Return the recorded queries and the call sites which ran them, the
+    slowest call sites first.
+    """
+    queries = []
+    call_sites = {}
+    for sql, params, seconds, site in statements:
+        site = format_call_site(site)
+        if isinstance(params, (list, tuple)):
+            params = [None if param is None else str(param) for param in params]
+        queries.append(
+            {
+                "sql": sql,
+                "params": params,
+                "duration_ms": round(seconds * 1000, 3),
+                "call_site": site,
+            }
+        )
+        count, total = call_sites.get(site, (0, 0.0))
+        call_sites[site] = (count + 1, total + seconds)
+    call_sites = [
+        {"call_site": site, "queries": count, "duration_ms": round(total * 1000, 3)}
+        for site, (count, total) in sorted(
+            call_sites.items(), key=lambda item: item[1][1], reverse=True
+        )
+    ]
+    return queries, call_sites
+
+
+def request_report(request, response, timings, total):
+    queries, call_sites = summarize_queries(timings.statements or ())
+    match = request.resolver_match
+    return {
+        "time": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "url_name": match.url_name or match.view_name if match else None,
+        "status": response.status_code,
+        "user": getattr(getattr(request, "user", None), "pk", None),
+        "duration_ms": round(total * 1000, 3),
+        "db_ms": round(timings.db * 1000, 3),
+        "query_count": timings.queries,
+        "queries_after_ms": round(timings.record_after * 1000, 3),
+        "queries": queries,
+        "call_sites": call_sites,
+    }
+
+
+def profile_frames(profiler, limit=PROFILE_FRAMES):
+    """
+    Return the profiler's top frames by cumulative time.
+    """
+    stats = pstats.Stats(profiler).stats
+    frames = []
+    for (filename, line, function), (primitive, calls, tottime, cumtime, _) in sorted(
+        stats.items(), key=lambda item: item[1][3], reverse=True
+    )[:limit]:
+        if filename.startswith(PROJECT_DIR):
+            filename = os.path.relpath(filename, PROJECT_DIR)
+        frames.append(
+            {
+                "function": "{}:{}({})".format(filename, line, function),
+                "calls": calls,
+                "primitive_calls": primitive,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            }
+        )
+    return frames
+
+
+def run_profiled(get_response, request):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    return response, profiler
+
+
+class SlowRequestLog:
+    """
+    Reports of the last ``size`` slow requests; appending takes no lock.
+    """
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.ids = itertools.count(1)
+
+    def add(self, report):
+        report["id"] = next(self.ids)
+        self.entries.append(report)
+
+    def list(self):
+        return list(reversed(self.entries))
+
+
+slow_requests = SlowRequestLog(settings.SLOW_REQUEST_LOG_SIZE)
@@ -0,0 +1,88 @@
+"""
+Routing of safe reads to read replicas.
+
+Views opt in with `ReplicaReadMixin`, async list views with
+`read_from_replicas`. While such a view handles a GET, reads
+go to a random alias of DATABASE_REPLICAS; everything else, and every write,
+goes to the default database. After a user writes, their reads stay on the
+default database for REPLICA_PIN_SECONDS so they see their own changes
+before the replicas catch up.
+
+Pins are kept in the default cache, which is per process unless a shared
+cache backend is configured.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+def pin_cache_key(user_id):
+    return "replica_pin:{}".format(user_id)
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_cache_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(pin_cache_key(user_id), False)
+
+
+async def ais_pinned(user_id):
+    return await cache.aget(pin_cache_key(user_id), False)
+
+
+@contextmanager
+def read_from_replicas():
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and replica_reads.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the default database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Read from a replica while handling safe requests of users who have not
+    written recently. Authentication and permission checks still read from
+    the default database.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not (
+            request.user.is_authenticated and is_pinned(request.user.pk)
+        ):
+            self.replica_reads_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "replica_reads_token", None)
+        if token is not None:
+            replica_reads.reset(token)
+            self.replica_reads_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
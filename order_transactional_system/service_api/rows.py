@@ -0,0 +1,280 @@
+"""
+Serialization of list pages from `.values()` rows.
+
+Building a model instance per row and running a ModelSerializer's fields
+over it takes most of the time of a large list page. A RowSerializer is
+built once from such a serializer: the page is read with `.values()` and
+each row is mapped straight to the dict the serializer would have returned.
+Nested lists and many-to-many primary keys are read with one query per
+related table for the whole page, so an order's lines and its foods come
+out of the same query.
+
+Values the serializer's field would return unchanged (integers, strings,
+booleans and primary keys) are copied; the others, like decimals, dates and
+times, still go through the field's `to_representation`, so the rendered
+JSON stays the same.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import fields, relations, serializers
+from rest_framework.response import Response
+
+# Fields whose to_representation returns the column's value as it is.
+PLAIN_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.ChoiceField,
+    fields.IntegerField,
+)
+
+# How a field gets its value: a column of the row, a property of the model
+# evaluated on the row, or rows of a related table.
+COLUMN, PROPERTY, NESTED, PRIMARY_KEYS = range(4)
+
+
+class RowAttributes:
+    """
+    Attribute access to a row, for model properties.
+    """
+
+    __slots__ = ("row",)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getattr__(self, name):
+        try:
+            return self.row[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def is_plain(field):
+    if type(field) is relations.PrimaryKeyRelatedField:
+        return field.pk_field is None
+    return type(field) in PLAIN_FIELDS
+
+
+class RowSerializer:
+    """
+    The read-only side of a ModelSerializer instance for `.values()` rows.
+
+    Supports model fields, model properties, nested list serializers of
+    reverse foreign keys and primary keys of many-to-many fields. Nested
+    serializers may only have fields of their own model.
+    """
+
+    def __init__(self, serializer, nested=False):
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.plan = []
+        self.columns = []
+        self.relations = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            source = field.source
+            if source == "*" or "." in source:
+                raise ImproperlyConfigured(
+                    "{} of {} has an unsupported source {!r}.".format(
+                        field.field_name, type(serializer).__name__, source
+                    )
+                )
+            if isinstance(field, serializers.ListSerializer):
+                child = RowSerializer(field.child, nested=True)
+                self.relations.append((source, NESTED, child.columns))
+                self.plan.append((field.field_name, NESTED, source, child))
+            elif isinstance(field, relations.ManyRelatedField):
+                if not is_plain(field.child_relation):
+                    raise ImproperlyConfigured(
+                        "{} of {} is not a list of primary keys.".format(
+                            field.field_name, type(serializer).__name__
+                        )
+                    )
+                self.relations.append((source, PRIMARY_KEYS, ()))
+                self.plan.append((field.field_name, PRIMARY_KEYS, source, None))
+            elif not is_plain(field) and isinstance(
+                field,
+                (
+                    serializers.BaseSerializer,
+                    relations.RelatedField,
+                    fields.SerializerMethodField,
+                ),
+            ):
+                raise ImproperlyConfigured(
+                    "{} of {} cannot be read from rows.".format(
+                        field.field_name, type(serializer).__name__
+                    )
+                )
+            elif self.is_column(source):
+                convert = None if is_plain(field) else field.to_representation
+                self.columns.append(source)
+                self.plan.append((field.field_name, COLUMN, source, convert))
+            elif isinstance(getattr(self.model, source, None), property):
+                # Properties see the row, so they may use the model's columns.
+                convert = None if is_plain(field) else field.to_representation
+                getter = getattr(self.model, source).fget
+                self.plan.append((field.field_name, PROPERTY, getter, convert))
+            else:
+                raise ImproperlyConfigured(
+                    "{} of {} is not a column or property of {}.".format(
+                        field.field_name, type(serializer).__name__, self.model
+                    )
+                )
+        if nested and self.relations:
+            raise ImproperlyConfigured(
+                "Nested {} has relations of its own.".format(type(serializer).__name__)
+            )
+        if any(kind == PROPERTY for _, kind, _, _ in self.plan):
+            for field in self.model._meta.concrete_fields:
+                if field.name not in self.columns and field.attname not in self.columns:
+                    self.columns.append(field.attname)
+        if self.relations and self.pk not in self.columns:
+            self.columns.append(self.pk)
+
+    def is_column(self, source):
+        try:
+            field = self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return False
+        return field.concrete and not field.many_to_many
+
+    def values(self, queryset, *extra):
+        """
+        Return ``queryset`` reading the serializer's columns, and the
+        ``extra`` ones, as dicts.
+        """
+        columns = list(self.columns)
+        columns += [column for column in extra if column not in columns]
+        return queryset.values(*columns)
+
+    def related_querysets(self, rows, models=None):
+        """
+        Return one queryset per related table of the rows of ``models``,
+        with the relations it serves, reading all rows' related rows.
+        """
+        if not self.relations or not rows:
+            return []
+        ids = [row[self.pk] for row in rows]
+        querysets = []
+        for model in models or (self.model,):
+            # (related model, foreign key) -> [columns, relations]
+            tables = {}
+            for source, kind, columns in self.relations:
+                field = model._meta.get_field(source)
+                if kind == NESTED:
+                    related, key = field.related_model, field.field
+                    column = None
+                else:
+                    related = field.remote_field.through
+                    key = related._meta.get_field(field.m2m_field_name())
+                    column = related._meta.get_field(
+                        field.m2m_reverse_field_name()
+                    ).attname
+                    columns = (column,)
+                table = tables.setdefault((related, key), [[key.attname], []])
+                table[0] += [name for name in columns if name not in table[0]]
+                table[1].append((source, column))
+            for (related, key), (columns, served) in tables.items():
+                queryset = (
+                    related._default_manager.filter(**{key.name + "__in": ids})
+                    .order_by("pk")
+                    .values(*columns)
+                )
+                querysets.append((queryset, key.attname, served))
+        return querysets
+
+    def to_representation(self, rows, models=None):
+        """
+        Return the data of ``rows`` read from ``models``, which default to the
+        serializer's model.
+        """
+        related = [
+            (list(queryset), key, served)
+            for queryset, key, served in self.related_querysets(rows, models)
+        ]
+        return self.build(rows, related)
+
+    async def ato_representation(self, rows, models=None):
+        related = [
+            ([row async for row in queryset], key, served)
+            for queryset, key, served in self.related_querysets(rows, models)
+        ]
+        return self.build(rows, related)
+
+    def build(self, rows, related):
+        # source -> {row primary key: value}
+        values = {source: {} for source, _, _ in self.relations}
+        children = {
+            source: child for _, kind, source, child in self.plan if kind == NESTED
+        }
+        for related_rows, key, served in related:
+            groups = {}
+            for row in related_rows:
+                groups.setdefault(row[key], []).append(row)
+            for source, column in served:
+                if column is None:
+                    child = children[source]
+                    values[source].update(
+                        (pk, child.build(group, ())) for pk, group in groups.items()
+                    )
+                else:
+                    # In primary key order, like the prefetched lists were.
+                    values[source].update(
+                        (pk, sorted(row[column] for row in group))
+                        for pk, group in groups.items()
+                    )
+
+        data = []
+        for row in rows:
+            item = {}
+            attributes = None
+            for name, kind, source, convert in self.plan:
+                if kind == COLUMN:
+                    value = row[source]
+                elif kind == PROPERTY:
+                    if attributes is None:
+                        attributes = RowAttributes(row)
+                    value = source(attributes)
+                else:
+                    item[name] = values[source].get(row[self.pk], [])
+                    continue
+                if value is None or convert is None:
+                    item[name] = value
+                else:
+                    item[name] = convert(value)
+            data.append(item)
+        return data
+
+
+@lru_cache(maxsize=None)
+def row_serializer(serializer_class):
+    return RowSerializer(serializer_class())
+
+
+def queryset_models(queryset):
+    """
+    Return the models of a queryset or of the parts of a CombinedQuerySet.
+    """
+    return [part.model for part in getattr(queryset, "querysets", [queryset])]
+
+
+class RowListMixin:
+    """
+    Serve a list view's page from `.values()` rows through a RowSerializer
+    of its serializer class instead of from model instances.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = row_serializer(self.get_serializer_class())
+        ordering = getattr(self.paginator, "ordering", ())
+        rows = serializer.values(queryset, *(order.lstrip("-") for order in ordering))
+        models = queryset_models(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page, models)
+            )
+        return Response(serializer.to_representation(list(rows), models))
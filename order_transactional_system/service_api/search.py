@@ -0,0 +1,168 @@
+"""
+Full-text search over restaurants and foods backed by an SQLite FTS5 table.
+
+Restaurants are indexed on name, food type and city, foods on name. Rows are
+kept up to date by triggers on the restaurant and food tables. A restaurant's
+search rowid is ``2 * id`` and a food's is ``2 * id + 1``, so triggers and
+results map back to the source rows without an extra lookup table.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Q
+
+from .models import Restaurant, Food
+
+SEARCH_TABLE = "service_api_search"
+
+# Created in migration 0002_search_index, next to the triggers below.
+SEARCH_TRIGGERS = {
+    "service_api_restaurant_search_insert": """
+        AFTER INSERT ON service_api_restaurant BEGIN
+            INSERT INTO {table} (rowid, name, food_type, city, restaurant_id)
+            VALUES (2 * new.id, new.name, new.food_type, new.city, new.id);
+        END
+    """,
+    "service_api_restaurant_search_update": """
+        AFTER UPDATE OF name, food_type, city ON service_api_restaurant BEGIN
+            DELETE FROM {table} WHERE rowid = 2 * old.id;
+            INSERT INTO {table} (rowid, name, food_type, city, restaurant_id)
+            VALUES (2 * new.id, new.name, new.food_type, new.city, new.id);
+        END
+    """,
+    "service_api_restaurant_search_delete": """
+        AFTER DELETE ON service_api_restaurant BEGIN
+            DELETE FROM {table} WHERE rowid = 2 * old.id;
+        END
+    """,
+    "service_api_food_search_insert": """
+        AFTER INSERT ON service_api_food BEGIN
+            INSERT INTO {table} (rowid, name, food_type, city, restaurant_id)
+            VALUES (2 * new.id + 1, new.name, '', '', new.restaurant_id);
+        END
+    """,
+    "service_api_food_search_update": """
+        AFTER UPDATE OF name, restaurant_id ON service_api_food BEGIN
+            DELETE FROM {table} WHERE rowid = 2 * old.id + 1;
+            INSERT INTO {table} (rowid, name, food_type, city, restaurant_id)
+            VALUES (2 * new.id + 1, new.name, '', '', new.restaurant_id);
+        END
+    """,
+    "service_api_food_search_delete": """
+        AFTER DELETE ON service_api_food BEGIN
+            DELETE FROM {table} WHERE rowid = 2 * old.id + 1;
+        END
+    """,
+}
+
+REINDEX_SEARCH_SQL = [
+    "DELETE FROM {table}",
+    """
+    INSERT INTO {table} (rowid, name, food_type, city, restaurant_id)
+    SELECT 2 * id, name, food_type, city, id FROM service_api_restaurant
+    """,
+    """
+    INSERT INTO {table} (rowid, name, food_type, city, restaurant_id)
+    SELECT 2 * id + 1, name, '', '', restaurant_id FROM service_api_food
+    """,
+]
+
+# bm25 column weights for name, food_type, city and restaurant_id.
+SEARCH_SQL = """
+    SELECT rowid, bm25({table}, 10.0, 4.0, 2.0, 0.0) AS score
+    FROM {table}
+    WHERE {table} MATCH %s {city_filter}
+    ORDER BY score
+    LIMIT %s
+"""
+CITY_FILTER_SQL = (
+    "AND restaurant_id IN (SELECT id FROM service_api_restaurant WHERE city = %s)"
+)
+
+
+def restore_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Recreate missing search triggers and reindex if any were missing.
+
+    Connected to post_migrate: SQLite drops a table's triggers when a
+    migration rebuilds it. Does nothing on other database vendors or before
+    the search migration ran.
+    """
+    db = connections[using]
+    if db.vendor != "sqlite":
+        return
+    tables = {SEARCH_TABLE, Restaurant._meta.db_table, Food._meta.db_table}
+    if not tables.issubset(db.introspection.table_names()):
+        return
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        missing = SEARCH_TRIGGERS.keys() - {name for name, in cursor.fetchall()}
+        for name, sql in SEARCH_TRIGGERS.items():
+            cursor.execute(
+                "CREATE TRIGGER IF NOT EXISTS {} {}".format(
+                    name, sql.format(table=SEARCH_TABLE)
+                )
+            )
+        if missing:
+            for sql in REINDEX_SEARCH_SQL:
+                cursor.execute(sql.format(table=SEARCH_TABLE))
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query matching every word as a prefix.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join('"{}"*'.format(word) for word in words)
+
+
+def search(query, city=None, limit=20):
+    """
+    Return (kind, id, score) of the best matches, best first, where kind is
+    "restaurant" or "food". Lower scores are better.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    connection = connections[router.db_for_read(Restaurant) or DEFAULT_DB_ALIAS]
+    if connection.vendor != "sqlite":
+        return search_unindexed(query, city, limit)
+    params = [expression]
+    city_filter = ""
+    if city:
+        city_filter = CITY_FILTER_SQL
+        params.append(city)
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SEARCH_SQL.format(table=SEARCH_TABLE, city_filter=city_filter), params
+        )
+        rows = cursor.fetchall()
+    return [
+        ("food" if rowid % 2 else "restaurant", rowid // 2, score)
+        for rowid, score in rows
+    ]
+
+
+def search_unindexed(query, city=None, limit=20):
+    """
+    Unranked substring search for databases without FTS5.
+    """
+    restaurants = Restaurant.objects.filter(
+        Q(name__icontains=query)
+        | Q(food_type__icontains=query)
+        | Q(city__icontains=query)
+    )
+    foods = Food.objects.filter(name__icontains=query)
+    if city:
+        restaurants = restaurants.filter(city=city)
+        foods = foods.filter(restaurant__city=city)
+    hits = [
+        ("restaurant", pk, 0.0)
+        for pk in restaurants.values_list("pk", flat=True)[:limit]
+    ]
+    hits += [
+        ("food", pk, 0.0)
+        for pk in foods.values_list("pk", flat=True)[: limit - len(hits)]
+    ]
+    return hits
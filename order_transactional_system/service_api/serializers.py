@@ -1,7 +1,14 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Profile, Restaurant, Food, Order
+from .analytics import record_order_placed
+from .authentication import revoke_user_tokens
+from .models import Profile, Restaurant, Food, Order, OrderItem, OrderStatus
+from .order_export import ORDER_EXPORT_FORMATS
 
 
 class LoginSerializer(serializers.ModelSerializer):
@@ -39,6 +46,10 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = ("phone_number", "city", "is_merchant")
 
 
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+
 class UserSerializer(serializers.ModelSerializer):
     profile = ProfileSerializer()
 
@@ -96,19 +107,51 @@ class UserSerializer(serializers.ModelSerializer):
 
         profile.save()
 
+        revoke_user_tokens(instance.pk)
+
         return instance
 
 
 class RestaurantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Restaurant
-        fields = "__all__"
+        exclude = ("geohash", "open_minute", "close_minute")
+
+
+class RestaurantFilterSerializer(serializers.Serializer):
+    city = serializers.CharField(required=False)
+    open_now = serializers.BooleanField(required=False, default=False)
+    open_at = serializers.TimeField(required=False)
+
+
+class NearbyRestaurantSerializer(RestaurantSerializer):
+    distance = serializers.FloatField(read_only=True)
+
+
+class NearbyRestaurantQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    # Kilometers
+    radius = serializers.FloatField(
+        min_value=0, max_value=100, required=False, default=5
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, required=False, default=20
+    )
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField()
+    city = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, required=False, default=20
+    )
 
 
 class CreateRestaurantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Restaurant
-        fields = "__all__"
+        exclude = ("geohash", "open_minute", "close_minute")
         extra_kwargs = {"merchant": {"read_only": True}}
 
 
@@ -118,49 +161,172 @@ class FoodSerializer(serializers.ModelSerializer):
         fields = "__all__"
         extra_kwargs = {"restaurant": {"read_only": True}}
 
+    def save(self, **kwargs):
+        if "name" not in self.validated_data:
+            return super().save(**kwargs)
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"name": ["The restaurant already has a food with this name."]}
+            )
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    # Foods are looked up in bulk by PlaceOrderSerializer.validate instead of
+    # one query per item by a related field.
+    food = serializers.IntegerField(source="food_id")
+
+    class Meta:
+        model = OrderItem
+        fields = ("food", "quantity", "unit_price")
+        extra_kwargs = {"unit_price": {"read_only": True}}
+
+
+MENU_IMPORT_FORMATS = ("csv", "ndjson")
+MENU_IMPORT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}
+
+
+class FoodImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    # Taken from the file extension when not given.
+    type = serializers.ChoiceField(choices=MENU_IMPORT_FORMATS, required=False)
+
+    def validate(self, data):
+        if "type" not in data:
+            extension = data["file"].name.rsplit(".", 1)[-1].lower()
+            if extension not in MENU_IMPORT_EXTENSIONS:
+                raise serializers.ValidationError(
+                    "Set type to {} for this file.".format(
+                        " or ".join(MENU_IMPORT_FORMATS)
+                    )
+                )
+            data["type"] = MENU_IMPORT_EXTENSIONS[extension]
+        return data
+
 
 class PlaceOrderSerializer(serializers.ModelSerializer):
+    is_accepted = serializers.BooleanField(read_only=True)
+    is_cancelled = serializers.BooleanField(read_only=True)
+    is_delivered = serializers.BooleanField(read_only=True)
+    items = OrderItemSerializer(many=True, allow_empty=False)
+
     class Meta:
         model = Order
         fields = "__all__"
         extra_kwargs = {
             "customer": {"read_only": True},
-            "is_accepted": {"read_only": True},
-            "is_cancelled": {"read_only": True},
-            "is_delivered": {"read_only": True},
+            "restaurant": {"read_only": True},
+            "status": {"read_only": True},
             "accept_datetime": {"read_only": True},
             "cancell_datetime": {"read_only": True},
             "delivered_datetime": {"read_only": True},
             "time_to_deliver": {"read_only": True},
+            "total": {"read_only": True},
         }
 
     def validate(self, data):
         """
-        Check all ordered foods to be from one restaurants.
+        Check all ordered foods exist and are from one restaurant, and
+        snapshot their current prices into the order lines.
         """
-        food_list = data["foods"]
-        restaurant_id = food_list[0].restaurant.pk
-        for food in food_list:
-            if food.restaurant.pk != restaurant_id:
-                raise serializers.ValidationError(
-                    "All ordered foods should be from one restaurant."
-                )
+        quantities = {}
+        for item in data["items"]:
+            food_id = item["food_id"]
+            quantities[food_id] = quantities.get(food_id, 0) + item.get("quantity", 1)
+
+        foods = Food.objects.in_bulk(list(quantities))
+        missing = sorted(set(quantities) - set(foods))
+        if missing:
+            raise serializers.ValidationError(
+                "Foods {} do not exist.".format(missing)
+            )
+        restaurant_ids = {food.restaurant_id for food in foods.values()}
+        if len(restaurant_ids) > 1:
+            raise serializers.ValidationError(
+                "All ordered foods should be from one restaurant."
+            )
+
+        data["items"] = [
+            OrderItem(
+                food_id=food_id, quantity=quantity, unit_price=foods[food_id].price
+            )
+            for food_id, quantity in quantities.items()
+        ]
+        data["restaurant_id"] = restaurant_ids.pop()
+        data["total"] = sum(item.unit_price * item.quantity for item in data["items"])
         return data
 
+    def create(self, validated_data):
+        items = validated_data.pop("items")
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+            record_order_placed(order, items)
+        return order
+
 
 class CancellOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = ("is_cancelled",)
+        fields = ("status", "is_cancelled",)
+        read_only_fields = ("status",)
 
 
 class ApproveDeliveredOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = ("is_delivered",)
+        fields = ("status", "is_delivered",)
+        read_only_fields = ("status",)
 
 
 class AcceptOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = ("is_accepted", "time_to_deliver",)
+        fields = ("status", "is_accepted", "time_to_deliver",)
+        read_only_fields = ("status",)
+
+
+class BulkOrderTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500
+    )
+    action = serializers.ChoiceField(choices=("accept", "cancel"))
+    time_to_deliver = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if "time_to_deliver" in data and data["action"] != "accept":
+            raise serializers.ValidationError(
+                "time_to_deliver can only be set when accepting orders."
+            )
+        return data
+
+
+class OrderExportQuerySerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=ORDER_EXPORT_FORMATS, default="ndjson")
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    status = serializers.ChoiceField(choices=OrderStatus.choices, required=False)
+
+    def validate(self, data):
+        if "since" in data and "until" in data and data["since"] > data["until"]:
+            raise serializers.ValidationError("since should not be after until.")
+        return data
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    # Default to the 30 days up to today.
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+
+    def validate(self, data):
+        data.setdefault("until", timezone.localdate())
+        data.setdefault("since", data["until"] - timedelta(days=29))
+        if data["since"] > data["until"]:
+            raise serializers.ValidationError("since should not be after until.")
+        if (data["until"] - data["since"]).days >= 366:
+            raise serializers.ValidationError("Ask for at most 366 days at once.")
+        return data
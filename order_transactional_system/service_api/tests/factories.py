@@ -0,0 +1,57 @@
+"""
+Shortcuts creating the users, restaurants, foods and orders tests run on.
+"""
+from datetime import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+
+from service_api.models import Food, Order, OrderItem, OrderStatus, Profile, Restaurant
+
+
+def make_user(username, is_merchant=False, is_staff=False, city="Berlin"):
+    user = User.objects.create_user(
+        username=username,
+        password="password",
+        first_name=username,
+        last_name="test",
+        is_staff=is_staff,
+    )
+    Profile.objects.create(user=user, city=city, is_merchant=is_merchant)
+    return user
+
+
+def make_restaurant(merchant, **fields):
+    fields = {
+        "name": "Pizza {}".format(merchant.username),
+        "food_type": "Pizza",
+        "city": "Berlin",
+        "address": "Test street 1",
+        "open_time": time(0, 0),
+        "close_time": time(23, 59),
+        "lat": Decimal("52.520000"),
+        "long": Decimal("13.405000"),
+        **fields,
+    }
+    return Restaurant.objects.create(merchant=merchant, **fields)
+
+
+def make_food(restaurant, name="Margherita", price="8.00"):
+    return Food.objects.create(restaurant=restaurant, name=name, price=Decimal(price))
+
+
+def make_order(customer, food, quantity=1, status=OrderStatus.PLACED, **fields):
+    """
+    Create an order of ``quantity`` times ``food``.
+    """
+    order = Order.objects.create(
+        customer=customer,
+        restaurant=food.restaurant,
+        status=status,
+        total=food.price * quantity,
+        **fields,
+    )
+    OrderItem.objects.create(
+        order=order, food=food, quantity=quantity, unit_price=food.price
+    )
+    return order
@@ -0,0 +1,187 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from service_api.analytics import ROLLUP_COUNTERS, rebuild_rollups
+from service_api.archive import archive_orders
+from service_api.models import (
+    ArchivedOrder,
+    FoodDailyStats,
+    Order,
+    RestaurantDailyStats,
+)
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+class AnalyticsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        restaurant = make_restaurant(cls.merchant)
+        cls.pizza = make_food(restaurant, "Pizza", "8.50")
+        cls.salad = make_food(restaurant, "Salad", "4.25")
+
+    def place(self, *items):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            reverse("customer_new_order"),
+            {
+                "items": [
+                    {"food": food.pk, "quantity": quantity} for food, quantity in items
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data["id"]
+
+    def put(self, user, name, order, data=None):
+        self.client.force_authenticate(user)
+        response = self.client.put(
+            reverse(name, kwargs={"pk": order}), data or {}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def place_and_move_orders(self):
+        delivered = self.place((self.pizza, 2), (self.salad, 1))
+        cancelled = self.place((self.pizza, 1))
+        accepted = self.place((self.salad, 1))
+        self.put(
+            self.merchant, "merchant_accept_order", delivered, {"time_to_deliver": 20}
+        )
+        self.put(self.customer, "customer_approve_delivered_order", delivered)
+        self.put(self.customer, "customer_cancel_order", cancelled)
+        self.client.force_authenticate(self.merchant)
+        response = self.client.post(
+            reverse("merchant_bulk_transition_orders"),
+            {"ids": [accepted], "action": "accept", "time_to_deliver": 30},
+            format="json",
+        )
+        self.assertEqual(response.data["applied"], [accepted])
+
+    def get_analytics(self, **params):
+        self.client.force_authenticate(self.merchant)
+        return self.client.get(reverse("merchant_analytics"), params)
+
+    def rollups(self):
+        return (
+            list(
+                RestaurantDailyStats.objects.order_by("restaurant", "day").values(
+                    "restaurant", "day", *ROLLUP_COUNTERS
+                )
+            ),
+            list(
+                FoodDailyStats.objects.order_by("food", "day").values(
+                    "restaurant", "day", "food", "quantity", "revenue"
+                )
+            ),
+        )
+
+    def test_rollups_follow_the_orders(self):
+        self.place_and_move_orders()
+        response = self.get_analytics()
+        self.assertEqual(response.status_code, 200, response.data)
+        today = timezone.localdate()
+        self.assertEqual(
+            (response.data["since"], response.data["until"]),
+            (today - timedelta(days=29), today),
+        )
+        totals = response.data["totals"]
+        self.assertEqual(
+            {field: totals[field] for field in ("orders", "accepted", "cancelled")},
+            {"orders": 3, "accepted": 2, "cancelled": 1},
+        )
+        self.assertEqual((totals["delivered"], totals["revenue"]), (1, "21.25"))
+        self.assertAlmostEqual(totals["cancellation_rate"], 1 / 3)
+        self.assertGreaterEqual(totals["average_accept_seconds"], 0)
+        self.assertEqual([day["day"] for day in response.data["days"]], [today])
+        self.assertEqual(
+            response.data["top_foods"],
+            [
+                {
+                    "food": self.pizza.pk,
+                    "name": "Pizza",
+                    "quantity": 3,
+                    "revenue": "17.00",
+                },
+                {
+                    "food": self.salad.pk,
+                    "name": "Salad",
+                    "quantity": 2,
+                    "revenue": "4.25",
+                },
+            ],
+        )
+
+    def test_food_revenue_counts_delivered_orders(self):
+        self.place_and_move_orders()
+        food_revenue = FoodDailyStats.objects.aggregate(revenue=Sum("revenue"))
+        restaurant_revenue = RestaurantDailyStats.objects.aggregate(
+            revenue=Sum("revenue")
+        )
+        self.assertEqual(food_revenue, restaurant_revenue)
+
+    def test_placement_writes_the_rollups_in_constant_queries(self):
+        restaurant = self.pizza.restaurant
+        foods = [make_food(restaurant, "Food {}".format(index)) for index in range(10)]
+        counts = []
+        for items in (foods[:1], foods):
+            with CaptureQueriesContext(connection) as queries:
+                self.place(*((food, 1) for food in items))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(
+            FoodDailyStats.objects.filter(food=foods[0]).get().quantity, 2
+        )
+
+    def test_rollups_are_written_with_the_order(self):
+        with mock.patch(
+            "service_api.analytics.add_to_rollups", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.place((self.pizza, 1))
+        self.assertFalse(Order.objects.exists())
+
+    def test_rebuild_matches_the_recorded_rollups(self):
+        self.place_and_move_orders()
+        recorded = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), recorded)
+        # Archived orders still count.
+        list(archive_orders(timezone.now() + timedelta(days=1), 10))
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        stdout = StringIO()
+        call_command("rebuild_analytics", stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "Rebuilt 1 restaurant days.\n")
+        self.assertEqual(self.rollups(), recorded)
+
+    def test_days_outside_the_range_are_left_out(self):
+        self.place((self.pizza, 1))
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        response = self.get_analytics(since=tomorrow, until=tomorrow)
+        self.assertEqual(response.data["days"], [])
+        self.assertEqual(response.data["top_foods"], [])
+        self.assertEqual(response.data["totals"]["orders"], 0)
+        self.assertIsNone(response.data["totals"]["average_accept_seconds"])
+
+    def test_invalid_ranges(self):
+        for params in (
+            {"since": "2024-02-01", "until": "2024-01-01"},
+            {"since": "2022-12-31", "until": "2024-01-01"},
+        ):
+            response = self.get_analytics(**params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_customers_are_refused(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse("merchant_analytics"))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,149 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from service_api.archive import (
+    archivable_orders,
+    archive_orders,
+    combine_order_history,
+)
+from service_api.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Order,
+    OrderItem,
+    OrderStatus,
+)
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+class ArchiveTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        cls.food = make_food(make_restaurant(cls.merchant))
+        now = timezone.now()
+        cls.cutoff = now - timedelta(days=7)
+        old = now - timedelta(days=10)
+        cls.old_delivered = make_order(
+            cls.customer,
+            cls.food,
+            quantity=2,
+            status=OrderStatus.DELIVERED,
+            accept_datetime=old,
+            delivered_datetime=old,
+            time_to_deliver=30,
+        )
+        cls.old_cancelled = make_order(
+            cls.customer, cls.food, status=OrderStatus.CANCELLED, cancell_datetime=old
+        )
+        cls.recent_delivered = make_order(
+            cls.customer,
+            cls.food,
+            status=OrderStatus.DELIVERED,
+            delivered_datetime=now - timedelta(days=1),
+        )
+        # Orders still in flight stay however old they are.
+        cls.accepted = make_order(
+            cls.customer, cls.food, status=OrderStatus.ACCEPTED, accept_datetime=old
+        )
+        Order.objects.filter(
+            pk__in=[cls.old_delivered.pk, cls.old_cancelled.pk, cls.accepted.pk]
+        ).update(create_datetime=old)
+        cls.archived = [cls.old_delivered.pk, cls.old_cancelled.pk]
+
+    def test_archivable_orders(self):
+        self.assertEqual(
+            sorted(archivable_orders(self.cutoff).values_list("pk", flat=True)),
+            self.archived,
+        )
+
+    def test_archivable_orders_are_found_by_index(self):
+        plan = archivable_orders(self.cutoff).order_by("pk")[:10].explain()
+        self.assertIn("order_status_delivered_idx", plan)
+        self.assertIn("order_status_cancelled_idx", plan)
+
+    def test_orders_are_moved_in_batches(self):
+        before = Order.objects.filter(pk__in=self.archived).values()
+        before = {order["id"]: order for order in before}
+        self.assertEqual(list(archive_orders(self.cutoff, 1)), [1, 1])
+        self.assertEqual(list(archive_orders(self.cutoff, 1)), [])
+
+        self.assertFalse(Order.objects.filter(pk__in=self.archived).exists())
+        self.assertFalse(OrderItem.objects.filter(order__in=self.archived).exists())
+        for order in ArchivedOrder.objects.values():
+            self.assertEqual(order, before[order["id"]])
+        self.assertEqual(
+            list(
+                ArchivedOrderItem.objects.order_by("order").values_list(
+                    "order", "food", "quantity", "unit_price"
+                )
+            ),
+            [
+                (self.old_delivered.pk, self.food.pk, 2, self.food.price),
+                (self.old_cancelled.pk, self.food.pk, 1, self.food.price),
+            ],
+        )
+        self.assertEqual(
+            set(Order.objects.values_list("pk", flat=True)),
+            {self.recent_delivered.pk, self.accepted.pk},
+        )
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command(
+            "archive_orders", older_than=7, batch_size=1, verbosity=2, stdout=stdout
+        )
+        self.assertEqual(
+            stdout.getvalue(),
+            "Archived 1 orders...\nArchived 2 orders...\nArchived 2 orders.\n",
+        )
+
+    def test_history_lists_include_archived_orders(self):
+        list(archive_orders(self.cutoff, 10))
+        for user, name, expected in (
+            (
+                self.customer,
+                "customer_delivered_order",
+                [self.recent_delivered.pk, self.old_delivered.pk],
+            ),
+            (self.customer, "customer_cancelled_orders", [self.old_cancelled.pk]),
+            (
+                self.merchant,
+                "merchant_delivered_orders",
+                [self.recent_delivered.pk, self.old_delivered.pk],
+            ),
+            (self.merchant, "merchant_cancelled_orders", [self.old_cancelled.pk]),
+        ):
+            self.client.force_authenticate(user)
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200, response.data)
+                results = response.data["results"]
+                self.assertEqual([order["id"] for order in results], expected)
+                self.assertEqual(results[-1]["items"][0]["food"], self.food.pk)
+
+    def test_combined_history_prefetches_both_stores(self):
+        list(archive_orders(self.cutoff, 10))
+        orders = combine_order_history(
+            Order.objects.all(),
+            prefetch_related=("items",),
+            customer=self.customer,
+            status=OrderStatus.DELIVERED,
+        ).order_by("-create_datetime", "-id")
+        with CaptureQueriesContext(connection) as queries:
+            items = [[item.quantity for item in order.items.all()] for order in orders]
+        self.assertEqual(items, [[1], [2]])
+        self.assertEqual(len(queries), 4)
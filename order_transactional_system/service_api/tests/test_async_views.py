@@ -0,0 +1,117 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api import async_views
+from service_api.authentication import issue_tokens, load_principal
+from service_api.models import OrderStatus
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+ASYNC_VIEWS = {
+    "restaurants": async_views.AsyncRestaurantList,
+    "customer_active_orders": async_views.AsyncCustomerActiveOrderList,
+    "customer_cancelled_orders": async_views.AsyncCustomerCancelledOrderList,
+    "customer_delivered_order": async_views.AsyncCustomerDeliveredOrderList,
+    "merchant_active_orders": async_views.AsyncMerchantActiveOrderList,
+    "merchant_cancelled_orders": async_views.AsyncMerchantCancelledOrderList,
+    "merchant_delivered_orders": async_views.AsyncMerchantDeliveredOrderList,
+}
+
+
+class AsyncViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        food = make_food(make_restaurant(cls.merchant))
+        make_restaurant(make_user("other", is_merchant=True), city="Hamburg")
+        for status in OrderStatus.values:
+            for _ in range(3):
+                make_order(cls.customer, food, status=status)
+
+    def setUp(self):
+        # Tokens are issued from cached principals of this test's users.
+        self.addCleanup(cache.clear)
+
+    def get_async(self, view, url, user=None):
+        """
+        Return the status and JSON of an async view's response.
+        """
+        headers = {}
+        if user is not None:
+            token = issue_tokens(load_principal(user.pk))["access"]
+            headers["Authorization"] = "Bearer {}".format(token)
+        request = AsyncRequestFactory().get(url, headers=headers)
+        request.session = SessionStore()
+        response = async_to_sync(view)(request)
+        return response.status_code, json.loads(response.content)
+
+    def get_sync(self, url, user=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        return response.status_code, json.loads(response.content)
+
+    def test_lists_match_the_sync_views(self):
+        for name, view in ASYNC_VIEWS.items():
+            user = self.merchant if name.startswith("merchant") else self.customer
+            url = reverse(name) + "?page_size=2"
+            with self.subTest(name=name):
+                while url:
+                    status, data = self.get_async(view.as_view(), url, user)
+                    self.assertEqual(status, 200, data)
+                    self.assertEqual((status, data), self.get_sync(url, user))
+                    self.assertLessEqual(len(data["results"]), 2)
+                    url = data["next"]
+
+    def test_restaurant_filters(self):
+        view = async_views.AsyncRestaurantList.as_view()
+        status, data = self.get_async(view, reverse("restaurants") + "?city=Hamburg")
+        self.assertEqual([item["city"] for item in data["results"]], ["Hamburg"])
+        status, data = self.get_async(view, reverse("restaurants") + "?open_at=25:00")
+        self.assertEqual(status, 400)
+        self.assertIn("open_at", data)
+
+    def test_permissions_match_the_sync_views(self):
+        merchant_without_restaurant = make_user("new", is_merchant=True)
+        for name, user in (
+            ("customer_active_orders", None),
+            ("merchant_active_orders", None),
+            ("merchant_active_orders", self.customer),
+            ("merchant_cancelled_orders", merchant_without_restaurant),
+        ):
+            with self.subTest(name=name, user=user):
+                view = ASYNC_VIEWS[name].as_view()
+                status, data = self.get_async(view, reverse(name), user)
+                self.assertEqual(status, 403)
+                self.assertEqual((status, data), self.get_sync(reverse(name), user))
+
+    def test_failed_tokens_are_challenged_like_the_sync_views(self):
+        url = reverse("customer_active_orders")
+        request = AsyncRequestFactory().get(
+            url, headers={"Authorization": "Bearer forged"}
+        )
+        request.session = SessionStore()
+        view = ASYNC_VIEWS["customer_active_orders"].as_view()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer forged")
+        for response in (async_to_sync(view)(request), self.client.get(url)):
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response["WWW-Authenticate"], "Bearer")
+            self.assertEqual(
+                json.loads(response.content), {"detail": "Invalid token."}
+            )
+
+    def test_homepage(self):
+        status, data = self.get_async(async_views.AsyncApiHomepage, "/")
+        self.assertEqual(status, 200)
+        self.assertEqual(data["restaurants"], "http://testserver/restaurants/")
+        self.assertIn("customer_active_orders", data)
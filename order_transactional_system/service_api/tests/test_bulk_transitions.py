@@ -0,0 +1,94 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Order, OrderStatus
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+class BulkOrderTransitionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        cls.food = make_food(make_restaurant(cls.merchant))
+        other = make_user("other", is_merchant=True)
+        cls.other_food = make_food(make_restaurant(other))
+
+    def setUp(self):
+        self.client.force_authenticate(self.merchant)
+
+    def post(self, data):
+        response = self.client.post(
+            reverse("merchant_bulk_transition_orders"), data, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_report(self):
+        placed = [make_order(self.customer, self.food) for _ in range(3)]
+        accepted = make_order(self.customer, self.food, status=OrderStatus.ACCEPTED)
+        foreign = make_order(self.customer, self.other_food)
+        ids = [order.pk for order in placed] + [accepted.pk, foreign.pk, 999]
+
+        report = self.post({"ids": ids, "action": "accept", "time_to_deliver": 45})
+        self.assertEqual(report["applied"], sorted(order.pk for order in placed))
+        self.assertEqual(
+            report["skipped"],
+            [
+                {
+                    "id": accepted.pk,
+                    "reason": "You don't have permission to accept this order.",
+                },
+                {"id": foreign.pk, "reason": "You are not the merchant of this order."},
+                {"id": 999, "reason": "You are not the merchant of this order."},
+            ],
+        )
+        orders = Order.objects.filter(pk__in=report["applied"])
+        self.assertEqual(
+            set(orders.values_list("status", "time_to_deliver")),
+            {(OrderStatus.ACCEPTED, 45)},
+        )
+        self.assertFalse(orders.filter(accept_datetime=None).exists())
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, OrderStatus.PLACED)
+
+    def test_orders_changed_by_earlier_requests_are_not_reported_applied(self):
+        order = make_order(self.customer, self.food)
+        # The customer cancels first; the merchant's bulk cancel changed nothing.
+        Order.objects.filter(pk=order.pk).transition("cancel")
+        report = self.post({"ids": [order.pk], "action": "cancel"})
+        self.assertEqual(report["applied"], [])
+        self.assertEqual(
+            report["skipped"][0]["reason"],
+            "You don't have permission to cancel this order.",
+        )
+
+    def test_repeated_requests_apply_once(self):
+        order = make_order(self.customer, self.food)
+        data = {"ids": [order.pk], "action": "cancel"}
+        self.assertEqual(self.post(data)["applied"], [order.pk])
+        self.assertEqual(self.post(data)["applied"], [])
+
+    def test_invalid_requests(self):
+        url = reverse("merchant_bulk_transition_orders")
+        for data in (
+            {"ids": [], "action": "accept"},
+            {"ids": [1], "action": "deliver"},
+            {"ids": [1], "action": "cancel", "time_to_deliver": 10},
+        ):
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_customers_are_refused(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            reverse("merchant_bulk_transition_orders"),
+            {"ids": [1], "action": "cancel"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,73 @@
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from service_api.db import configure_sqlite
+
+
+class SQLiteTuningTests(SimpleTestCase):
+    def open_connection(self):
+        """
+        Open a connection to a new SQLite file, which sends connection_created.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        default = connections["default"]
+        wrapper = default.__class__(
+            dict(default.settings_dict, NAME=str(Path(directory.name) / "db")),
+            alias="tuning",
+        )
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragmas(self, wrapper):
+        with wrapper.cursor() as cursor:
+            values = {}
+            for pragma in settings.SQLITE_PRAGMAS:
+                cursor.execute("PRAGMA {}".format(pragma))
+                values[pragma] = cursor.fetchone()[0]
+        return values
+
+    def test_new_connections_are_tuned(self):
+        self.assertEqual(
+            self.pragmas(self.open_connection()),
+            {
+                "journal_mode": "wal",
+                # NORMAL and MEMORY.
+                "synchronous": 1,
+                "busy_timeout": 5000,
+                "mmap_size": 268435456,
+                "cache_size": -65536,
+                "temp_store": 2,
+            },
+        )
+
+    @override_settings(SQLITE_TUNING=False)
+    def test_tuning_can_be_turned_off(self):
+        pragmas = self.pragmas(self.open_connection())
+        self.assertEqual(pragmas["journal_mode"], "delete")
+        self.assertEqual(pragmas["synchronous"], 2)
+
+    @override_settings(SQLITE_PRAGMAS={"cache_size": -1024})
+    def test_pragmas_come_from_the_settings(self):
+        wrapper = self.open_connection()
+        self.assertEqual(self.pragmas(wrapper), {"cache_size": -1024})
+
+    def test_other_databases_are_left_alone(self):
+        class Connection:
+            vendor = "postgresql"
+
+            def cursor(self):
+                raise AssertionError("PRAGMAs sent to PostgreSQL.")
+
+        configure_sqlite(sender=None, connection=Connection())
+
+    def test_connections_are_kept_open(self):
+        self.assertEqual(
+            settings.DATABASES["default"]["CONN_MAX_AGE"], settings.DB_CONN_MAX_AGE
+        )
+        self.assertGreater(settings.DB_CONN_MAX_AGE, 0)
@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.menu_cache import (
+    bump_menu_version,
+    get_menu_cache,
+    get_menu_version,
+    menu_cache_key,
+)
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+class MenuVersionTests(APITestCase):
+    def setUp(self):
+        get_menu_cache().clear()
+
+    def test_bumps_change_the_keys(self):
+        key = menu_cache_key(1, "/menu/")
+        self.assertEqual(menu_cache_key(1, "/menu/"), key)
+        bump_menu_version(1)
+        self.assertNotEqual(menu_cache_key(1, "/menu/"), key)
+        self.assertNotEqual(menu_cache_key(1, "/menu/?page_size=5"), key)
+
+    def test_versions_keep_growing_after_eviction(self):
+        version = get_menu_version(1)
+        bump_menu_version(1)
+        self.assertGreater(get_menu_version(1), version)
+        get_menu_cache().clear()
+        self.assertGreater(get_menu_version(1), version + 1)
+        bump_menu_version(2)
+        self.assertGreater(get_menu_version(2), version)
+
+
+class MenuCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.restaurant = make_restaurant(cls.merchant)
+        cls.food = make_food(cls.restaurant)
+
+    def setUp(self):
+        get_menu_cache().clear()
+
+    def names_and_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        names = [(item["name"], item["price"]) for item in response.data["results"]]
+        return names, len(queries)
+
+    def test_hot_menus_are_served_without_queries(self):
+        url = reverse("restaurant_menu", kwargs={"pk": self.restaurant.pk})
+        names, queries = self.names_and_queries(url)
+        self.assertEqual(names, [("Margherita", "8.00")])
+        self.assertGreater(queries, 0)
+        self.assertEqual(self.names_and_queries(url), (names, 0))
+
+    def test_food_writes_invalidate_the_menus(self):
+        self.client.login(username="merchant", password="password")
+        menu = reverse("restaurant_menu", kwargs={"pk": self.restaurant.pk})
+        merchant_menu = reverse("merchant_create_new_food_list")
+        self.names_and_queries(menu)
+        self.names_and_queries(merchant_menu)
+
+        response = self.client.patch(
+            reverse("merchant_update_food_list", kwargs={"pk": self.food.pk}),
+            {"price": "9.50"},
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        for url in (menu, merchant_menu):
+            self.assertEqual(self.names_and_queries(url)[0], [("Margherita", "9.50")])
+
+        response = self.client.post(
+            merchant_menu, {"name": "Marinara", "price": "7.00"}
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        for url in (menu, merchant_menu):
+            self.assertEqual(
+                sorted(self.names_and_queries(url)[0]),
+                [("Margherita", "9.50"), ("Marinara", "7.00")],
+            )
+
+    def test_other_restaurants_keep_their_menus(self):
+        other = make_restaurant(make_user("other", is_merchant=True))
+        make_food(other, "Calzone")
+        url = reverse("restaurant_menu", kwargs={"pk": other.pk})
+        self.names_and_queries(url)
+        bump_menu_version(self.restaurant.pk)
+        self.assertEqual(self.names_and_queries(url), ([("Calzone", "8.00")], 0))
@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Food
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+class MenuImportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.restaurant = make_restaurant(cls.merchant)
+        cls.margherita = make_food(cls.restaurant, "Margherita", "8.00")
+        # Foods of other restaurants keep their names and prices.
+        make_food(make_restaurant(make_user("other", is_merchant=True)), "Marinara")
+
+    def setUp(self):
+        self.client.force_authenticate(self.merchant)
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            reverse("merchant_import_foods"),
+            {"file": SimpleUploadedFile(name, content), **data},
+            format="multipart",
+        )
+
+    def menu(self):
+        return dict(
+            Food.objects.filter(restaurant=self.restaurant).values_list("name", "price")
+        )
+
+    def test_csv_creates_and_updates_foods_by_name(self):
+        response = self.upload(
+            "menu.csv",
+            b"name,price\n"
+            b"Margherita,9.00\n"
+            b"Marinara,7.50\n"
+            b"Calzone,\n"
+            b"Marinara,7.00\n",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3])
+        self.assertIn("price", response.data["errors"][0]["errors"])
+        self.assertEqual(
+            self.menu(),
+            {"Margherita": Decimal("9.00"), "Marinara": Decimal("7.00")},
+        )
+        self.assertEqual(Food.objects.filter(name="Marinara").count(), 2)
+
+    def test_ndjson_records(self):
+        response = self.upload(
+            "menu.jsonl",
+            b'{"name": "Calzone", "price": "10.00"}\n'
+            b"\n"
+            b"not json\n"
+            b'["Calzone", "10.00"]\n'
+            b'{"name": "Margherita", "price": "8.50"}\n',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(
+            response.data["errors"],
+            [
+                {"row": 2, "errors": {"non_field_errors": ["Invalid record."]}},
+                {"row": 3, "errors": {"non_field_errors": ["Invalid record."]}},
+            ],
+        )
+        self.assertEqual(self.margherita.pk, Food.objects.get(name="Margherita").pk)
+
+    def test_undecodable_records_are_reported(self):
+        invalid = {"non_field_errors": ["Record is not valid UTF-8."]}
+        response = self.upload(
+            "menu.csv", b"name,price\nCaf\xe9,3.00\nCr\xc3\xaape,4.00\n"
+        )
+        self.assertEqual(response.data["errors"], [{"row": 1, "errors": invalid}])
+        self.assertIn("Crêpe", self.menu())
+        self.assertEqual(len(self.menu()), 2)
+
+        response = self.upload(
+            "menu.ndjson",
+            b'{"name": "Caf\xe9", "price": "3.00"}\n{"name": "Tea", "price": "2"}\n',
+        )
+        self.assertEqual(response.data["errors"], [{"row": 1, "errors": invalid}])
+        self.assertEqual(response.data["created"], 1)
+
+    def test_chunks(self):
+        rows = b"".join(
+            "Food {},{}.00\n".format(index, index).encode() for index in range(1, 6)
+        )
+        with self.settings(MENU_IMPORT_CHUNK_SIZE=2):
+            response = self.upload(
+                "menu.txt", b"name,price\nMargherita,1.00\n" + rows, type="csv"
+            )
+        self.assertEqual((response.data["created"], response.data["updated"]), (5, 1))
+        self.assertEqual(len(self.menu()), 6)
+
+    def test_unknown_file_types(self):
+        response = self.upload("menu.txt", b"name,price\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["non_field_errors"],
+            ["Set type to csv or ndjson for this file."],
+        )
+        response = self.upload("menu.csv", b"name,price\n", type="xml")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("type", response.data)
+
+    def test_food_names_are_unique_per_restaurant(self):
+        response = self.client.post(
+            reverse("merchant_create_new_food_list"),
+            {"name": "Margherita", "price": "5.00"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["name"],
+            ["The restaurant already has a food with this name."],
+        )
+        self.assertEqual(self.menu(), {"Margherita": Decimal("8.00")})
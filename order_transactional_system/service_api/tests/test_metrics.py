@@ -0,0 +1,217 @@
+import threading
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    Counter,
+    Histogram,
+    RequestTimings,
+)
+from service_api.middleware import (
+    ReplicaPinMiddleware,
+    RequestMetricsMiddleware,
+    RequestProfilerMiddleware,
+)
+from service_api.routers import is_pinned
+from service_api.tests.factories import make_restaurant, make_user
+
+
+def server_timing(response):
+    """
+    Return {metric: parameters} of a response's Server-Timing header.
+    """
+    return dict(part.split(";", 1) for part in response["Server-Timing"].split(", "))
+
+
+class MetricTests(SimpleTestCase):
+    def test_finished_threads_are_folded_into_the_totals(self):
+        counter = Counter("test_total", "Test.")
+        threads = [
+            threading.Thread(target=counter.inc, args=(("home",),))
+            for _ in range(100)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.shards, [])
+        self.assertEqual(counter.collect(), {("home",): [100]})
+        counter.inc(("home",), 2)
+        self.assertEqual(len(counter.shards), 1)
+        self.assertEqual(counter.collect(), {("home",): [102]})
+
+    def test_histogram(self):
+        histogram = Histogram("test_seconds", "Test.", (0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(("home",), value)
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP test_seconds Test.",
+                "# TYPE test_seconds histogram",
+                'test_seconds_bucket{url_name="home",le="0.1"} 1',
+                'test_seconds_bucket{url_name="home",le="1"} 3',
+                'test_seconds_bucket{url_name="home",le="+Inf"} 4',
+                'test_seconds_sum{url_name="home"} 6.05',
+                'test_seconds_count{url_name="home"} 4',
+            ],
+        )
+
+
+class RequestTimingsTests(SimpleTestCase):
+    def phases(self, **times):
+        timings = RequestTimings()
+        timings.started = 0.0
+        for name, value in times.items():
+            setattr(timings, name, value)
+        with mock.patch("service_api.metrics.time.perf_counter", return_value=10.0):
+            return timings.phases()
+
+    def test_phases(self):
+        self.assertEqual(
+            self.phases(view_started=1.0, view_finished=3.0, render_finished=6.0),
+            (10.0, 2.0, 3.0),
+        )
+
+    def test_responses_rendered_by_the_view(self):
+        self.assertEqual(self.phases(view_started=1.0), (10.0, 9.0, 0.0))
+
+    def test_requests_which_never_reached_a_view(self):
+        self.assertEqual(self.phases(), (10.0, 0.0, 0.0))
+
+
+class RequestMetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = make_user("staff", is_staff=True)
+        cls.customer = make_user("customer")
+        make_restaurant(make_user("merchant", is_merchant=True))
+
+    def scrape(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse("metrics"))
+        self.client.force_authenticate(None)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], PROMETHEUS_CONTENT_TYPE)
+        return response.content.decode().splitlines()
+
+    def sample(self, lines, name):
+        """
+        Return the value of the sample ``name``, labels included, or 0.
+        """
+        for line in lines:
+            sample, _, value = line.rpartition(" ")
+            if sample == name:
+                return float(value)
+        return 0
+
+    def test_queries_are_timed(self):
+        timings = RequestTimings()
+        with connection.execute_wrapper(timings):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.execute("SELECT 2")
+        self.assertEqual(timings.queries, 2)
+        self.assertGreater(timings.db, 0)
+        self.assertIsNone(timings.statements)
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("restaurants"))
+        self.assertEqual(response.status_code, 200)
+        timing = server_timing(response)
+        self.assertEqual(list(timing), ["db", "view", "render", "total"])
+        self.assertTrue(
+            timing["db"].endswith('desc="{} queries"'.format(len(queries)))
+        )
+        durations = {
+            name: float(value.split(";")[0].removeprefix("dur="))
+            for name, value in timing.items()
+        }
+        self.assertGreater(durations["view"], 0)
+        self.assertGreaterEqual(
+            durations["total"], durations["view"] + durations["render"]
+        )
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        response = self.client.get(reverse("restaurants"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_prometheus_output(self):
+        before = self.scrape()
+        self.client.get(reverse("restaurants"))
+        self.client.get("/no/such/page/")
+        after = self.scrape()
+        for name in (
+            'http_responses_total{url_name="restaurants",status="200"}',
+            'http_responses_total{url_name="unmatched",status="404"}',
+            'http_request_duration_seconds_count{url_name="restaurants"}',
+            'http_request_duration_seconds_bucket{url_name="restaurants",le="+Inf"}',
+            'http_request_view_seconds_count{url_name="restaurants"}',
+            'http_request_queries_count{url_name="restaurants"}',
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.sample(after, name), self.sample(before, name) + 1
+                )
+        self.assertIn("# TYPE http_request_db_seconds histogram", after)
+        self.assertIn("# TYPE http_responses_total counter", after)
+
+    def test_metrics_are_staff_only(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    async def test_requests_stay_on_the_event_loop(self):
+        threads = []
+
+        async def view(request):
+            threads.append(threading.get_ident())
+            return HttpResponse()
+
+        handler = RequestMetricsMiddleware(
+            ReplicaPinMiddleware(RequestProfilerMiddleware(view))
+        )
+        self.assertTrue(iscoroutinefunction(handler))
+        for request in (
+            AsyncRequestFactory().get("/", {"profile": "0"}),
+            AsyncRequestFactory().post("/"),
+        ):
+            request.user = User(pk=7)
+            response = await handler(request)
+            self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertEqual(threads, [threading.get_ident()] * 2)
+        self.assertTrue(is_pinned(7))
+
+
+class AsyncStackTests(TestCase):
+    async def test_sync_views_are_timed_under_asgi(self):
+        response = await self.async_client.get(reverse("restaurants"))
+        self.assertEqual(response.status_code, 200)
+        timing = server_timing(response)
+        self.assertNotEqual(timing["view"], "dur=0.0")
+        self.assertIn("render", timing)
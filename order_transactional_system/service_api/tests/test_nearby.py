@@ -0,0 +1,107 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.geo import (
+    bounding_box,
+    covering_cells,
+    encode_geohash,
+    haversine_km,
+)
+from service_api.tests.factories import make_restaurant, make_user
+
+
+class GeoTests(SimpleTestCase):
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(encode_geohash(52.52, 13.405, 5), "u33dc")
+
+    def test_haversine(self):
+        self.assertEqual(haversine_km(52.52, 13.405, 52.52, 13.405), 0)
+        # Berlin to Munich
+        self.assertAlmostEqual(haversine_km(52.52, 13.405, 48.137, 11.575), 504, -1)
+
+    def test_cells_cover_the_box(self):
+        south, west, north, east = bounding_box(52.52, 13.405, 5)
+        cells = covering_cells(south, west, north, east)
+        self.assertLessEqual(len(cells), 9)
+        for lat in (south, 52.52, north):
+            for lng in (west, 13.405, east):
+                geohash = encode_geohash(lat, lng)
+                self.assertTrue(any(geohash.startswith(cell) for cell in cells))
+
+    def test_boxes_across_the_antimeridian(self):
+        south, west, north, east = bounding_box(0, 179.99, 5)
+        self.assertGreater(west, east)
+        cells = covering_cells(south, west, north, east)
+        for lng in (179.99, -179.99):
+            geohash = encode_geohash(0, lng)
+            self.assertTrue(any(geohash.startswith(cell) for cell in cells))
+
+
+class NearbyRestaurantTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        merchant = make_user("merchant", is_merchant=True)
+
+        def restaurant(name, lat, lng):
+            return make_restaurant(
+                merchant, name=name, lat=Decimal(lat), long=Decimal(lng)
+            )
+
+        cls.center = restaurant("Center", "52.5200", "13.4050")
+        cls.close = restaurant("Close", "52.5300", "13.4050")
+        cls.further = restaurant("Further", "52.5200", "13.4700")
+        cls.far = restaurant("Far", "52.6500", "13.4050")
+        cls.munich = restaurant("Munich", "48.1370", "11.5750")
+        # Restaurants without coordinates are never nearby.
+        make_restaurant(merchant, name="Unknown", lat=None, long=None)
+
+    def nearby(self, **params):
+        response = self.client.get(reverse("restaurants_nearby"), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_nearest_first_within_the_radius(self):
+        results = self.nearby(lat=52.52, lng=13.405, radius=5)
+        self.assertEqual(
+            [item["name"] for item in results], ["Center", "Close", "Further"]
+        )
+        self.assertEqual(results[0]["distance"], 0)
+        self.assertAlmostEqual(results[1]["distance"], 1.11, 2)
+        self.assertNotIn("geohash", results[0])
+
+    def test_limit_and_radius(self):
+        results = self.nearby(lat=52.52, lng=13.405, radius=20, limit=4)
+        self.assertEqual(
+            [item["name"] for item in results], ["Center", "Close", "Further", "Far"]
+        )
+        results = self.nearby(lat=52.52, lng=13.405, radius=20, limit=2)
+        self.assertEqual([item["name"] for item in results], ["Center", "Close"])
+        self.assertEqual(self.nearby(lat=0, lng=0), [])
+
+    def test_restaurants_across_the_antimeridian(self):
+        merchant = make_user("islands", is_merchant=True)
+        make_restaurant(merchant, name="East", lat=Decimal("0"), long=Decimal("179.99"))
+        make_restaurant(
+            merchant, name="West", lat=Decimal("0"), long=Decimal("-179.99")
+        )
+        results = self.nearby(lat=0, lng=179.995, radius=5)
+        self.assertEqual(sorted(item["name"] for item in results), ["East", "West"])
+
+    def test_candidates_are_prefiltered_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.nearby(lat=52.52, lng=13.405, radius=5)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"service_api_restaurant"."geohash" >=', queries[0]["sql"])
+
+    def test_invalid_coordinates(self):
+        response = self.client.get(
+            reverse("restaurants_nearby"), {"lat": 91, "lng": 13, "radius": 500}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {"lat", "radius"})
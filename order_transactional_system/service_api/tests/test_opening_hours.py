@@ -0,0 +1,74 @@
+from datetime import datetime, time
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from service_api.models import Restaurant, open_at_q
+from service_api.tests.factories import make_restaurant, make_user
+
+
+class OpeningHoursTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        merchant = make_user("merchant", is_merchant=True)
+
+        def restaurant(name, open_time, close_time, city="Berlin"):
+            return make_restaurant(
+                merchant,
+                name=name,
+                city=city,
+                open_time=open_time,
+                close_time=close_time,
+            )
+
+        restaurant("Lunch", time(11, 0), time(15, 0))
+        restaurant("Night", time(18, 0), time(2, 0))
+        restaurant("Hamburg night", time(18, 0), time(2, 0), city="Hamburg")
+        restaurant("Unknown", None, None)
+
+    def open_at(self, at, **params):
+        response = self.client.get(reverse("restaurants"), {"open_at": at, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(item["name"] for item in response.data["results"])
+
+    def test_derived_minutes(self):
+        night = Restaurant.objects.get(name="Night")
+        self.assertEqual((night.open_minute, night.close_minute), (1080, 1560))
+        unknown = Restaurant.objects.get(name="Unknown")
+        self.assertEqual((unknown.open_minute, unknown.close_minute), (None, None))
+
+    def test_open_at(self):
+        self.assertEqual(self.open_at("12:00"), ["Lunch"])
+        self.assertEqual(self.open_at("15:00"), [])
+        self.assertEqual(self.open_at("23:30"), ["Hamburg night", "Night"])
+        # Windows past midnight stay open into the next morning.
+        self.assertEqual(self.open_at("01:59"), ["Hamburg night", "Night"])
+        self.assertEqual(self.open_at("02:00"), [])
+
+    def test_open_at_in_a_city(self):
+        self.assertEqual(self.open_at("00:30", city="Berlin"), ["Night"])
+
+    def test_open_now(self):
+        now = timezone.make_aware(datetime(2024, 5, 1, 12, 30))
+        with mock.patch("django.utils.timezone.localtime", return_value=now):
+            response = self.client.get(reverse("restaurants"), {"open_now": "true"})
+        self.assertEqual([item["name"] for item in response.data["results"]], ["Lunch"])
+
+    def test_filter_runs_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.open_at("23:30", city="Berlin")
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"open_minute" <=', queries[0]["sql"])
+
+    def test_open_at_q_uses_the_hours_index(self):
+        restaurants = Restaurant.objects.filter(open_at_q(time(12)), city="Berlin")
+        self.assertIn("restaurant_city_hours_idx", restaurants.explain())
+
+    def test_invalid_time(self):
+        response = self.client.get(reverse("restaurants"), {"open_at": "25:00"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("open_at", response.data)
@@ -0,0 +1,178 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from service_api.authentication import (
+    issue_tokens,
+    load_principal,
+    revoke_user_tokens,
+)
+from service_api.events import (
+    OVERFLOW,
+    OrderEventHub,
+    format_event,
+    hub,
+    publish_order_event,
+)
+from service_api.tests.factories import make_restaurant, make_user
+
+
+class OrderEventHubTests(SimpleTestCase):
+    async def test_subscribers_get_their_events(self):
+        event_hub = OrderEventHub(10)
+        merchant, _ = event_hub.subscribe(restaurant_ids=[1])
+        customer, _ = event_hub.subscribe(customer_id=7)
+        event_hub.publish("created", 1, 1, 7, "placed")
+        event_hub.publish("created", 2, 2, 8, "placed")
+        event_hub.publish("accepted", 3, 2, 7, "accepted")
+        await asyncio.sleep(0)
+        self.assertEqual((await merchant.get(1))["order"], 1)
+        self.assertIsNone(await merchant.get(0.01))
+        self.assertEqual((await customer.get(1))["order"], 1)
+        self.assertEqual((await customer.get(1))["order"], 3)
+        merchant.close()
+        customer.close()
+        self.assertFalse(event_hub.has_subscribers())
+
+    async def test_resume_after_the_last_event_id(self):
+        event_hub = OrderEventHub(3)
+        for order in range(1, 6):
+            event_hub.publish("created", order, 1, order % 2, "placed")
+        subscription, missed = event_hub.subscribe(restaurant_ids=[1], last_event_id=3)
+        self.assertEqual([event["id"] for event in missed], [4, 5])
+        subscription, missed = event_hub.subscribe(customer_id=1, last_event_id=2)
+        self.assertEqual([event["id"] for event in missed], [3, 5])
+        # Events after 1 are no longer kept, and 6 has not been published.
+        self.assertIsNone(event_hub.subscribe(customer_id=1, last_event_id=1)[1])
+        self.assertIsNone(event_hub.subscribe(customer_id=1, last_event_id=6)[1])
+        self.assertEqual(event_hub.subscribe(customer_id=1, last_event_id=5)[1], [])
+
+    @override_settings(ORDER_EVENTS_QUEUE_SIZE=3)
+    async def test_slow_subscribers_are_dropped(self):
+        event_hub = OrderEventHub(10)
+        subscription, _ = event_hub.subscribe(restaurant_ids=[1])
+        for order in range(1, 6):
+            event_hub.publish("created", order, 1, 2, "placed")
+        await asyncio.sleep(0)
+        self.assertEqual((await subscription.get(1))["id"], 1)
+        self.assertEqual((await subscription.get(1))["id"], 2)
+        self.assertIs(await subscription.get(1), OVERFLOW)
+        self.assertIsNone(await subscription.get(0.01))
+        # Reconnecting clients pick up where they were dropped.
+        _, missed = event_hub.subscribe(restaurant_ids=[1], last_event_id=2)
+        self.assertEqual([event["id"] for event in missed], [3, 4, 5])
+
+    def test_format_event(self):
+        event = {"id": 4, "type": "created", "order": 1}
+        self.assertEqual(
+            format_event(event),
+            'id: 4\nevent: created\ndata: {"id": 4, "type": "created", "order": 1}\n\n',
+        )
+
+
+@override_settings(ORDER_EVENTS_QUEUE_SIZE=2)
+class OrderEventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user("customer")
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.restaurant = make_restaurant(cls.merchant)
+
+    def setUp(self):
+        # Streams read session users from the principal cache.
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def bearer(self, user):
+        token = issue_tokens(load_principal(user.pk))["access"]
+        return {"Authorization": "Bearer {}".format(token)}
+
+    def publish(self, customer_id=None):
+        return publish_order_event(
+            "created",
+            1,
+            self.restaurant.pk,
+            customer_id or self.customer.pk,
+            "placed",
+        )
+
+    async def read(self, response, count):
+        """
+        Read ``count`` messages, then overflow the subscription, which ends
+        the stream, and return every message.
+        """
+        content = response.streaming_content
+        messages = [await anext(content) for _ in range(count)]
+        live = [self.publish(), self.publish()]
+        messages += [message async for message in content]
+        self.assertFalse(hub.has_subscribers())
+        return messages, live[0]
+
+    async def test_customers_resume_their_streams(self):
+        await self.async_client.aforce_login(self.customer)
+        first = self.publish()
+        self.publish(customer_id=self.merchant.pk)
+        second = self.publish()
+        response = await self.async_client.get(
+            reverse("customer_order_events"),
+            headers={"Last-Event-ID": str(first["id"] - 1)},
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        messages, live = await self.read(response, 2)
+        self.assertEqual(
+            messages,
+            [format_event(event).encode() for event in (first, second, live)],
+        )
+
+    async def test_reset_when_missed_events_are_gone(self):
+        await self.async_client.aforce_login(self.merchant)
+        last = self.publish()
+        response = await self.async_client.get(
+            reverse("merchant_order_events"), {"last_event_id": last["id"] + 10}
+        )
+        messages, live = await self.read(response, 1)
+        self.assertEqual(
+            messages, [b"event: reset\ndata: {}\n\n", format_event(live).encode()]
+        )
+
+    async def test_streams_need_the_role(self):
+        response = await self.async_client.get(reverse("customer_order_events"))
+        self.assertEqual(response.status_code, 403)
+        await self.async_client.aforce_login(self.customer)
+        response = await self.async_client.get(reverse("merchant_order_events"))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_bearer_tokens(self):
+        headers = await sync_to_async(self.bearer)(self.merchant)
+        first = self.publish()
+        response = await self.async_client.get(
+            reverse("merchant_order_events"),
+            headers={"Last-Event-ID": str(first["id"] - 1), **headers},
+        )
+        messages, live = await self.read(response, 1)
+        self.assertEqual(
+            messages, [format_event(event).encode() for event in (first, live)]
+        )
+
+        await sync_to_async(revoke_user_tokens)(self.merchant.pk)
+        response = await self.async_client.get(
+            reverse("merchant_order_events"), headers=headers
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"detail": "Token has been revoked."})
+
+    async def test_users_without_profile(self):
+        admin = await User.objects.acreate(username="admin", is_staff=True)
+        await self.async_client.aforce_login(admin)
+        response = await self.async_client.get(reverse("merchant_order_events"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        user = await User.objects.acreate(username="user")
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse("merchant_order_events"))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse("customer_order_events"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
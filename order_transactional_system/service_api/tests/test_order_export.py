@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from service_api.archive import archive_orders
+from service_api.models import Order, OrderStatus
+from service_api.order_export import ORDER_EXPORT_FIELDS
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+@override_settings(ORDER_EXPORT_CHUNK_SIZE=2)
+class OrderExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        restaurant = make_restaurant(cls.merchant)
+        cls.food = make_food(restaurant)
+        cls.drink = make_food(restaurant, name="Cola", price="2.50")
+        other_food = make_food(make_restaurant(make_user("other", is_merchant=True)))
+        now = timezone.now()
+        cls.orders = []
+        for days, status in enumerate(
+            (OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.PLACED)
+        ):
+            order = make_order(cls.customer, cls.food, quantity=2, status=status)
+            Order.objects.filter(pk=order.pk).update(
+                create_datetime=now - timedelta(days=10 - days),
+                delivered_datetime=now - timedelta(days=9),
+                cancell_datetime=now - timedelta(days=9),
+            )
+            cls.orders.append(order.pk)
+        order = cls.orders[-1]
+        Order.objects.get(pk=order).items.create(
+            food=cls.drink, quantity=1, unit_price=cls.drink.price
+        )
+        cls.foreign = make_order(make_user("stranger"), other_food).pk
+
+    def export(self, user, role, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse(role + "_export_orders"), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def ndjson(self, user, role="customer", **params):
+        response, content = self.export(user, role, **params)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_ndjson(self):
+        orders = self.ndjson(self.customer)
+        self.assertEqual([order["id"] for order in orders], self.orders)
+        self.assertEqual(set(orders[0]), set(ORDER_EXPORT_FIELDS) | {"items"})
+        self.assertEqual(orders[0]["total"], "16.00")
+        self.assertEqual(orders[0]["customer"], self.customer.pk)
+        self.assertEqual(
+            orders[2]["items"],
+            [
+                {"food": self.food.pk, "quantity": 2, "unit_price": "8.00"},
+                {"food": self.drink.pk, "quantity": 1, "unit_price": "2.50"},
+            ],
+        )
+
+    def test_csv(self):
+        response, content = self.export(self.customer, "customer", type="csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="orders.csv"'
+        )
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([int(row["id"]) for row in rows], self.orders)
+        self.assertEqual(
+            rows[2]["items"],
+            "{}:2:8.00;{}:1:2.50".format(self.food.pk, self.drink.pk),
+        )
+        self.assertEqual(rows[2]["accept_datetime"], "")
+
+    def test_filters(self):
+        now = timezone.now()
+        orders = self.ndjson(
+            self.customer,
+            since=(now - timedelta(days=9, hours=12)).isoformat(),
+            until=(now - timedelta(days=8, hours=12)).isoformat(),
+        )
+        self.assertEqual([order["id"] for order in orders], [self.orders[1]])
+        orders = self.ndjson(self.customer, status=OrderStatus.PLACED)
+        self.assertEqual([order["id"] for order in orders], [self.orders[2]])
+
+    def test_archived_orders_come_first(self):
+        list(archive_orders(timezone.now() - timedelta(days=1), 10))
+        self.assertFalse(Order.objects.filter(pk=self.orders[0]).exists())
+        orders = self.ndjson(self.merchant, "merchant")
+        self.assertEqual([order["id"] for order in orders], self.orders)
+        self.assertEqual(orders[0]["items"][0]["unit_price"], "8.00")
+
+    def test_merchants_export_their_restaurant(self):
+        orders = self.ndjson(self.merchant, "merchant")
+        self.assertEqual([order["id"] for order in orders], self.orders)
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse("merchant_export_orders"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_queries(self):
+        self.client.force_authenticate(self.customer)
+        url = reverse("customer_export_orders")
+        response = self.client.get(url, {"type": "xml"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("type", response.data)
+        response = self.client.get(
+            url, {"since": "2024-02-01T00:00Z", "until": "2024-01-01T00:00Z"}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,87 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Order, OrderStatus
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+def ids(response):
+    return sorted(item["id"] for item in response.data["results"])
+
+
+class OrderListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.other_merchant = make_user("other_merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        cls.other_customer = make_user("other_customer")
+        restaurant = make_restaurant(cls.merchant)
+        first, second = make_food(restaurant, "First"), make_food(restaurant, "Second")
+        other = make_food(make_restaurant(cls.other_merchant))
+        cls.orders = {
+            status: make_order(cls.customer, second, status=status)
+            for status in OrderStatus.values
+        }
+        cls.first_food_order = make_order(cls.other_customer, first)
+        cls.other_restaurant_order = make_order(cls.customer, other)
+
+    def test_placed_orders_record_their_restaurant(self):
+        self.client.force_authenticate(self.customer)
+        food = self.orders[OrderStatus.PLACED].foods.get()
+        response = self.client.post(
+            reverse("customer_new_order"),
+            {"items": [{"food": food.pk}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.restaurant_id, food.restaurant_id)
+        self.assertEqual(response.data["restaurant"], food.restaurant_id)
+
+    def test_merchant_lists_hold_their_restaurants_orders(self):
+        self.client.force_authenticate(self.merchant)
+        active = self.client.get(reverse("merchant_active_orders"))
+        self.assertEqual(
+            ids(active),
+            sorted(
+                [
+                    self.orders[OrderStatus.PLACED].pk,
+                    self.orders[OrderStatus.ACCEPTED].pk,
+                    # Orders of any of the restaurant's foods, not only the first.
+                    self.first_food_order.pk,
+                ]
+            ),
+        )
+        cancelled = self.client.get(reverse("merchant_cancelled_orders"))
+        self.assertEqual(ids(cancelled), [self.orders[OrderStatus.CANCELLED].pk])
+        delivered = self.client.get(reverse("merchant_delivered_orders"))
+        self.assertEqual(ids(delivered), [self.orders[OrderStatus.DELIVERED].pk])
+
+    def test_customer_lists_hold_their_own_orders(self):
+        self.client.force_authenticate(self.customer)
+        active = self.client.get(reverse("customer_active_orders"))
+        self.assertEqual(
+            ids(active),
+            sorted(
+                [
+                    self.orders[OrderStatus.PLACED].pk,
+                    self.orders[OrderStatus.ACCEPTED].pk,
+                    self.other_restaurant_order.pk,
+                ]
+            ),
+        )
+        cancelled = self.client.get(reverse("customer_cancelled_orders"))
+        self.assertEqual(ids(cancelled), [self.orders[OrderStatus.CANCELLED].pk])
+        delivered = self.client.get(reverse("customer_delivered_order"))
+        self.assertEqual(ids(delivered), [self.orders[OrderStatus.DELIVERED].pk])
+
+    def test_merchant_lists_need_a_merchant(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse("merchant_active_orders"))
+        self.assertEqual(response.status_code, 403)
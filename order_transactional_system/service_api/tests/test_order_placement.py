@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Order, OrderItem
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+class OrderPlacementTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user("customer")
+        restaurant = make_restaurant(make_user("merchant", is_merchant=True))
+        cls.pizza = make_food(restaurant, "Pizza", "8.50")
+        cls.salad = make_food(restaurant, "Salad", "4.25")
+        cls.other = make_food(
+            make_restaurant(make_user("other", is_merchant=True)), "Sushi", "12.00"
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.customer)
+
+    def place(self, items):
+        return self.client.post(
+            reverse("customer_new_order"), {"items": items}, format="json"
+        )
+
+    def test_lines_totals_and_price_snapshots(self):
+        response = self.place(
+            [
+                {"food": self.pizza.pk, "quantity": 2},
+                {"food": self.salad.pk},
+                # Repeated foods are merged into one line.
+                {"food": self.pizza.pk, "quantity": 1},
+            ]
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["total"], "29.75")
+        self.assertEqual(
+            sorted(response.data["items"], key=lambda item: item["food"]),
+            [
+                {"food": self.pizza.pk, "quantity": 3, "unit_price": "8.50"},
+                {"food": self.salad.pk, "quantity": 1, "unit_price": "4.25"},
+            ],
+        )
+        self.assertEqual(sorted(response.data["foods"]), [self.pizza.pk, self.salad.pk])
+
+        # Later price changes leave placed orders alone.
+        self.pizza.price = Decimal("10.00")
+        self.pizza.save()
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.total, Decimal("29.75"))
+        self.assertEqual(
+            order.items.get(food=self.pizza).unit_price, Decimal("8.50")
+        )
+
+    def test_foods_of_two_restaurants(self):
+        response = self.place([{"food": self.pizza.pk}, {"food": self.other.pk}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["non_field_errors"],
+            ["All ordered foods should be from one restaurant."],
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_foods(self):
+        response = self.place([{"food": self.pizza.pk}, {"food": 999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["non_field_errors"], ["Foods [999] do not exist."]
+        )
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_empty_orders(self):
+        response = self.place([])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("items", response.data)
+
+    def test_listing_foods_does_not_query_per_order(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("customer_active_orders"))
+            self.assertEqual(response.status_code, 200)
+            return len(response.data["results"]), len(queries)
+
+        make_order(self.customer, self.pizza)
+        few = count_queries()
+        for _ in range(5):
+            order = make_order(self.customer, self.pizza)
+            OrderItem.objects.create(
+                order=order, food=self.salad, unit_price=self.salad.price
+            )
+        many = count_queries()
+        self.assertEqual((few[0], many[0]), (1, 6))
+        self.assertEqual(few[1], many[1])
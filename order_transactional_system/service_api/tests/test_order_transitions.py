@@ -0,0 +1,103 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Order, OrderStatus
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+class OrderTransitionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.customer = make_user("customer")
+        cls.food = make_food(make_restaurant(cls.merchant))
+
+    def put(self, user, name, order, data=None):
+        self.client.force_authenticate(user)
+        return self.client.put(
+            reverse(name, kwargs={"pk": order.pk}), data or {}, format="json"
+        )
+
+    def test_order_lifecycle(self):
+        order = make_order(self.customer, self.food)
+        response = self.put(
+            self.merchant, "merchant_accept_order", order, {"time_to_deliver": 20}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["status"], OrderStatus.ACCEPTED)
+        self.assertTrue(response.data["is_accepted"])
+
+        response = self.put(self.customer, "customer_approve_delivered_order", order)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data["is_delivered"])
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.DELIVERED)
+        self.assertEqual(order.time_to_deliver, 20)
+        self.assertIsNotNone(order.accept_datetime)
+        self.assertIsNotNone(order.delivered_datetime)
+        self.assertTrue(order.is_accepted)
+
+    def test_cancel(self):
+        for user, name in (
+            (self.customer, "customer_cancel_order"),
+            (self.merchant, "merchant_cancel_order"),
+        ):
+            order = make_order(self.customer, self.food)
+            response = self.put(user, name, order)
+            self.assertEqual(response.status_code, 200, response.data)
+            order.refresh_from_db()
+            self.assertEqual(order.status, OrderStatus.CANCELLED)
+            self.assertIsNotNone(order.cancell_datetime)
+
+    def test_transitions_from_the_wrong_status_are_refused(self):
+        order = make_order(self.customer, self.food, status=OrderStatus.ACCEPTED)
+        response = self.put(self.customer, "customer_cancel_order", order)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            response.data["detail"], "You don't have permission to cancel this order."
+        )
+        response = self.put(self.merchant, "merchant_accept_order", order)
+        self.assertEqual(response.status_code, 403)
+        order = make_order(self.customer, self.food)
+        response = self.put(self.customer, "customer_approve_delivered_order", order)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            Order.objects.filter(status=OrderStatus.PLACED).get().pk, order.pk
+        )
+
+    def test_only_the_owners_change_an_order(self):
+        order = make_order(self.customer, self.food)
+        stranger = make_user("stranger", is_merchant=True)
+        response = self.put(stranger, "customer_cancel_order", order)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            response.data["detail"],
+            "You can't cancel this order because you are not it's owner.",
+        )
+        response = self.put(stranger, "merchant_accept_order", order)
+        self.assertEqual(
+            response.data["detail"], "You are not the merchant of this order."
+        )
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.PLACED)
+
+    def test_racing_transitions_have_one_winner(self):
+        order = make_order(self.customer, self.food)
+        # Both sides read the order while it is placed, then write.
+        orders = Order.objects.filter(pk=order.pk)
+        self.assertEqual(orders.transition("accept"), 1)
+        self.assertEqual(orders.transition("cancel"), 0)
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.ACCEPTED)
+        self.assertIsNone(order.cancell_datetime)
+
+        response = self.put(self.customer, "customer_cancel_order", order)
+        self.assertEqual(response.status_code, 403)
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.ACCEPTED)
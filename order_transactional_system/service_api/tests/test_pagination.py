@@ -0,0 +1,90 @@
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from service_api.models import Order, Restaurant
+from service_api.tests.factories import (
+    make_food,
+    make_order,
+    make_restaurant,
+    make_user,
+)
+
+
+def walk(client, url, direction="next"):
+    """
+    Follow the ``direction`` links from ``url``; return the pages' item ids.
+    """
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        pages.append([item["id"] for item in response.data["results"]])
+        url = response.data[direction]
+    return pages
+
+
+class IdCursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(5):
+            make_restaurant(make_user("merchant_{}".format(index), is_merchant=True))
+
+    def test_pages_follow_the_ids(self):
+        ids = list(Restaurant.objects.order_by("id").values_list("id", flat=True))
+        pages = walk(APIClient(), reverse("restaurants") + "?page_size=2")
+        self.assertEqual(pages, [ids[0:2], ids[2:4], ids[4:5]])
+
+    def test_previous_links_lead_back(self):
+        client = APIClient()
+        last = client.get(reverse("restaurants") + "?page_size=2")
+        while last.data["next"]:
+            last = client.get(last.data["next"])
+        pages = walk(client, last.data["previous"], "previous")
+        ids = list(Restaurant.objects.order_by("id").values_list("id", flat=True))
+        self.assertEqual(pages, [ids[2:4], ids[0:2]])
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=500):
+            response = APIClient().get(reverse("restaurants") + "?page_size=100000")
+        self.assertEqual(len(response.data["results"]), 5)
+
+
+class OrderCursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user("customer")
+        food = make_food(make_restaurant(make_user("merchant", is_merchant=True)))
+        for _ in range(7):
+            make_order(cls.customer, food)
+        # Orders placed within the same instant differ by id only.
+        Order.objects.update(create_datetime=timezone.now())
+
+    def setUp(self):
+        self.client.force_authenticate(self.customer)
+
+    def test_orders_of_the_same_instant_are_paged_by_id(self):
+        ids = list(Order.objects.order_by("-id").values_list("id", flat=True))
+        pages = walk(self.client, reverse("customer_active_orders") + "?page_size=3")
+        self.assertEqual(pages, [ids[0:3], ids[3:6], ids[6:7]])
+
+    def test_new_orders_do_not_shift_later_pages(self):
+        url = reverse("customer_active_orders") + "?page_size=3"
+        first = self.client.get(url)
+        make_order(self.customer, Order.objects.first().foods.get())
+        ids = list(Order.objects.order_by("-id").values_list("id", flat=True))
+        second = self.client.get(first.data["next"])
+        self.assertEqual([item["id"] for item in second.data["results"]], ids[4:7])
+
+    def test_previous_links_lead_back(self):
+        url = reverse("customer_active_orders") + "?page_size=3"
+        last = self.client.get(url)
+        while last.data["next"]:
+            last = self.client.get(last.data["next"])
+        ids = list(Order.objects.order_by("-id").values_list("id", flat=True))
+        pages = walk(self.client, last.data["previous"], "previous")
+        self.assertEqual(pages, [ids[3:6], ids[0:3]])
+
+    def test_invalid_cursor(self):
+        url = reverse("customer_active_orders") + "?cursor=cD1ub3QranNvbg%3D%3D"
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Food
+from service_api.permissions import load_once
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+class LoadOnceTests(SimpleTestCase):
+    def test_loaders_run_once_per_request_and_key(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return len(calls)
+
+        request = RequestFactory().get("/")
+        self.assertEqual(load_once(request, "key", loader), 1)
+        self.assertEqual(load_once(request, "key", loader), 1)
+        self.assertEqual(load_once(request, "other", loader), 2)
+        self.assertEqual(load_once(RequestFactory().get("/"), "key", loader), 3)
+
+
+class UpdateFoodTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.food = make_food(make_restaurant(cls.merchant))
+
+    def patch(self, user, pk, data):
+        self.client.force_authenticate(user)
+        return self.client.patch(
+            reverse("merchant_update_food_list", kwargs={"pk": pk}), data, format="json"
+        )
+
+    def test_permissions_and_view_share_the_food_and_restaurant(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(self.merchant, self.food.pk, {"price": "9.50"})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(Food.objects.get(pk=self.food.pk).price, 9.5)
+        selects = [
+            query["sql"] for query in queries if query["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(
+            len([sql for sql in selects if 'FROM "service_api_food"' in sql]), 1
+        )
+        self.assertEqual(
+            len([sql for sql in selects if 'FROM "service_api_restaurant"' in sql]), 1
+        )
+
+    def test_other_merchants_cannot_update_the_food(self):
+        other = make_user("other", is_merchant=True)
+        make_restaurant(other)
+        response = self.patch(other, self.food.pk, {"price": "1.00"})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Food.objects.get(pk=self.food.pk).price, 8)
+
+    def test_unknown_food(self):
+        response = self.patch(self.merchant, self.food.pk + 100, {"price": "1.00"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_merchants_without_restaurant(self):
+        response = self.patch(
+            make_user("new", is_merchant=True), self.food.pk, {"price": "1.00"}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            response.data["detail"],
+            "You should create a restaurant first to be able to access it's foods",
+        )
@@ -0,0 +1,127 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.authentication import issue_tokens, load_principal
+from service_api.models import Profile
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+class PrincipalCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        cls.restaurant = make_restaurant(cls.merchant)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_principals_are_loaded_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            user = load_principal(self.merchant.pk)
+            self.assertTrue(user.profile.is_merchant)
+            self.assertEqual(user.merchant_restaurant_id, self.restaurant.pk)
+        self.assertEqual(len(queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(load_principal(self.merchant.pk), user)
+        self.assertEqual(len(queries), 0)
+
+    def test_inactive_and_unknown_users(self):
+        user = make_user("inactive")
+        user.is_active = False
+        user.save()
+        self.assertIsNone(load_principal(user.pk))
+        self.assertIsNone(load_principal(user.pk + 100))
+
+    def test_warm_permission_checks_do_not_query(self):
+        self.client.login(username="merchant", password="password")
+        url = reverse("merchant_create_new_food_list")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        tables = ("auth_user", "service_api_profile", "service_api_restaurant")
+        for query in queries:
+            for table in tables:
+                self.assertNotIn('FROM "{}"'.format(table), query["sql"])
+
+    def test_profile_updates_invalidate_the_principal(self):
+        self.client.login(username="merchant", password="password")
+        load_principal(self.merchant.pk)
+        response = self.client.put(
+            reverse("profile"),
+            {
+                "username": "merchant",
+                "password": "new password",
+                "first_name": "New",
+                "last_name": "Name",
+                "profile": {"city": "Hamburg", "is_merchant": False},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        user = load_principal(self.merchant.pk)
+        self.assertEqual((user.first_name, user.profile.city), ("New", "Hamburg"))
+        self.assertFalse(user.profile.is_merchant)
+        # Sessions of the old password are logged out.
+        response = self.client.get(reverse("merchant_create_new_food_list"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_new_restaurants_invalidate_the_principal(self):
+        make_user("new", is_merchant=True)
+        self.client.login(username="new", password="password")
+        url = reverse("merchant_create_new_food_list")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.post(
+            reverse("merchant_create_new_restaurants"),
+            {
+                "name": "New",
+                "food_type": "Pizza",
+                "city": "Berlin",
+                "address": "New street 1",
+            },
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        user = load_principal(response.data["merchant"])
+        self.assertEqual(user.merchant_restaurant_id, response.data["id"])
+
+    def test_deleted_users_are_logged_out(self):
+        customer = make_user("customer")
+        food = make_food(self.restaurant)
+        self.client.login(username="customer", password="password")
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 200)
+        self.assertEqual(self.client.delete(reverse("profile")).status_code, 204)
+        self.assertIsNone(load_principal(customer.pk))
+        response = self.client.get(reverse("customer_active_orders"))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            reverse("customer_new_order"),
+            {"items": [{"food": food.pk}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_changes_invalidate_the_principal(self):
+        load_principal(self.merchant.pk)
+        profile = Profile.objects.get(user=self.merchant)
+        profile.is_merchant = False
+        profile.save()
+        self.assertFalse(load_principal(self.merchant.pk).profile.is_merchant)
+
+        token = issue_tokens(load_principal(self.merchant.pk))["access"]
+        user = User.objects.get(pk=self.merchant.pk)
+        user.is_active = False
+        user.save()
+        self.assertIsNone(load_principal(self.merchant.pk))
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + token)
+        response = self.client.get(reverse("profile"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"], "Token has been revoked.")
+
+    def test_missing_users_have_no_profile(self):
+        self.client.force_authenticate(User(pk=self.merchant.pk + 100))
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 404)
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.metrics import RequestTimings
+from service_api.profiling import SlowRequestLog, slow_requests
+from service_api.tests.factories import make_restaurant, make_user
+
+
+class SlowRequestLogTests(SimpleTestCase):
+    def test_only_the_last_requests_are_kept(self):
+        log = SlowRequestLog(2)
+        for path in ("/a/", "/b/", "/c/"):
+            log.add({"path": path})
+        self.assertEqual(
+            log.list(), [{"path": "/c/", "id": 3}, {"path": "/b/", "id": 2}]
+        )
+
+
+class RequestProfilerTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = make_user("staff", is_staff=True)
+        cls.customer = make_user("customer")
+        make_restaurant(make_user("merchant", is_merchant=True))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_profile_parameter(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(reverse("restaurants"), {"profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report["url_name"], report["status"]), ("restaurants", 200))
+        self.assertEqual(report["user"], self.staff.pk)
+        self.assertEqual(report["query_count"], len(report["queries"]))
+        self.assertTrue(report["profile"])
+        self.assertIn("function", report["profile"][0])
+
+    def test_profile_header(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(reverse("restaurants"), headers={"X-Profile": "1"})
+        self.assertIn("profile", response.json())
+
+    def test_other_users_are_not_profiled(self):
+        for login in (None, "customer"):
+            with self.subTest(login=login):
+                if login:
+                    self.client.login(username=login, password="password")
+                response = self.client.get(
+                    reverse("restaurants"), {"profile": "1"}, headers={"X-Profile": "1"}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("results", response.json())
+                self.assertNotIn("profile", response.json())
+
+
+class SlowRequestTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = make_user("staff", is_staff=True)
+        cls.customer = make_user("customer")
+        make_restaurant(make_user("merchant", is_merchant=True))
+
+    def get_slow(self, sampled):
+        with mock.patch(
+            "service_api.middleware.random.random", return_value=0.0 if sampled else 1.0
+        ):
+            response = self.client.get(reverse("restaurants"))
+        self.assertEqual(response.status_code, 200)
+        return slow_requests.list()[0]
+
+    @override_settings(SLOW_REQUEST_SECONDS=1e-9)
+    def test_slow_requests_are_logged(self):
+        report = self.get_slow(sampled=True)
+        self.assertEqual((report["url_name"], report["status"]), ("restaurants", 200))
+        self.assertEqual(report["queries_after_ms"], 0)
+        self.assertEqual(report["query_count"], len(report["queries"]))
+        self.assertTrue(report["call_sites"])
+        self.assertGreater(self.get_slow(sampled=True)["id"], report["id"])
+
+    @override_settings(SLOW_REQUEST_SECONDS=60)
+    def test_fast_requests_are_not_logged(self):
+        before = slow_requests.list()[:1]
+        self.client.get(reverse("restaurants"))
+        self.assertEqual(slow_requests.list()[:1], before)
+
+    def test_queries_are_listed_once_the_request_is_slow(self):
+        timings = RequestTimings(statements=[], record_after=60)
+        with connection.execute_wrapper(timings):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self.assertEqual((timings.queries, timings.statements), (1, []))
+            timings.started -= 60
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 2")
+        self.assertEqual(timings.queries, 2)
+        [(sql, params, seconds, site)] = timings.statements
+        self.assertEqual(sql, "SELECT 2")
+        self.assertEqual(site[0], __file__)
+
+    @override_settings(SLOW_REQUEST_SECONDS=0.0005, SLOW_REQUEST_SAMPLE_RATE=0.5)
+    def test_sampled_requests_list_every_query(self):
+        self.assertEqual(self.get_slow(sampled=True)["queries_after_ms"], 0)
+        self.assertEqual(self.get_slow(sampled=False)["queries_after_ms"], 0.5)
+
+    def test_log_is_staff_only(self):
+        url = reverse("slow_requests")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, slow_requests.list())
@@ -0,0 +1,374 @@
+"""
+Query budgets of the API routes.
+
+Every named URL of service_api.urls declares the most queries one request
+may run for each role. The routes are requested at 1, 10 and 1000 rows of
+data, and orders placed with as many lines, up to BASKET_SIZE; a test fails
+when a route goes over its budget or runs more queries as the data grows,
+which is how N+1 queries show up.
+
+Run with `python manage.py test service_api`.
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from service_api import urls
+from service_api.authentication import issue_tokens, load_principal
+from service_api.menu_cache import get_menu_cache
+from service_api.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Food,
+    Order,
+    OrderItem,
+    OrderStatus,
+    Profile,
+    Restaurant,
+    RestaurantDailyStats,
+)
+
+ROLES = ("customer", "merchant", "admin")
+ROW_COUNTS = (1, 10, 1000)
+# Largest basket ordered by customer_new_order. SQLite takes 999 parameters
+# per query, so Django splits inserts of more than 249 order lines.
+BASKET_SIZE = 200
+
+
+def budget(customer, merchant=None, admin=None):
+    """
+    Budgets of the roles; the merchant and admin default to the customer's.
+    """
+    return {
+        "customer": customer,
+        "merchant": customer if merchant is None else merchant,
+        "admin": customer if admin is None else admin,
+    }
+
+
+# URL name -> {role: most queries of one request}. Requests are made cold,
+# with an empty cache. Requests a role may not make count too: permission
+# checks must not scale either. Transactions show up as a SAVEPOINT and a
+# RELEASE, since the tests run inside one.
+QUERY_BUDGETS = {
+    "register": budget(4),
+    "login": budget(9),
+    "logout": budget(0),
+    "token_refresh": budget(1),
+    "users": budget(0, admin=1),
+    "profile": budget(1),
+    "restaurants": budget(1),
+    "restaurants_nearby": budget(1),
+    "restaurant_menu": budget(1),
+    "search": budget(3),
+    "metrics": budget(0),
+    "slow_requests": budget(0),
+    "merchant_create_new_restaurants": budget(0, 1, 1),
+    "merchant_create_new_food_list": budget(0, 2, 2),
+    "merchant_import_foods": budget(0, 5, 5),
+    "merchant_update_food_list": budget(0, 3, 2),
+    "merchant_active_orders": budget(0, 3, 2),
+    "merchant_cancelled_orders": budget(0, 5, 3),
+    "merchant_delivered_orders": budget(0, 5, 3),
+    "merchant_cancel_order": budget(4, 5, 4),
+    "merchant_accept_order": budget(4, 5, 4),
+    "merchant_bulk_transition_orders": budget(0, 6, 3),
+    "merchant_analytics": budget(0, 4, 4),
+    "merchant_export_orders": budget(0, 5, 3),
+    "merchant_order_events": budget(3, 4, 3),
+    "customer_new_order": budget(9),
+    "customer_active_orders": budget(2),
+    "customer_cancelled_orders": budget(4, 2, 2),
+    "customer_delivered_order": budget(4, 2, 2),
+    "customer_export_orders": budget(4, 3, 3),
+    "customer_cancel_order": budget(5, 4, 4),
+    "customer_approve_delivered_order": budget(7, 4, 4),
+    "customer_order_events": budget(2),
+}
+
+
+def named_routes():
+    return [
+        pattern.name
+        for pattern in urls.urlpatterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    ]
+
+
+# Exports stream in chunks of ORDER_EXPORT_CHUNK_SIZE orders with one extra
+# query per chunk; a chunk larger than the test data keeps that out of the
+# counts.
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    ORDER_EXPORT_CHUNK_SIZE=10000,
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {}
+        for role in ROLES:
+            user = User.objects.create_user(
+                username=role,
+                password="password",
+                first_name=role,
+                last_name="test",
+                is_staff=role == "admin",
+            )
+            Profile.objects.create(
+                user=user, city="Berlin", is_merchant=role == "merchant"
+            )
+            cls.users[role] = user
+        cls.restaurant = Restaurant.objects.create(
+            merchant=cls.users["merchant"],
+            name="Test restaurant",
+            food_type="Pizza",
+            city="Berlin",
+            address="Test street 1",
+            open_time=time(0, 0),
+            close_time=time(23, 59),
+            lat=Decimal("52.520000"),
+            long=Decimal("13.405000"),
+        )
+        cls.menu = Food.objects.bulk_create(
+            Food(restaurant=cls.restaurant, name=name, price=Decimal("8.00"))
+            for name in ("Margherita", "Marinara", "Diavola")
+        )
+
+    def setUp(self):
+        self.rows = 0
+        self.usernames = 0
+
+    def add_rows(self, count):
+        """
+        Add ``count`` rows to every table the routes list from.
+        """
+        start = self.rows
+        numbers = range(start, start + count)
+        now = timezone.now()
+        today = timezone.localdate()
+
+        users = User.objects.bulk_create(
+            User(username="user_{}".format(number)) for number in numbers
+        )
+        Profile.objects.bulk_create(
+            Profile(user=user, city="Berlin", is_merchant=True) for user in users
+        )
+        restaurants = []
+        for user in users:
+            restaurant = Restaurant(
+                merchant=user,
+                name="Pizza {}".format(user.pk),
+                food_type="Pizza",
+                city="Berlin",
+                address="Test street 2",
+                open_time=time(0, 0),
+                close_time=time(23, 59),
+                lat=Decimal("52.521000"),
+                long=Decimal("13.406000"),
+            )
+            restaurant.set_derived_fields()
+            restaurants.append(restaurant)
+        Restaurant.objects.bulk_create(restaurants)
+
+        foods = Food.objects.bulk_create(
+            Food(
+                restaurant=self.restaurant,
+                name="Pizza {}".format(number),
+                price=Decimal("9.50"),
+            )
+            for number in numbers
+        )
+        for status in OrderStatus.values:
+            orders = Order.objects.bulk_create(
+                Order(
+                    customer=self.users["customer"],
+                    restaurant=self.restaurant,
+                    status=status,
+                    total=Decimal("9.50"),
+                )
+                for _ in numbers
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, food=food, unit_price=food.price)
+                for order, food in zip(orders, foods)
+            )
+        for status in (OrderStatus.CANCELLED, OrderStatus.DELIVERED):
+            offset = 10**9 if status == OrderStatus.CANCELLED else 2 * 10**9
+            archived = ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(
+                    id=offset + number,
+                    customer=self.users["customer"],
+                    restaurant=self.restaurant,
+                    status=status,
+                    create_datetime=now - timedelta(days=1),
+                    total=Decimal("9.50"),
+                )
+                for number in numbers
+            )
+            ArchivedOrderItem.objects.bulk_create(
+                ArchivedOrderItem(order=order, food=food, unit_price=food.price)
+                for order, food in zip(archived, foods)
+            )
+        RestaurantDailyStats.objects.bulk_create(
+            RestaurantDailyStats(
+                restaurant=self.restaurant,
+                day=today - timedelta(days=number + 1),
+                orders=1,
+            )
+            for number in numbers
+        )
+        self.rows = start + count
+
+    def new_username(self):
+        self.usernames += 1
+        return "new_user_{}".format(self.usernames)
+
+    def new_orders(self, count=1, status=OrderStatus.PLACED):
+        food = self.menu[0]
+        orders = Order.objects.bulk_create(
+            Order(
+                customer=self.users["customer"],
+                restaurant=self.restaurant,
+                status=status,
+                accept_datetime=timezone.now(),
+                total=food.price,
+            )
+            for _ in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, food=food, unit_price=food.price)
+            for order in orders
+        )
+        return [order.pk for order in orders]
+
+    def make_request(self, name, role):
+        """
+        Return (method, path, data, format) of a valid request to the route.
+        """
+        user = self.users[role]
+        if name == "register":
+            data = {
+                "username": self.new_username(),
+                "password": "password",
+                "first_name": "New",
+                "last_name": "User",
+                "profile": {"city": "Berlin"},
+            }
+            return "post", reverse(name), data, "json"
+        if name == "login":
+            data = {"username": user.username, "password": "password"}
+            return "post", reverse(name), data, "json"
+        if name == "token_refresh":
+            data = {"refresh": issue_tokens(load_principal(user.pk))["refresh"]}
+            return "post", reverse(name), data, "json"
+        if name == "restaurants_nearby":
+            data = {"lat": 52.52, "lng": 13.405, "radius": 5}
+            return "get", reverse(name), data, "json"
+        if name == "restaurant_menu":
+            path = reverse(name, kwargs={"pk": self.restaurant.pk})
+            return "get", path, None, "json"
+        if name == "search":
+            return "get", reverse(name), {"q": "Pizza"}, "json"
+        if name == "merchant_create_new_restaurants":
+            data = {
+                "name": "New restaurant",
+                "food_type": "Curry",
+                "city": "Berlin",
+                "address": "Test street 3",
+                "open_time": "08:00",
+                "close_time": "22:00",
+                "lat": "52.5",
+                "long": "13.4",
+            }
+            return "post", reverse(name), data, "json"
+        if name == "merchant_create_new_food_list":
+            return "get", reverse(name), None, "json"
+        if name == "merchant_import_foods":
+            upload = SimpleUploadedFile("menu.csv", b"name,price\nImported,4.50\n")
+            return "post", reverse(name), {"file": upload}, "multipart"
+        if name == "merchant_update_food_list":
+            path = reverse(name, kwargs={"pk": self.menu[0].pk})
+            return "patch", path, {"price": "10.00"}, "json"
+        if name in ("merchant_cancel_order", "customer_cancel_order"):
+            path = reverse(name, kwargs={"pk": self.new_orders()[0]})
+            return "put", path, {}, "json"
+        if name == "merchant_accept_order":
+            path = reverse(name, kwargs={"pk": self.new_orders()[0]})
+            return "put", path, {"time_to_deliver": 20}, "json"
+        if name == "customer_approve_delivered_order":
+            pk = self.new_orders(status=OrderStatus.ACCEPTED)[0]
+            return "put", reverse(name, kwargs={"pk": pk}), {}, "json"
+        if name == "merchant_bulk_transition_orders":
+            data = {"ids": self.new_orders(10), "action": "accept"}
+            return "post", reverse(name), data, "json"
+        if name == "customer_new_order":
+            # The basket grows with the rows, up to BASKET_SIZE lines.
+            foods = Food.objects.filter(restaurant=self.restaurant).order_by("pk")
+            lines = foods.values_list("pk", flat=True)[: min(self.rows, BASKET_SIZE)]
+            data = {"items": [{"food": pk, "quantity": 2} for pk in lines]}
+            return "post", reverse(name), data, "json"
+        return "get", reverse(name), None, "json"
+
+    def count_queries(self, name, role):
+        method, path, data, format = self.make_request(name, role)
+        cache.clear()
+        get_menu_cache().clear()
+        client = APIClient()
+        if name.endswith("_events"):
+            # Plain Django views, which read bearer tokens themselves.
+            token = issue_tokens(load_principal(self.users[role].pk))["access"]
+            client.credentials(HTTP_AUTHORIZATION="Bearer {}".format(token))
+        else:
+            client.force_authenticate(self.users[role])
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(path, data, format=format)
+            if response.streaming and not response.is_async:
+                b"".join(response.streaming_content)
+        response.close()
+        self.assertLess(
+            response.status_code, 500, "{} as {} failed".format(name, role)
+        )
+        return len(queries)
+
+    def test_every_route_has_a_budget(self):
+        routes = named_routes()
+        self.assertEqual(
+            sorted(set(routes) - set(QUERY_BUDGETS)),
+            [],
+            "Declare the query budget of new routes in QUERY_BUDGETS.",
+        )
+        self.assertEqual(sorted(set(QUERY_BUDGETS) - set(routes)), [])
+        self.assertEqual(len(routes), len(set(routes)), "URL names must be unique.")
+
+    def test_query_counts(self):
+        counts = {}
+        for rows in ROW_COUNTS:
+            self.add_rows(rows - self.rows)
+            for name, budgets in QUERY_BUDGETS.items():
+                for role in budgets:
+                    counts.setdefault((name, role), []).append(
+                        self.count_queries(name, role)
+                    )
+
+        for (name, role), route_counts in counts.items():
+            with self.subTest(route=name, role=role):
+                self.assertLessEqual(
+                    max(route_counts),
+                    QUERY_BUDGETS[name][role],
+                    "Over budget at {} rows: {}".format(ROW_COUNTS, route_counts),
+                )
+                self.assertLessEqual(
+                    max(route_counts),
+                    route_counts[0],
+                    "Queries grow with rows {}: {}".format(ROW_COUNTS, route_counts),
+                )
+
@@ -0,0 +1,136 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api import async_views
+from service_api.authentication import issue_tokens, load_principal
+from service_api.models import Order
+from service_api.routers import (
+    ReplicaRouter,
+    is_pinned,
+    pin_to_primary,
+    replica_reads,
+)
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0", "replica_1"])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_go_to_replicas_only_when_asked(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Order))
+        token = replica_reads.set(True)
+        try:
+            self.assertIn(router.db_for_read(Order), ["replica_0", "replica_1"])
+            self.assertEqual(router.db_for_write(Order), "default")
+        finally:
+            replica_reads.reset(token)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        token = replica_reads.set(True)
+        try:
+            self.assertIsNone(ReplicaRouter().db_for_read(Order))
+        finally:
+            replica_reads.reset(token)
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertIs(router.allow_migrate("replica_1", "service_api"), False)
+        self.assertIsNone(router.allow_migrate("default", "service_api"))
+
+
+# The default database stands in for a replica; replica reads are counted
+# through the alias choice.
+@override_settings(DATABASE_REPLICAS=["default"])
+class ReplicaReadTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user("customer")
+        cls.food = make_food(make_restaurant(make_user("merchant", is_merchant=True)))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch(
+            "service_api.routers.random.choice", side_effect=lambda aliases: aliases[0]
+        )
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(self.customer)
+
+    def get(self, name):
+        self.choice.reset_mock()
+        response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(replica_reads.get())
+        return response, self.choice.called
+
+    def get_async(self, view, name):
+        token = issue_tokens(load_principal(self.customer.pk))["access"]
+        request = AsyncRequestFactory().get(
+            reverse(name), headers={"Authorization": "Bearer {}".format(token)}
+        )
+        request.session = SessionStore()
+        self.choice.reset_mock()
+        response = async_to_sync(view.as_view())(request)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(replica_reads.get())
+        return self.choice.called
+
+    def place(self, items):
+        return self.client.post(
+            reverse("customer_new_order"), {"items": items}, format="json"
+        )
+
+    def test_lists_read_from_replicas(self):
+        for name in ("restaurants", "customer_active_orders"):
+            with self.subTest(name=name):
+                self.assertTrue(self.get(name)[1])
+
+    def test_async_lists_read_from_replicas(self):
+        for view, name in (
+            (async_views.AsyncRestaurantList, "restaurants"),
+            (async_views.AsyncCustomerActiveOrderList, "customer_active_orders"),
+        ):
+            with self.subTest(name=name):
+                self.assertTrue(self.get_async(view, name))
+                pin_to_primary(self.customer.pk)
+                self.assertFalse(self.get_async(view, name))
+                cache.clear()
+
+    def test_menus_read_from_the_default_database(self):
+        # A lagging replica would refill the menu cache with an old menu.
+        response = self.client.get(
+            reverse("restaurant_menu", args=[self.food.restaurant_id])
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(self.choice.called)
+
+    def test_writers_read_their_writes(self):
+        response = self.place([{"food": self.food.pk}])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(is_pinned(self.customer.pk))
+        order = response.data["id"]
+        response, replica = self.get("customer_active_orders")
+        self.assertFalse(replica)
+        self.assertEqual([item["id"] for item in response.data["results"]], [order])
+
+    def test_failed_writes_do_not_pin(self):
+        self.assertEqual(self.place([]).status_code, 400)
+        self.assertFalse(is_pinned(self.customer.pk))
+        self.assertTrue(self.get("customer_active_orders")[1])
+
+    def test_pins_are_per_user(self):
+        pin_to_primary(self.customer.pk + 1)
+        self.assertTrue(self.get("customer_active_orders")[1])
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_pins_expire(self):
+        pin_to_primary(self.customer.pk)
+        self.assertFalse(is_pinned(self.customer.pk))
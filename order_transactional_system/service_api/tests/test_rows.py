@@ -0,0 +1,124 @@
+"""
+The list routes render their pages from `.values()` rows; these check the rows
+render the same JSON as the serializers they stand in for.
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from service_api.archive import combine_order_history
+from service_api.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Food,
+    Order,
+    OrderItem,
+    OrderStatus,
+    Restaurant,
+)
+from service_api.rows import queryset_models, row_serializer
+from service_api.serializers import (
+    FoodSerializer,
+    PlaceOrderSerializer,
+    RestaurantSerializer,
+)
+
+
+class RowSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(username="customer")
+        merchant = User.objects.create_user(username="merchant")
+        restaurant = Restaurant.objects.create(
+            merchant=merchant,
+            name='Pizza "Zur Post"',
+            food_type="Pizza",
+            city="Köln",
+            address="Test street 1",
+            open_time=time(8, 30),
+            close_time=time(23, 59, 59),
+            lat=Decimal("50.9375123456789012"),
+            long=None,
+        )
+        foods = Food.objects.bulk_create(
+            Food(restaurant=restaurant, name=name, price=price)
+            for name, price in (("Margherita", Decimal("8")), ("Diavola", "9.5"))
+        )
+        now = timezone.now()
+        orders = Order.objects.bulk_create(
+            [
+                Order(customer=cls.customer, restaurant=restaurant),
+                Order(
+                    customer=cls.customer,
+                    restaurant=restaurant,
+                    status=OrderStatus.DELIVERED,
+                    accept_datetime=now,
+                    delivered_datetime=now + timedelta(minutes=25),
+                    note="Ring twice ☃",
+                    total=Decimal("25.50"),
+                ),
+                Order(customer=None, restaurant=restaurant, status="cancelled"),
+            ]
+        )
+        # Lines out of food order: items list in line order, foods in food order.
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=orders[1], food=foods[1], unit_price="9.5"),
+                OrderItem(order=orders[1], food=foods[0], quantity=2, unit_price=8),
+                OrderItem(order=orders[0], food=foods[0], unit_price=8),
+            ]
+        )
+        archived = ArchivedOrder.objects.create(
+            id=10**9,
+            customer=cls.customer,
+            restaurant=restaurant,
+            status=OrderStatus.DELIVERED,
+            create_datetime=now - timedelta(days=1),
+            total=Decimal("8.00"),
+        )
+        ArchivedOrderItem.objects.create(order=archived, food=foods[0], unit_price=8)
+
+    def assertSameJSON(self, serializer_class, queryset, ordering, instances):
+        serializer = row_serializer(serializer_class)
+        rows = serializer.values(queryset).order_by(*ordering)
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(
+                serializer.to_representation(list(rows), queryset_models(queryset))
+            ),
+            renderer.render(
+                serializer_class(instances.order_by(*ordering), many=True).data
+            ),
+        )
+
+    def test_rows_render_like_the_serializers(self):
+        ordering = ("-create_datetime", "-id")
+        self.assertSameJSON(
+            PlaceOrderSerializer,
+            Order.objects.all(),
+            ordering,
+            Order.objects.prefetch_related("items", "foods"),
+        )
+        self.assertSameJSON(
+            PlaceOrderSerializer,
+            combine_order_history(Order.objects.all(), customer=self.customer),
+            ordering,
+            combine_order_history(
+                Order.objects.all(),
+                prefetch_related=("items", "foods"),
+                customer=self.customer,
+            ),
+        )
+        self.assertSameJSON(
+            RestaurantSerializer,
+            Restaurant.objects.all(),
+            ("id",),
+            Restaurant.objects.all(),
+        )
+        self.assertSameJSON(
+            FoodSerializer, Food.objects.all(), ("id",), Food.objects.all()
+        )
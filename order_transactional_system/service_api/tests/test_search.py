@@ -0,0 +1,90 @@
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.models import Food, Restaurant
+from service_api.search import (
+    SEARCH_TRIGGERS,
+    match_expression,
+    restore_search_triggers,
+    search,
+)
+from service_api.tests.factories import make_food, make_restaurant, make_user
+
+
+class SearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        merchant = make_user("merchant", is_merchant=True)
+        cls.pizzeria = make_restaurant(merchant, name="Pizzeria Napoli")
+        cls.cafe = make_restaurant(
+            make_user("cafe", is_merchant=True),
+            name="Café Hamburg",
+            food_type="Coffee",
+            city="Hamburg",
+        )
+        cls.calzone = make_food(cls.pizzeria, "Calzone")
+        cls.pizza_bread = make_food(cls.cafe, "Pizza bread")
+
+    def hits(self, query, **params):
+        return [(kind, pk) for kind, pk, score in search(query, **params)]
+
+    def test_match_expression(self):
+        self.assertEqual(match_expression("piz  NAP!"), '"piz"* "NAP"*')
+        self.assertEqual(match_expression("!!"), "")
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.hits("napol piz"), [("restaurant", self.pizzeria.pk)])
+        self.assertEqual(self.hits("calz"), [("food", self.calzone.pk)])
+        self.assertEqual(self.hits("sushi"), [])
+        self.assertEqual(self.hits("?"), [])
+
+    def test_names_rank_before_food_types(self):
+        bento = make_restaurant(
+            make_user("bento", is_merchant=True), name="Bento", food_type="Sushi"
+        )
+        sushi_bar = make_restaurant(
+            make_user("sushi", is_merchant=True), name="Sushi Bar", food_type="Asian"
+        )
+        self.assertEqual(
+            self.hits("sushi"),
+            [("restaurant", sushi_bar.pk), ("restaurant", bento.pk)],
+        )
+
+    def test_diacritics_and_city_filter(self):
+        self.assertEqual(self.hits("cafe"), [("restaurant", self.cafe.pk)])
+        self.assertEqual(
+            self.hits("pizz", city="Hamburg"), [("food", self.pizza_bread.pk)]
+        )
+        self.assertEqual(self.hits("hamburg", limit=1), [("restaurant", self.cafe.pk)])
+
+    def test_index_follows_writes(self):
+        Restaurant.objects.filter(pk=self.pizzeria.pk).update(name="Trattoria")
+        self.assertEqual(self.hits("trattoria"), [("restaurant", self.pizzeria.pk)])
+        self.assertEqual(self.hits("napoli"), [])
+        Food.objects.filter(pk=self.calzone.pk).update(name="Lasagne")
+        self.assertEqual(self.hits("lasagne"), [("food", self.calzone.pk)])
+        Food.objects.filter(pk=self.calzone.pk).delete()
+        self.assertEqual(self.hits("lasagne"), [])
+
+    def test_missing_triggers_are_restored_after_migrations(self):
+        # SQLite drops a table's triggers when a migration rebuilds it.
+        with connection.cursor() as cursor:
+            for name in SEARCH_TRIGGERS:
+                cursor.execute("DROP TRIGGER {}".format(name))
+        food = make_food(self.pizzeria, "Tiramisu")
+        self.assertEqual(self.hits("tiramisu"), [])
+
+        restore_search_triggers(using=connection.alias)
+        self.assertEqual(self.hits("tiramisu"), [("food", food.pk)])
+        self.assertEqual(self.hits("calzone"), [("food", self.calzone.pk)])
+        make_food(self.pizzeria, "Panna cotta")
+        self.assertEqual(len(self.hits("panna")), 1)
+
+    def test_search_view(self):
+        response = self.client.get(reverse("search"), {"q": "calzone"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["type"], "food")
+        self.assertEqual(response.data[0]["food"]["name"], "Calzone")
+        self.assertEqual(self.client.get(reverse("search")).status_code, 400)
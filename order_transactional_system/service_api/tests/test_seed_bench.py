@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db.models import F, Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from service_api.models import (
+    Food,
+    Order,
+    OrderItem,
+    OrderStatus,
+    Restaurant,
+    RestaurantDailyStats,
+)
+
+
+class SeedBenchTests(TestCase):
+    def seed(self, **options):
+        stdout = StringIO()
+        options = {
+            "merchants": 2,
+            "customers": 3,
+            "foods": 4,
+            "orders": 30,
+            "days": 5,
+            "batch_size": 20,
+            "prefix": "seed",
+            **options,
+        }
+        call_command("seed_bench", stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_seed(self):
+        self.assertEqual(
+            self.seed(),
+            "Created 2 merchants, 3 customers and 2 restaurants.\n"
+            "Created 20 orders...\nCreated 30 orders...\nDone.\n",
+        )
+        self.assertEqual(User.objects.filter(username__startswith="seed_").count(), 5)
+        self.assertEqual(Restaurant.objects.count(), 2)
+        self.assertEqual(Food.objects.count(), 8)
+        self.assertTrue(self.client.login(username="seed_customer_0", password="bench"))
+
+        orders = Order.objects.all()
+        self.assertEqual(orders.count(), 30)
+        for order in orders.annotate(
+            lines_total=Sum(F("items__unit_price") * F("items__quantity"))
+        ):
+            self.assertEqual(order.total, order.lines_total)
+        self.assertEqual(
+            RestaurantDailyStats.objects.aggregate(orders=Sum("orders"))["orders"], 30
+        )
+
+    def test_orders_keep_their_generated_creation_times(self):
+        started = timezone.now()
+        self.seed()
+        times = list(Order.objects.values_list("create_datetime", flat=True))
+        self.assertEqual(len(set(times)), 30)
+        for created in times:
+            self.assertGreaterEqual(created, started - timedelta(days=5))
+            self.assertLess(created, started)
+        self.assertFalse(
+            Order.objects.filter(
+                status__in=[OrderStatus.ACCEPTED, OrderStatus.DELIVERED],
+                accept_datetime__lte=F("create_datetime"),
+            ).exists()
+        )
+        # Orders placed later still get the current time.
+        self.assertTrue(Order._meta.get_field("create_datetime").auto_now_add)
+
+    def test_seeds_are_repeatable(self):
+        self.seed(seed=3)
+        first = list(OrderItem.objects.order_by("pk").values_list("quantity"))
+        OrderItem.objects.all().delete()
+        Order.objects.all().delete()
+        self.seed(seed=3, prefix="again")
+        self.assertEqual(
+            list(OrderItem.objects.order_by("pk").values_list("quantity")), first
+        )
+
+    def test_existing_prefixes_are_refused(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, "Users named seed_* exist"):
+            self.seed()
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from service_api.tests.factories import make_restaurant, make_user
+
+
+@override_settings(TOKEN_AUTH=True)
+class TokenAuthTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = make_user("merchant", is_merchant=True)
+        make_restaurant(cls.merchant)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def login(self):
+        response = self.client.post(
+            reverse("login"), {"username": "merchant", "password": "password"}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def get(self, token, name="merchant_active_orders"):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer {}".format(token))
+        response = self.client.get(reverse(name))
+        self.client.credentials()
+        return response
+
+    def assertChallenged(self, response, detail=None):
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+        if detail is not None:
+            self.assertEqual(response.data["detail"], detail)
+
+    def test_access_tokens_are_verified_without_queries(self):
+        tokens = self.login()
+        self.assertEqual(tokens["token_type"], "Bearer")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(tokens["access"])
+        self.assertEqual(response.status_code, 200, response.data)
+        for query in queries:
+            for table in ("auth_user", "service_api_profile", "django_session"):
+                self.assertNotIn('FROM "{}"'.format(table), query["sql"])
+
+    def test_refresh(self):
+        tokens = self.login()
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertNotIn("refresh", response.data)
+        self.assertEqual(self.get(response.data["access"]).status_code, 200)
+        # Tokens are only good for their own use.
+        self.assertChallenged(self.get(tokens["refresh"]), "Invalid token.")
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": tokens["access"]}
+        )
+        self.assertChallenged(response, "Invalid token.")
+
+    def test_logout_revokes_the_login(self):
+        tokens, other = self.login(), self.login()
+        self.assertEqual(self.get(tokens["access"], "logout").status_code, 200)
+        self.assertChallenged(self.get(tokens["access"]), "Token has been revoked.")
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": tokens["refresh"]}
+        )
+        self.assertChallenged(response, "Token has been revoked.")
+        self.assertEqual(self.get(other["access"]).status_code, 200)
+
+    def test_password_changes_revoke_every_login(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + tokens["access"])
+        response = self.client.put(
+            reverse("profile"),
+            {
+                "username": "merchant",
+                "password": "new password",
+                "first_name": "merchant",
+                "last_name": "test",
+                "profile": {"city": "Berlin", "is_merchant": True},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertChallenged(self.get(tokens["access"]))
+
+    def test_expired_and_forged_tokens(self):
+        tokens = self.login()
+        with self.settings(ACCESS_TOKEN_LIFETIME=-1):
+            response = self.get(tokens["access"])
+        self.assertChallenged(response, "Token has expired.")
+        self.assertChallenged(self.get(tokens["access"][:-2] + "xx"), "Invalid token.")
+        self.assertChallenged(self.get(""), "Invalid token header.")
+
+    def test_sessions_are_not_challenged(self):
+        # Session authentication comes first, so failures without a token
+        # answer 403.
+        response = self.client.get(reverse("merchant_active_orders"))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn("WWW-Authenticate", response)
+
+    @override_settings(TOKEN_AUTH=False)
+    def test_session_logins(self):
+        response = self.client.post(
+            reverse("login"), {"username": "merchant", "password": "password"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data)
+        response = self.client.get(reverse("merchant_active_orders"))
+        self.assertEqual(response.status_code, 200)
@@ -3,9 +3,22 @@ from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework import routers
 
+from django.conf import settings
 from rest_framework.schemas import get_schema_view
 from .views import *
 
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import (
+        AsyncApiHomepage as ApiHomepage,
+        AsyncRestaurantList as RestaurantList,
+        AsyncCustomerActiveOrderList as CustomerActiveOrderList,
+        AsyncCustomerCancelledOrderList as CustomerCancelledOrderList,
+        AsyncCustomerDeliveredOrderList as CustomerDeliveredOrderList,
+        AsyncMerchantActiveOrderList as MerchantActiveOrderList,
+        AsyncMerchantCancelledOrderList as MerchantCancelledOrderList,
+        AsyncMerchantDeliveredOrderList as MerchantDeliveredOrderList,
+    )
+
 urlpatterns = [
     # rest_framework Authentication
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
@@ -34,12 +47,19 @@ urlpatterns = [
     path("register/", Register.as_view(), name='register'),
     path("login/", api_login.as_view(), name='login'),
     path("logout/", api_logout, name='logout'),
+    path("token/refresh/", TokenRefresh.as_view(), name='token_refresh'),
     path("users/", UserList.as_view(), name='users'),
     path("profile/", UserProfile.as_view(), name='profile'),
     path("restaurants/", RestaurantList.as_view(), name='restaurants'),
+    path("restaurants/nearby/", NearbyRestaurantList.as_view(), name='restaurants_nearby'),
+    path("restaurants/<int:pk>/menu/", RestaurantMenu.as_view(), name='restaurant_menu'),
+    path("search/", Search.as_view(), name='search'),
+    path("metrics/", metrics, name='metrics'),
+    path("slowrequests/", slow_request_log, name='slow_requests'),
     # Merchant API URI
     path("merchant/newrestaurant/", CreateRestaurant.as_view(), name='merchant_create_new_restaurants'),
     path("merchant/foods/", MerchantFoodListCreate.as_view(), name='merchant_create_new_food_list'),
+    path("merchant/foods/import/", MerchantFoodImport.as_view(), name='merchant_import_foods'),
     path("merchant/updatefood/<int:pk>/", UpdateFood.as_view(), name='merchant_update_food_list'),
     path("merchant/activeorders/", MerchantActiveOrderList.as_view(), name='merchant_active_orders'),
     path("merchant/cancelledorders/",
@@ -50,6 +70,15 @@ urlpatterns = [
         MerchantDeliveredOrderList.as_view(), name='merchant_delivered_orders'),
     path("merchant/cancel/<int:pk>/", MerchantCancelOrder.as_view(), name='merchant_cancel_order'),
     path("merchant/accept/<int:pk>/", MerchantAcceptOrder.as_view(), name='merchant_accept_order'),
+    path(
+        "merchant/orders/transition/",
+        MerchantBulkOrderTransition.as_view(), name='merchant_bulk_transition_orders'
+    ),
+    path("merchant/analytics/", MerchantAnalytics.as_view(), name='merchant_analytics'),
+    path("merchant/orders/export/", MerchantOrderExport.as_view(), name='merchant_export_orders'),
+    path(
+        "merchant/events/",
+        order_events, {"role": "merchant"}, name='merchant_order_events'),
     # Customers API URI
     path("customer/neworder/", CreateOrder.as_view(), name="customer_new_order"),
     path("customer/activeorders/", CustomerActiveOrderList.as_view(), name="customer_active_orders"),
@@ -58,9 +87,13 @@ urlpatterns = [
     path(
         "customer/deliveredorders/",
         CustomerDeliveredOrderList.as_view(), name="customer_delivered_order" ),
+    path("customer/orders/export/", CustomerOrderExport.as_view(), name="customer_export_orders"),
     path("customer/cancel/<int:pk>/", CustomerCancellOrder.as_view(), name="customer_cancel_order"),
+    path(
+        "customer/events/",
+        order_events, {"role": "customer"}, name="customer_order_events"),
     path(
         "customer/approvedelivered/<int:pk>/",
-        CustomerAprroveDeliveredOrder.as_view(), name="customer_new_order"
+        CustomerAprroveDeliveredOrder.as_view(), name="customer_approve_delivered_order"
     ),
 ]
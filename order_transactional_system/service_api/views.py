@@ -1,5 +1,14 @@
-from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser, User
 from django.contrib.auth import authenticate, login
+
+import heapq
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 
 from rest_framework import generics
@@ -7,31 +16,71 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.parsers import MultiPartParser
 from rest_framework.reverse import reverse, reverse_lazy
 
-from .models import Restaurant, Food, Order
+from .models import (
+    ArchivedOrder,
+    Restaurant,
+    Food,
+    Order,
+    OrderStatus,
+    ACTIVE_ORDER_STATUSES,
+    ORDER_TRANSITIONS,
+    open_at_q,
+)
 
 from .serializers import (
     UserSerializer,
     LoginSerializer,
+    TokenRefreshSerializer,
     RestaurantSerializer,
+    RestaurantFilterSerializer,
+    NearbyRestaurantSerializer,
+    NearbyRestaurantQuerySerializer,
+    SearchQuerySerializer,
     CreateRestaurantSerializer,
     FoodSerializer,
+    FoodImportSerializer,
     PlaceOrderSerializer,
     CancellOrderSerializer,
     ApproveDeliveredOrderSerializer,
     AcceptOrderSerializer,
+    BulkOrderTransitionSerializer,
+    OrderExportQuerySerializer,
+    AnalyticsQuerySerializer,
 )
 
+from .analytics import record_order_transitions, restaurant_analytics
+from .archive import combine_order_history
+from .authentication import (
+    REFRESH_TOKEN,
+    BearerTokenAuthentication,
+    get_request_user,
+    issue_tokens,
+    load_principal,
+    revoke_session,
+    verify_token,
+)
+from .events import OVERFLOW, hub, format_event, publish_order_event
+from .geo import bounding_box, covering_cells, haversine_km
+from .menu_cache import bump_menu_version, get_menu_cache, menu_cache_key
+from .menu_import import import_menu, iter_rows
+from .metrics import PROMETHEUS_CONTENT_TYPE, render_metrics
+from .profiling import slow_requests
+from .order_export import ORDER_EXPORT_CONTENT_TYPES, stream_orders
+from .pagination import OrderCursorPagination
+from .routers import ReplicaReadMixin
+from .rows import RowListMixin
+from .search import search
+
 from .permissions import (
     MerchantPermission,
     HasRestaurant,
     IsFoodOwner,
-    CustomerCancellOrderPermission,
-    IsCustomerOfOrder,
-    CustomerApproveDeliveredOrderPermission,
-    IsMerchantOfOrder,
-    MerchantCancelAcceptOrderPermission,
+    get_merchant_restaurant_id,
+    get_food,
 )
 
 # Customers API URI
@@ -51,16 +100,18 @@ from .permissions import (
 # #     CustomerAprroveDeliveredOrder.as_view(), name="customer_new_order"
 # # ),
 
-@api_view(['GET'])
-def ApiHomepage(request, format=None):
-    return Response({
+def api_homepage_urls(request, format=None):
+    return {
         # General API URI
         'register': reverse_lazy('register', request=request, format=format),
         'login': reverse_lazy('login', request=request, format=format),
         'logout': reverse_lazy('logout', request=request, format=format),
+        'token_refresh': reverse_lazy('token_refresh', request=request, format=format),
         'users': reverse_lazy('users', request=request, format=format),
         'profile': reverse_lazy('profile', request=request, format=format),
         'restaurants': reverse_lazy('restaurants', request=request, format=format),
+        'restaurants_nearby': reverse_lazy('restaurants_nearby', request=request, format=format),
+        'search': reverse_lazy('search', request=request, format=format),
 
         # Merchant API URI
         'merchant_create_new_restaurants': reverse_lazy('merchant_create_new_restaurants', request=request, format=format),
@@ -71,6 +122,9 @@ def ApiHomepage(request, format=None):
         #'merchant_cancel_order': reverse_lazy('merchant_cancel_order', request=request, format=format),
         #'merchant_accept_order': reverse_lazy('merchant_accept_order', request=request, format=format),
         'merchant_delivered_orders': reverse_lazy('merchant_delivered_orders', request=request, format=format),
+        'merchant_bulk_transition_orders': reverse_lazy('merchant_bulk_transition_orders', request=request, format=format),
+        'merchant_export_orders': reverse_lazy('merchant_export_orders', request=request, format=format),
+        'merchant_analytics': reverse_lazy('merchant_analytics', request=request, format=format),
 
         # Customer API URI
 
@@ -79,9 +133,15 @@ def ApiHomepage(request, format=None):
         'customer_cancelled_orders': reverse_lazy('customer_cancelled_orders', request=request, format=format),
         #'customer_cancel_order': reverse_lazy('customer_cancel_order', request=request, format=format),
         'customer_delivered_order': reverse_lazy('customer_delivered_order', request=request, format=format),
+        'customer_export_orders': reverse_lazy('customer_export_orders', request=request, format=format),
+
+
+    }
 
 
-    })
+@api_view(['GET'])
+def ApiHomepage(request, format=None):
+    return Response(api_homepage_urls(request, format=format))
 
 
 class api_login(generics.CreateAPIView):
@@ -95,6 +155,8 @@ class api_login(generics.CreateAPIView):
         username = request.data["username"]
         password = request.data["password"]
         user = authenticate(request, username=username, password=password)
+        if user is not None and settings.TOKEN_AUTH:
+            return Response(issue_tokens(load_principal(user.pk)))
         if user is not None:
             login(request, user)
             return Response(status=status.HTTP_200_OK)
@@ -104,10 +166,56 @@ class api_login(generics.CreateAPIView):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def api_logout(request):
-    request.session.flush()
+    if isinstance(request.auth, dict) and "sid" in request.auth:
+        revoke_session(request.auth["sid"])
+    else:
+        request.session.flush()
     return Response(status=status.HTTP_200_OK)
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """
+    Request metrics of this process in the Prometheus text format.
+    """
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def slow_request_log(request):
+    """
+    The last requests slower than SLOW_REQUEST_SECONDS served by this process,
+    newest first, with their queries and the code which ran them.
+    """
+    return Response(slow_requests.list())
+
+
+class TokenRefresh(generics.GenericAPIView):
+    """
+    Issue a new access token for a refresh token.
+    """
+
+    serializer_class = TokenRefreshSerializer
+    permission_classes = (AllowAny,)
+
+    def get_authenticate_header(self, request):
+        # Refresh tokens are bearer tokens too; failures answer 401.
+        return BearerTokenAuthentication().authenticate_header(request)
+
+    def post(self, request, format=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        claims = verify_token(serializer.validated_data["refresh"], REFRESH_TOKEN)
+        user = load_principal(claims["uid"])
+        if user is None:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+        tokens = issue_tokens(user, session_id=claims["sid"])
+        del tokens["refresh"]
+        return Response(tokens)
+
+
 class Register(generics.CreateAPIView):
     """
     Register a new account.
@@ -116,7 +224,7 @@ class Register(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class UserList(generics.ListCreateAPIView):
+class UserList(ReplicaReadMixin, generics.ListCreateAPIView):
     """
     Show list of all users or create a new user.
     """
@@ -125,7 +233,7 @@ class UserList(generics.ListCreateAPIView):
         IsAuthenticated,
         IsAdminUser,
     )
-    queryset = User.objects.all()
+    queryset = User.objects.select_related("profile")
     serializer_class = UserSerializer
 
 
@@ -138,16 +246,151 @@ class UserProfile(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return User.objects.filter(pk=self.request.user.pk).first()
+        user = (
+            User.objects.select_related("profile")
+            .filter(pk=self.request.user.pk)
+            .first()
+        )
+        if user is None:
+            raise Http404
+        return user
+
+
+def filter_restaurants(query_params):
+    """
+    Return the restaurants matching the `city`, `open_now` and `open_at`
+    query parameters.
+    """
+    params = RestaurantFilterSerializer(data=query_params)
+    params.is_valid(raise_exception=True)
+    city = params.validated_data.get("city")
+    open_at = params.validated_data.get("open_at")
+    if open_at is None and params.validated_data["open_now"]:
+        open_at = timezone.localtime().time()
+
+    restaurants = Restaurant.objects.all()
+    if city is not None:
+        restaurants = restaurants.filter(city=city)
+    if open_at is not None:
+        restaurants = restaurants.filter(open_at_q(open_at))
+    return restaurants
 
 
-class RestaurantList(generics.ListAPIView):
+class RestaurantList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of all restaurants.
+
+    Filter with `city`, `open_now=true` or `open_at=HH:MM`.
     """
 
     serializer_class = RestaurantSerializer
-    queryset = Restaurant.objects.all()
+
+    def get_queryset(self):
+        return filter_restaurants(self.request.query_params)
+
+
+class NearbyRestaurantList(ReplicaReadMixin, generics.ListAPIView):
+    """
+    Restaurants within `radius` km of `lat`/`lng`, closest first.
+    """
+
+    serializer_class = NearbyRestaurantSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        params = NearbyRestaurantQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        lat = params.validated_data["lat"]
+        lng = params.validated_data["lng"]
+        radius = params.validated_data["radius"]
+
+        # Prefilter in SQL on the indexed geohash cells covering the bounding
+        # box, then compute exact distances on the remaining candidates.
+        south, west, north, east = bounding_box(lat, lng, radius)
+        cells = Q()
+        for cell in covering_cells(south, west, north, east):
+            cells |= Q(geohash__gte=cell, geohash__lt=cell + "~")
+        candidates = Restaurant.objects.filter(cells, lat__gte=south, lat__lte=north)
+        if west <= east:
+            candidates = candidates.filter(long__gte=west, long__lte=east)
+
+        nearby = []
+        for restaurant in candidates:
+            restaurant.distance = haversine_km(
+                lat, lng, float(restaurant.lat), float(restaurant.long)
+            )
+            if restaurant.distance <= radius:
+                nearby.append(restaurant)
+        return heapq.nsmallest(
+            params.validated_data["limit"], nearby, key=attrgetter("distance")
+        )
+
+
+class Search(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    Search restaurants and foods, best matches first.
+
+    Every word of `q` matches as a prefix; filter by restaurant `city`.
+    """
+
+    def get(self, request, format=None):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        hits = search(
+            params.validated_data["q"],
+            city=params.validated_data.get("city"),
+            limit=params.validated_data["limit"],
+        )
+        restaurants = Restaurant.objects.in_bulk(
+            [pk for kind, pk, score in hits if kind == "restaurant"]
+        )
+        foods = Food.objects.in_bulk([pk for kind, pk, score in hits if kind == "food"])
+
+        results = []
+        for kind, pk, score in hits:
+            if kind == "restaurant" and pk in restaurants:
+                data = RestaurantSerializer(restaurants[pk]).data
+            elif kind == "food" and pk in foods:
+                data = FoodSerializer(foods[pk]).data
+            else:
+                continue
+            results.append({"type": kind, "score": score, kind: data})
+        return Response(results)
+
+
+class CachedMenuMixin:
+    """
+    Serve a restaurant's food list from the menu cache.
+
+    Views implement `get_menu_restaurant_id`. Cached pages are dropped by
+    `bump_menu_version` whenever the restaurant's foods change.
+    """
+
+    def list(self, request, *args, **kwargs):
+        restaurant_id = self.get_menu_restaurant_id()
+        key = menu_cache_key(restaurant_id, request.build_absolute_uri())
+        data = get_menu_cache().get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            get_menu_cache().set(key, data)
+        return Response(data)
+
+
+class RestaurantMenu(CachedMenuMixin, RowListMixin, generics.ListAPIView):
+    """
+    List of a restaurant's foods.
+
+    Cache misses read from the default database, not a replica: a replica
+    lagging behind a menu change would refill the cache with the old menu.
+    """
+
+    serializer_class = FoodSerializer
+
+    def get_menu_restaurant_id(self):
+        return self.kwargs["pk"]
+
+    def get_queryset(self):
+        return Food.objects.filter(restaurant=self.kwargs["pk"])
 
 
 class CreateRestaurant(generics.CreateAPIView):
@@ -165,7 +408,9 @@ class CreateRestaurant(generics.CreateAPIView):
         serializer.save(merchant=self.request.user)
 
 
-class MerchantFoodListCreate(generics.ListCreateAPIView):
+class MerchantFoodListCreate(
+    CachedMenuMixin, RowListMixin, generics.ListCreateAPIView
+):
     """
     Create food for restaurant by merchant.
     """
@@ -177,13 +422,47 @@ class MerchantFoodListCreate(generics.ListCreateAPIView):
         HasRestaurant,
     )
 
+    def get_menu_restaurant_id(self):
+        return get_merchant_restaurant_id(self.request)
+
     def get_queryset(self):
-        restaurant = Restaurant.objects.filter(merchant=self.request.user.pk).first()
-        return Food.objects.filter(restaurant=restaurant)
+        restaurant_id = get_merchant_restaurant_id(self.request)
+        return Food.objects.filter(restaurant=restaurant_id)
 
     def perform_create(self, serializer):
-        restaurant = Restaurant.objects.filter(merchant=self.request.user.pk).first()
-        serializer.save(restaurant=restaurant)
+        restaurant_id = get_merchant_restaurant_id(self.request)
+        serializer.save(restaurant_id=restaurant_id)
+        bump_menu_version(restaurant_id)
+
+
+class MerchantFoodImport(generics.GenericAPIView):
+    """
+    Create or update foods in bulk from a CSV or NDJSON file.
+
+    Rows have `name` and `price`; foods are matched by name. Responds with
+    created and updated counts and the errors of rejected rows.
+    """
+
+    serializer_class = FoodImportSerializer
+    parser_classes = (MultiPartParser,)
+    permission_classes = (
+        IsAuthenticated,
+        MerchantPermission,
+        HasRestaurant,
+    )
+
+    def post(self, request, format=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        restaurant_id = get_merchant_restaurant_id(request)
+        rows = iter_rows(
+            serializer.validated_data["file"], serializer.validated_data["type"]
+        )
+        try:
+            report = import_menu(restaurant_id, rows, settings.MENU_IMPORT_CHUNK_SIZE)
+        finally:
+            bump_menu_version(restaurant_id)
+        return Response(report)
 
 
 class UpdateFood(generics.UpdateAPIView):
@@ -200,6 +479,64 @@ class UpdateFood(generics.UpdateAPIView):
     )
     queryset = Food.objects.all()
 
+    def get_object(self):
+        food = get_food(self.request, self.kwargs["pk"])
+        if food is None:
+            raise Http404
+        self.check_object_permissions(self.request, food)
+        return food
+
+    def perform_update(self, serializer):
+        food = serializer.save()
+        bump_menu_version(food.restaurant_id)
+
+
+class OrderTransition(generics.UpdateAPIView):
+    """
+    Base view applying an order state transition with one conditional UPDATE.
+
+    Subclasses set the transition ``action`` and restrict ``get_queryset`` to
+    the orders the user is allowed to change.
+    """
+
+    action = None
+    not_owner_message = None
+    invalid_state_message = None
+
+    def update(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data, partial=kwargs.pop("partial", False)
+        )
+        serializer.is_valid(raise_exception=True)
+        orders = self.get_queryset().filter(pk=self.kwargs["pk"])
+        with transaction.atomic():
+            changed = orders.transition(self.action, **serializer.validated_data)
+            if changed:
+                record_order_transitions(self.action, [self.kwargs["pk"]])
+        if not changed:
+            if orders.exists():
+                self.permission_denied(request, message=self.invalid_state_message)
+            self.permission_denied(request, message=self.not_owner_message)
+        order = Order(
+            pk=self.kwargs["pk"],
+            status=ORDER_TRANSITIONS[self.action][1],
+            **serializer.validated_data,
+        )
+        self.publish_transition(order)
+        return Response(self.get_serializer(order).data)
+
+    def publish_transition(self, order):
+        if not hub.has_subscribers():
+            return
+        restaurant_id, customer_id = (
+            Order.objects.filter(pk=order.pk)
+            .values_list("restaurant_id", "customer_id")
+            .get()
+        )
+        publish_order_event(
+            order.status, order.pk, restaurant_id, customer_id, order.status
+        )
+
 
 class CreateOrder(generics.CreateAPIView):
     """
@@ -210,87 +547,98 @@ class CreateOrder(generics.CreateAPIView):
     permission_classes = (IsAuthenticated,)
 
     def perform_create(self, serializer):
-        serializer.save(customer=self.request.user)
+        order = serializer.save(customer=self.request.user)
+        publish_order_event(
+            "created", order.pk, order.restaurant_id, order.customer_id, order.status
+        )
 
 
-class CustomerActiveOrderList(generics.ListAPIView):
+class CustomerActiveOrderList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of all active orders which are not cancelled or delivered.
     """
 
     serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
         return Order.objects.filter(
-            customer=self.request.user.pk, is_cancelled=False, is_delivered=False
+            customer=self.request.user.pk, status__in=ACTIVE_ORDER_STATUSES
         )
 
 
-class CustomerCancelledOrderList(generics.ListAPIView):
+class CustomerCancelledOrderList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of customer's cancelled orders.
     """
 
     serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Order.objects.filter(customer=self.request.user.pk, is_cancelled=True)
+        return combine_order_history(
+            Order.objects.all(),
+            customer=self.request.user.pk,
+            status=OrderStatus.CANCELLED,
+        )
 
 
-class CustomerDeliveredOrderList(generics.ListAPIView):
+class CustomerDeliveredOrderList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of customer's delivered orders.
     """
 
     serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Order.objects.filter(customer=self.request.user.pk, is_delivered=True)
+        return combine_order_history(
+            Order.objects.all(),
+            customer=self.request.user.pk,
+            status=OrderStatus.DELIVERED,
+        )
 
 
-class CustomerCancellOrder(generics.UpdateAPIView):
+class CustomerCancellOrder(OrderTransition):
     """
     Cancell order if has permission to.
     """
 
     serializer_class = CancellOrderSerializer
-    permission_classes = (
-        IsAuthenticated,
-        IsCustomerOfOrder,
-        CustomerCancellOrderPermission,
-    )
-    queryset = Order.objects.all()
+    permission_classes = (IsAuthenticated,)
+    action = "cancel"
+    not_owner_message = "You can't cancel this order because you are not it's owner."
+    invalid_state_message = "You don't have permission to cancel this order."
 
-    def perform_update(self, serializer):
-        serializer.save(cancell_datetime=timezone.now())
+    def get_queryset(self):
+        return Order.objects.filter(customer=self.request.user.pk)
 
 
-class CustomerAprroveDeliveredOrder(generics.UpdateAPIView):
+class CustomerAprroveDeliveredOrder(OrderTransition):
     """
     Aprrove that order has been delivered.
     """
 
     serializer_class = ApproveDeliveredOrderSerializer
-    permission_classes = (
-        IsAuthenticated,
-        IsCustomerOfOrder,
-        CustomerApproveDeliveredOrderPermission,
-    )
-    queryset = Order.objects.all()
+    permission_classes = (IsAuthenticated,)
+    action = "deliver"
+    not_owner_message = "You can't approve this order because you are not it's owner."
+    invalid_state_message = "You can not approve this order as delivered."
 
-    def perform_update(self, serializer):
-        serializer.save(delivered_datetime=timezone.now())
+    def get_queryset(self):
+        return Order.objects.filter(customer=self.request.user.pk)
 
 
-class MerchantActiveOrderList(generics.ListAPIView):
+class MerchantActiveOrderList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of merchant's restaurant active orders.
     """
 
     serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
     permission_classes = (
         IsAuthenticated,
         MerchantPermission,
@@ -298,20 +646,20 @@ class MerchantActiveOrderList(generics.ListAPIView):
     )
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.filter(merchant=self.request.user.pk).first()
-        foods = Food.objects.filter(restaurant=restaurant.pk).values_list("id").first()
+        restaurant_id = get_merchant_restaurant_id(self.request)
         orders = Order.objects.filter(
-            foods__in=foods, is_cancelled=False, is_delivered=False
+            restaurant=restaurant_id, status__in=ACTIVE_ORDER_STATUSES
         )
         return orders
 
 
-class MerchantCancelledOrderList(generics.ListAPIView):
+class MerchantCancelledOrderList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of merchant's restaurant cancelled orders.
     """
 
     serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
     permission_classes = (
         IsAuthenticated,
         MerchantPermission,
@@ -319,20 +667,22 @@ class MerchantCancelledOrderList(generics.ListAPIView):
     )
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.filter(merchant=self.request.user.pk).first()
-        foods = Food.objects.filter(restaurant=restaurant.pk).values_list("id").first()
-        orders = Order.objects.filter(
-            foods__in=foods, is_cancelled=True
+        restaurant_id = get_merchant_restaurant_id(self.request)
+        orders = combine_order_history(
+            Order.objects.all(),
+            restaurant=restaurant_id,
+            status=OrderStatus.CANCELLED,
         )
         return orders
 
 
-class MerchantDeliveredOrderList(generics.ListAPIView):
+class MerchantDeliveredOrderList(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
     """
     List of merchant's restaurant delivered orders.
     """
 
     serializer_class = PlaceOrderSerializer
+    pagination_class = OrderCursorPagination
     permission_classes = (
         IsAuthenticated,
         MerchantPermission,
@@ -340,43 +690,253 @@ class MerchantDeliveredOrderList(generics.ListAPIView):
     )
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.filter(merchant=self.request.user.pk).first()
-        foods = Food.objects.filter(restaurant=restaurant.pk).values_list("id").first()
-        orders = Order.objects.filter(
-            foods__in=foods, is_delivered=True
+        restaurant_id = get_merchant_restaurant_id(self.request)
+        orders = combine_order_history(
+            Order.objects.all(),
+            restaurant=restaurant_id,
+            status=OrderStatus.DELIVERED,
         )
         return orders
 
 
-class MerchantCancelOrder(generics.UpdateAPIView):
+class MerchantCancelOrder(OrderTransition):
     """
     Cancel order if has permission to.
     """
 
     serializer_class = CancellOrderSerializer
+    permission_classes = (IsAuthenticated,)
+    action = "cancel"
+    not_owner_message = "You are not the merchant of this order."
+    invalid_state_message = "You don't have permission to cancel this order."
+
+    def get_queryset(self):
+        return Order.objects.filter(restaurant__merchant=self.request.user.pk)
+
+
+class MerchantAcceptOrder(OrderTransition):
+    """
+    Accept order if has permission to.
+    """
+
+    serializer_class = AcceptOrderSerializer
+    permission_classes = (IsAuthenticated,)
+    action = "accept"
+    not_owner_message = "You are not the merchant of this order."
+    invalid_state_message = "You don't have permission to accept this order."
+
+    def get_queryset(self):
+        return Order.objects.filter(restaurant__merchant=self.request.user.pk)
+
+
+class MerchantBulkOrderTransition(generics.GenericAPIView):
+    """
+    Accept or cancel many of the merchant's orders at once.
+
+    Responds with the ids of the changed orders and the reason each other
+    order was skipped.
+    """
+
+    serializer_class = BulkOrderTransitionSerializer
     permission_classes = (
         IsAuthenticated,
-        IsMerchantOfOrder,
-        MerchantCancelAcceptOrderPermission,
+        MerchantPermission,
+    )
+    not_owner_message = "You are not the merchant of this order."
+    invalid_state_message = "You don't have permission to {} this order."
+
+    def post(self, request, format=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data["ids"])
+        action = serializer.validated_data["action"]
+        fields = {}
+        if "time_to_deliver" in serializer.validated_data:
+            fields["time_to_deliver"] = serializer.validated_data["time_to_deliver"]
+        sources, target, timestamp_field = ORDER_TRANSITIONS[action]
+
+        with transaction.atomic():
+            # Lock the orders so the report matches exactly what this request
+            # changed, whatever concurrent requests do.
+            owned = {
+                pk: (status, restaurant_id, customer_id)
+                for pk, status, restaurant_id, customer_id in Order.objects.filter(
+                    pk__in=ids, restaurant__merchant=request.user.pk
+                )
+                .select_for_update(of=("self",))
+                .values_list("pk", "status", "restaurant_id", "customer_id")
+            }
+            eligible = {pk for pk, (status, *_) in owned.items() if status in sources}
+            Order.objects.filter(pk__in=eligible).transition(action, **fields)
+            record_order_transitions(action, eligible)
+
+        skipped = {pk: self.not_owner_message for pk in ids - set(owned)}
+        for pk in set(owned) - eligible:
+            skipped[pk] = self.invalid_state_message.format(action)
+        for pk in sorted(eligible):
+            status, restaurant_id, customer_id = owned[pk]
+            publish_order_event(target, pk, restaurant_id, customer_id, target)
+
+        skipped = [
+            {"id": pk, "reason": reason} for pk, reason in sorted(skipped.items())
+        ]
+        return Response({"applied": sorted(eligible), "skipped": skipped})
+
+
+class MerchantAnalytics(generics.GenericAPIView):
+    """
+    Daily sales figures and top foods of the merchant's restaurant.
+
+    Covers the days from `since` to `until`, by default the last 30 days.
+    Orders count towards the day they were placed on.
+    """
+
+    serializer_class = AnalyticsQuerySerializer
+    permission_classes = (
+        IsAuthenticated,
+        MerchantPermission,
+        HasRestaurant,
     )
-    queryset = Order.objects.all()
 
-    def perform_update(self, serializer):
-        serializer.save(cancell_datetime=timezone.now())
+    def get(self, request, format=None):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            restaurant_analytics(
+                get_merchant_restaurant_id(request),
+                serializer.validated_data["since"],
+                serializer.validated_data["until"],
+            )
+        )
 
 
-class MerchantAcceptOrder(generics.UpdateAPIView):
+class OrderExport(generics.GenericAPIView):
     """
-    Accept order if has permission to.
+    Stream order history as NDJSON (default) or CSV with `type=csv`.
+
+    Filter by creation time with `since` and `until` and by `status`.
+    Archived orders come first, then the others, each oldest first and with
+    its lines.
+    """
+
+    serializer_class = OrderExportQuerySerializer
+
+    def get(self, request, format=None):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        filters = self.get_order_filter()
+        if "since" in query:
+            filters["create_datetime__gte"] = query["since"]
+        if "until" in query:
+            filters["create_datetime__lte"] = query["until"]
+        if "status" in query:
+            filters["status"] = query["status"]
+        querysets = [
+            model.objects.filter(**filters).order_by("create_datetime", "id")
+            for model in (ArchivedOrder, Order)
+        ]
+
+        file_format = query["type"]
+        response = StreamingHttpResponse(
+            stream_orders(querysets, file_format, settings.ORDER_EXPORT_CHUNK_SIZE),
+            content_type=ORDER_EXPORT_CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = 'attachment; filename="orders.{}"'.format(
+            file_format
+        )
+        return response
+
+
+class CustomerOrderExport(OrderExport):
+    """
+    Export the customer's orders.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get_order_filter(self):
+        return {"customer": self.request.user.pk}
+
+
+class MerchantOrderExport(OrderExport):
+    """
+    Export the orders of the merchant's restaurant.
     """
 
-    serializer_class = AcceptOrderSerializer
     permission_classes = (
         IsAuthenticated,
-        IsMerchantOfOrder,
-        MerchantCancelAcceptOrderPermission,
+        MerchantPermission,
+        HasRestaurant,
     )
-    queryset = Order.objects.all()
 
-    def perform_update(self, serializer):
-        serializer.save(accept_datetime=timezone.now())
+    def get_order_filter(self):
+        return {"restaurant": get_merchant_restaurant_id(self.request)}
+
+
+def order_event_scope(request, role):
+    """
+    Return the subscription filter of the user's order event stream, or None
+    if the user may not open it.
+
+    Users log in with a bearer token or a session, like on the async views.
+    """
+    request.user = get_request_user(request) or AnonymousUser()
+    if not request.user.is_authenticated:
+        return None
+    if role == "customer":
+        return {"customer_id": request.user.pk}
+    if not MerchantPermission().has_permission(request, None):
+        return None
+    restaurant_ids = Restaurant.objects.filter(merchant=request.user.pk).values_list(
+        "pk", flat=True
+    )
+    return {"restaurant_ids": list(restaurant_ids)}
+
+
+async def order_events(request, role):
+    """
+    Server-Sent Events stream of order created/accepted/cancelled/delivered
+    events of the merchant's restaurants or the customer's orders.
+
+    Resumes after the `Last-Event-ID` header (or `last_event_id` parameter);
+    a `reset` event means missed events are gone and lists should be reloaded.
+    Serve it under ASGI.
+    """
+    try:
+        scope = await sync_to_async(order_event_scope)(request, role)
+    except AuthenticationFailed as exc:
+        return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+    if scope is None:
+        return JsonResponse(
+            {"detail": "You do not have permission to perform this action."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    last_event_id = request.headers.get(
+        "Last-Event-ID", request.GET.get("last_event_id")
+    )
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    async def stream():
+        subscription, missed = hub.subscribe(last_event_id=last_event_id, **scope)
+        try:
+            if missed is None:
+                yield "event: reset\ndata: {}\n\n"
+                missed = []
+            for event in missed:
+                yield format_event(event)
+            while True:
+                event = await subscription.get(settings.ORDER_EVENTS_HEARTBEAT)
+                if event is OVERFLOW:
+                    return
+                yield ": keep-alive\n\n" if event is None else format_event(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response